@@ -4,9 +4,17 @@ from .models import (
     Shift,
     EmployeeShift,
     BiometricIntegration,
+    BiometricDevice,
     BiometricPunch,
+    BiometricPunchArchive,
     Timesheet,
     OvertimeRequest,
+    AttendanceException,
+    PunchAnomaly,
+    ClockRequest,
+    OfflineClockEvent,
+    AttendanceMonthSummary,
+    AttendanceRegularization,
 )
 
 
@@ -38,12 +46,31 @@ class BiometricIntegrationAdmin(admin.ModelAdmin):
     readonly_fields = ['integration_id', 'webhook_token', 'created_at', 'updated_at']
 
 
+@admin.register(BiometricDevice)
+class BiometricDeviceAdmin(admin.ModelAdmin):
+    list_display = ['device_id', 'name', 'integration', 'is_active', 'last_seen_at', 'punch_count', 'error_count']
+    list_filter = ['is_active', 'integration']
+    search_fields = ['device_id', 'name', 'location']
+    readonly_fields = [
+        'biometric_device_id', 'last_seen_at', 'last_heartbeat_at', 'last_punch_at', 'punch_count',
+        'hour_started_at', 'punches_this_hour', 'punches_last_hour', 'error_count', 'last_error_at',
+        'last_error', 'created_at', 'updated_at',
+    ]
+
+
 @admin.register(BiometricPunch)
 class BiometricPunchAdmin(admin.ModelAdmin):
     list_display = ['employee', 'employee_identifier', 'punch_time', 'direction', 'integration']
     list_filter = ['direction', 'integration']
     search_fields = ['employee_identifier', 'employee__email', 'employee__first_name']
-    readonly_fields = ['punch_id', 'created_at']
+    readonly_fields = ['punch_id', 'payload_blob', 'created_at']
+
+
+@admin.register(BiometricPunchArchive)
+class BiometricPunchArchiveAdmin(admin.ModelAdmin):
+    list_display = ['integration', 'month', 'punch_count', 'first_punch_at', 'last_punch_at', 'created_at']
+    list_filter = ['integration', 'month']
+    readonly_fields = ['archive_id', 'created_at']
 
 
 @admin.register(Timesheet)
@@ -59,3 +86,51 @@ class OvertimeRequestAdmin(admin.ModelAdmin):
     list_display = ['employee', 'date', 'hours', 'status', 'approved_by']
     list_filter = ['status', 'date']
     search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+
+
+@admin.register(AttendanceException)
+class AttendanceExceptionAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'date', 'kind', 'minutes', 'shift']
+    list_filter = ['kind', 'date']
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    date_hierarchy = 'date'
+
+
+@admin.register(PunchAnomaly)
+class PunchAnomalyAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'date', 'kind', 'score', 'status', 'reviewed_by']
+    list_filter = ['kind', 'status', 'date']
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    readonly_fields = ['anomaly_id', 'details', 'created_at']
+
+
+@admin.register(ClockRequest)
+class ClockRequestAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'action', 'idempotency_key', 'created_at']
+    list_filter = ['action']
+    search_fields = ['employee__first_name', 'employee__last_name', 'idempotency_key']
+    readonly_fields = ['request_id', 'response', 'created_at']
+
+
+@admin.register(OfflineClockEvent)
+class OfflineClockEventAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'action', 'recorded_time', 'skew_seconds', 'status', 'attendance_date']
+    list_filter = ['action', 'status']
+    search_fields = ['employee__first_name', 'employee__last_name', 'idempotency_key']
+    readonly_fields = ['event_id', 'created_at']
+
+
+@admin.register(AttendanceMonthSummary)
+class AttendanceMonthSummaryAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'month', 'present_days', 'absent_days', 'leave_days', 'working_hours', 'overtime_hours']
+    list_filter = ['month']
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    readonly_fields = ['summary_id', 'updated_at']
+
+
+@admin.register(AttendanceRegularization)
+class AttendanceRegularizationAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'date', 'clock_in_time', 'clock_out_time', 'status', 'applied_at']
+    list_filter = ['status', 'date']
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    readonly_fields = ['regularization_id', 'approved_at', 'applied_at', 'created_at', 'updated_at']
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+from array import array
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Attendance, BiometricIntegration, BiometricPunch, PunchAnomaly
+from .shift_utils import ShiftResolver
+from .timesheet_utils import shift_expected_hours
+from .tz_utils import day_boundaries, integration_timezone
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise RuntimeError('numpy is required for punch anomaly detection.') from exc
+    return numpy
+
+
+def month_days(month_start: date) -> List[date]:
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return [month_start + timedelta(days=offset) for offset in range((next_month - month_start).days)]
+
+
+class MonthPunches:
+    """Columnar arrays of one month's matched punches, sorted by employee then time.
+
+    ``day`` indexes into ``days``, the local calendar days of each punch's
+    integration timezone; ``device`` is a dense code per (integration,
+    device_id) pair.
+    """
+
+    def __init__(self, month_start: date):
+        np = _numpy()
+        self.days = month_days(month_start)
+        zones = {
+            integration.integration_id: integration_timezone(integration)
+            for integration in BiometricIntegration.objects.only('integration_id', 'timezone')
+        }
+        spans = {
+            zone: day_boundaries(zone).span(self.days[0], self.days[-1])
+            for zone in set(zones.values()) or {timezone.get_current_timezone()}
+        }
+        zone_codes = {zone: code for code, zone in enumerate(spans)}
+
+        employee_ids, devices, zone_ids, seconds = array('q'), array('q'), array('q'), array('d')
+        device_codes: Dict[Tuple[int, Any], int] = {}
+        punches = (
+            BiometricPunch.objects
+            .filter(
+                employee__isnull=False,
+                punch_time__gte=min(start for start, _ in spans.values()),
+                punch_time__lt=max(end for _, end in spans.values()),
+            )
+            .order_by('employee_id', 'punch_time')
+            .values_list('employee_id', 'integration_id', 'device_id', 'punch_time')
+        )
+        for employee_id, integration_id, device_id, punch_time in punches.iterator(chunk_size=10000):
+            employee_ids.append(employee_id)
+            devices.append(device_codes.setdefault((integration_id, device_id), len(device_codes)))
+            zone_ids.append(zone_codes[zones[integration_id]])
+            seconds.append(punch_time.timestamp())
+
+        self.device_names = {code: key for key, code in device_codes.items()}
+        employee = np.frombuffer(employee_ids, dtype=np.int64) if employee_ids else np.zeros(0, np.int64)
+        device = np.frombuffer(devices, dtype=np.int64) if devices else np.zeros(0, np.int64)
+        zone = np.frombuffer(zone_ids, dtype=np.int64) if zone_ids else np.zeros(0, np.int64)
+        moments = np.frombuffer(seconds, dtype=np.float64) if seconds else np.zeros(0, np.float64)
+
+        # Bucket each zone's punches by the UTC instants of its local midnights.
+        day = np.full(len(moments), -1, dtype=np.int64)
+        for tz, code in zone_codes.items():
+            boundaries = day_boundaries(tz)
+            bounds = np.array(
+                [boundaries.start_of(day).timestamp() for day in self.days]
+                + [spans[tz][1].timestamp()],
+                dtype=np.float64,
+            )
+            mask = zone == code
+            day[mask] = np.searchsorted(bounds, moments[mask], side='right') - 1
+        keep = (day >= 0) & (day < len(self.days))
+        self.employee, self.device, self.seconds, self.day = employee[keep], device[keep], moments[keep], day[keep]
+
+    def __len__(self) -> int:
+        return len(self.seconds)
+
+    def moment(self, index: int) -> str:
+        return datetime.fromtimestamp(float(self.seconds[index]), tz=dt_timezone.utc).isoformat()
+
+
+def _device_conflicts(punches: MonthPunches) -> List[PunchAnomaly]:
+    """Consecutive punches of one employee on different devices too close together."""
+    np = _numpy()
+    if len(punches) < 2:
+        return []
+    gap = np.diff(punches.seconds)
+    mask = (
+        (punches.employee[1:] == punches.employee[:-1])
+        & (punches.device[1:] != punches.device[:-1])
+        & (gap < settings.PUNCH_ANOMALY_DEVICE_CONFLICT_SECONDS)
+    )
+    anomalies: Dict[Tuple[int, int], PunchAnomaly] = {}
+    for index in np.flatnonzero(mask):
+        employee_id, day = int(punches.employee[index + 1]), int(punches.day[index + 1])
+        anomaly = anomalies.get((employee_id, day))
+        if anomaly is None:
+            anomaly = anomalies[(employee_id, day)] = PunchAnomaly(
+                employee_id=employee_id,
+                kind='Device Conflict',
+                date=punches.days[day],
+                score=0,
+                details={'pairs': []},
+            )
+        anomaly.score += 1
+        anomaly.details['pairs'].append({
+            'first': punches.moment(index),
+            'second': punches.moment(index + 1),
+            'devices': [list(punches.device_names[int(punches.device[i])]) for i in (index, index + 1)],
+            'gap_seconds': int(gap[index]),
+        })
+    return list(anomalies.values())
+
+
+def _excessive_punches(punches: MonthPunches) -> List[PunchAnomaly]:
+    """Employee-days with more punches than a working day plausibly needs."""
+    np = _numpy()
+    if not len(punches):
+        return []
+    keys = punches.employee * len(punches.days) + punches.day
+    unique, counts = np.unique(keys, return_counts=True)
+    flagged = counts > settings.PUNCH_ANOMALY_MAX_DAILY_PUNCHES
+    return [
+        PunchAnomaly(
+            employee_id=int(key // len(punches.days)),
+            kind='Excessive Punches',
+            date=punches.days[int(key % len(punches.days))],
+            score=float(count),
+            details={'punches': int(count), 'limit': settings.PUNCH_ANOMALY_MAX_DAILY_PUNCHES},
+        )
+        for key, count in zip(unique[flagged], counts[flagged])
+    ]
+
+
+def _rounded_times(punches: MonthPunches, month_start: date) -> List[PunchAnomaly]:
+    """Employees whose punches land on whole 5-minute marks far more often than chance (1 in 300)."""
+    np = _numpy()
+    if not len(punches):
+        return []
+    whole_seconds = np.round(punches.seconds).astype(np.int64)
+    rounded = (whole_seconds % 300) == 0
+    employees, inverse = np.unique(punches.employee, return_inverse=True)
+    totals = np.bincount(inverse)
+    hits = np.bincount(inverse, weights=rounded)
+    share = hits / totals
+    flagged = (
+        (totals >= settings.PUNCH_ANOMALY_ROUNDING_MIN_PUNCHES)
+        & (share >= settings.PUNCH_ANOMALY_ROUNDING_SHARE)
+    )
+    return [
+        PunchAnomaly(
+            employee_id=int(employee_id),
+            kind='Rounded Times',
+            date=month_start,
+            score=round(float(ratio), 4),
+            details={'rounded': int(hit), 'punches': int(total)},
+        )
+        for employee_id, ratio, hit, total in zip(
+            employees[flagged], share[flagged], hits[flagged], totals[flagged]
+        )
+    ]
+
+
+def _hours_outliers(days: List[date]) -> List[PunchAnomaly]:
+    """Employee-days whose worked hours deviate from the shift far more than the month's norm.
+
+    Uses the modified z-score (median / MAD) of worked minus expected hours,
+    which is not skewed by the outliers it is looking for.
+    """
+    np = _numpy()
+    rows = list(
+        Attendance.objects
+        .filter(date__gte=days[0], date__lte=days[-1], status='Present', working_hours__gt=0)
+        .values_list('employee_id', 'date', 'working_hours')
+    )
+    if not rows:
+        return []
+    resolver = ShiftResolver({employee_id for employee_id, _, _ in rows}, days[0], days[-1])
+    kept, worked, expected = [], [], []
+    for employee_id, day, hours in rows:
+        shift = resolver(employee_id, day)
+        if shift:
+            kept.append((employee_id, day))
+            worked.append(float(hours))
+            expected.append(float(shift_expected_hours(shift, day)))
+    if not kept:
+        return []
+
+    worked = np.array(worked)
+    expected = np.array(expected)
+    deviation = worked - expected
+    median = np.median(deviation)
+    mad = np.median(np.abs(deviation - median))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.where(mad > 0, 0.6745 * (deviation - median) / mad, np.inf * np.sign(deviation - median))
+    flagged = (
+        (np.abs(score) > settings.PUNCH_ANOMALY_HOURS_Z_SCORE)
+        & (np.abs(deviation) >= settings.PUNCH_ANOMALY_HOURS_MIN_DEVIATION)
+    )
+    return [
+        PunchAnomaly(
+            employee_id=kept[index][0],
+            kind='Hours Outlier',
+            date=kept[index][1],
+            score=round(float(min(abs(score[index]), 1e6)), 2),
+            details={
+                'worked_hours': round(float(worked[index]), 2),
+                'expected_hours': round(float(expected[index]), 2),
+            },
+        )
+        for index in np.flatnonzero(flagged)
+    ]
+
+
+def detect_punch_anomalies(month_start: date) -> Dict[str, int]:
+    """Analyse one month of punches and attendance and store the flagged cases.
+
+    Open anomalies of the month are replaced; ones already reviewed are kept
+    and not flagged again.
+    """
+    month_start = month_start.replace(day=1)
+    punches = MonthPunches(month_start)
+    anomalies = (
+        _device_conflicts(punches)
+        + _excessive_punches(punches)
+        + _rounded_times(punches, month_start)
+        + _hours_outliers(punches.days)
+    )
+    with transaction.atomic():
+        PunchAnomaly.objects.filter(
+            date__gte=punches.days[0], date__lte=punches.days[-1], status='Open',
+        ).delete()
+        PunchAnomaly.objects.bulk_create(anomalies, batch_size=1000, ignore_conflicts=True)
+
+    counts = {kind: 0 for kind, _ in PunchAnomaly.KIND_CHOICES}
+    for anomaly in anomalies:
+        counts[anomaly.kind] += 1
+    return counts
+
+
+def detect_month_anomalies(month_start: date) -> Tuple[date, Dict[str, int]]:
+    """``detect_punch_anomalies`` tagged with its month, for process pools that yield in completion order."""
+    return month_start, detect_punch_anomalies(month_start)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import BiometricPunch, BiometricPunchArchive, PunchPayloadBlob
+from .payload_utils import expand_payload
+from .stream_utils import chunked
+
+
+ARCHIVE_FIELDS = [
+    'punch_id',
+    'integration_id',
+    'employee_id',
+    'employee_identifier',
+    'device_id',
+    'punch_time',
+    'direction',
+    'raw_payload',
+    'payload_blob_id',
+    'created_at',
+]
+
+
+def hot_window_start(now: datetime | None = None) -> datetime:
+    """Oldest punch time still kept in ``biometric_punches``."""
+    now = now or timezone.now()
+    return now - timedelta(days=settings.BIOMETRIC_PUNCH_RETENTION_DAYS)
+
+
+def _next_month(month_start: datetime) -> datetime:
+    return (month_start + timedelta(days=32)).replace(day=1)
+
+
+def archive_punches(cutoff: datetime, batch_size: int = 5000) -> List[BiometricPunchArchive]:
+    """Move punches older than ``cutoff`` into one NDJSON.gz file per integration and month."""
+    groups = (
+        BiometricPunch.objects
+        .filter(punch_time__lt=cutoff)
+        .annotate(month=TruncMonth('punch_time'))
+        .values_list('integration_id', 'month')
+        .distinct()
+        .order_by('month', 'integration_id')
+    )
+    archives = []
+    for integration_id, month_start in list(groups):
+        month_end = min(_next_month(month_start), cutoff)
+        archive = _archive_group(integration_id, month_start, month_end, batch_size)
+        if archive:
+            archives.append(archive)
+    return archives
+
+
+def _archive_group(integration_id: int, start: datetime, end: datetime, batch_size: int) -> BiometricPunchArchive | None:
+    punches = BiometricPunch.objects.filter(
+        integration_id=integration_id,
+        punch_time__gte=start,
+        punch_time__lt=end,
+    )
+    count = 0
+    max_punch_id = None
+    first_punch_at = last_punch_at = None
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        with gzip.GzipFile(fileobj=spool, mode='wb') as archive_file:
+            rows = (
+                punches.order_by('punch_id')
+                .values(*ARCHIVE_FIELDS, 'payload_blob__data')
+                .iterator(chunk_size=batch_size)
+            )
+            for row in rows:
+                # Archives are self-contained: write the expanded item alongside the blob id.
+                blob_data = row.pop('payload_blob__data')
+                if row['raw_payload'] is None and blob_data is not None:
+                    row['raw_payload'] = expand_payload(
+                        blob_data,
+                        row['employee_identifier'],
+                        row['punch_time'],
+                        row['direction'],
+                    )
+                archive_file.write(json.dumps(row, cls=DjangoJSONEncoder).encode('utf-8') + b'\n')
+                count += 1
+                max_punch_id = row['punch_id']
+                if first_punch_at is None or row['punch_time'] < first_punch_at:
+                    first_punch_at = row['punch_time']
+                if last_punch_at is None or row['punch_time'] > last_punch_at:
+                    last_punch_at = row['punch_time']
+        if not count:
+            return None
+
+        spool.seek(0)
+        archive = BiometricPunchArchive(
+            integration_id=integration_id,
+            month=start.date(),
+            punch_count=count,
+            first_punch_at=first_punch_at,
+            last_punch_at=last_punch_at,
+        )
+        filename = f"{integration_id}/{start:%Y-%m}-{timezone.now():%Y%m%d%H%M%S}.ndjson.gz"
+        archive.file.save(filename, File(spool), save=False)
+
+    try:
+        with transaction.atomic():
+            archive.save()
+            # Punches inserted while the file was being written are left for the next run.
+            punches.filter(punch_id__lte=max_punch_id).delete()
+    except Exception:
+        # The punches are still in the table; do not leave an orphan file behind.
+        archive.file.delete(save=False)
+        raise
+    return archive
+
+
+def iter_archive_rows(archive: BiometricPunchArchive) -> Iterator[Dict[str, Any]]:
+    with archive.file.open('rb') as stored, gzip.GzipFile(fileobj=stored, mode='rb') as archive_file:
+        for line in archive_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore_archive(archive: BiometricPunchArchive, batch_size: int = 5000) -> int:
+    """Re-insert an archive's punches (keeping their ids) and drop the archive.
+
+    Restored punches are usually older than the hot window: the punch list
+    shows them only with ``include_restored``, and the next archive run
+    archives them again. Returns the number of punches actually inserted;
+    ids already in the table are skipped.
+    """
+    restored = 0
+    with transaction.atomic():
+        for rows in chunked(iter_archive_rows(archive), batch_size):
+            known_blobs = set(
+                PunchPayloadBlob.objects
+                .filter(digest__in={row['payload_blob_id'] for row in rows if row.get('payload_blob_id')})
+                .values_list('digest', flat=True)
+            )
+            present = set(
+                BiometricPunch.objects
+                .filter(punch_id__in=[row['punch_id'] for row in rows])
+                .values_list('punch_id', flat=True)
+            )
+            batch = []
+            for row in rows:
+                if row['punch_id'] in present:
+                    continue
+                # created_at is auto_now_add and is re-stamped on insert.
+                row.pop('created_at', None)
+                row['punch_time'] = parse_datetime(row['punch_time'])
+                if row.get('payload_blob_id') in known_blobs:
+                    row['raw_payload'] = None
+                else:
+                    row['payload_blob_id'] = None
+                batch.append(BiometricPunch(**row))
+            # bulk_create returns every object it was given, inserted or not.
+            BiometricPunch.objects.bulk_create(batch, ignore_conflicts=True)
+            restored += len(batch)
+        archive.delete()
+    archive.file.delete(save=False)
+    return restored
@@ -1,22 +1,127 @@
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+from django.db import transaction
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 from employees.models import Employee
-from .models import Attendance, BiometricIntegration, BiometricPunch
-from .timesheet_utils import update_timesheet_from_attendance
+from .derivation_utils import apply_punches, rederive_attendance
+from .models import BiometricIntegration, BiometricPunch
+from .live_utils import publish_punches
+from .occupancy_utils import record_occupancy
+from .payload_utils import store_payload_blobs
+from .shift_utils import ShiftResolver
+from .stream_utils import PunchStreamError, chunked
+from .tz_utils import DayBoundaries, day_boundaries, integration_timezone
 
 
-def _get_nested_value(payload: Dict[str, Any], field_path: str) -> Optional[Any]:
+Accessor = Callable[[Dict[str, Any]], Any]
+
+
+@dataclass(frozen=True)
+class PunchExtractor:
+    """Field accessors compiled from an integration's ``data_mapping``."""
+    employee_identifier: Accessor
+    timestamp: Accessor
+    direction: Accessor
+    employee_identifier_type: str
+    # Paths each normalized field is read from, in the order the accessor
+    # tries them (mapped path, then top-level fallback keys); used to split
+    # the raw item into normalized columns and the remaining device envelope.
+    field_sources: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+
+
+def _compile_accessor(field_path: str | None) -> Accessor:
     if not field_path:
-        return None
-    value = payload
-    for part in field_path.split('.'):
-        if not isinstance(value, dict):
-            return None
-        value = value.get(part)
-    return value
+        return lambda item: None
+    parts = tuple(field_path.split('.'))
+    if len(parts) == 1:
+        key = parts[0]
+        return lambda item: item.get(key)
+    if len(parts) == 2:
+        outer, inner = parts
+
+        def nested_accessor(item: Dict[str, Any]) -> Any:
+            value = item.get(outer)
+            return value.get(inner) if isinstance(value, dict) else None
+        return nested_accessor
+
+    def accessor(item: Dict[str, Any]) -> Any:
+        value: Any = item
+        for part in parts:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+    return accessor
+
+
+def _with_fallbacks(primary: Accessor, *keys: str) -> Accessor:
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda item: primary(item) or item.get(key)
+    if len(keys) == 2:
+        first, second = keys
+        return lambda item: primary(item) or item.get(first) or item.get(second)
+
+    def accessor(item: Dict[str, Any]) -> Any:
+        value = primary(item)
+        for key in keys:
+            if value:
+                break
+            value = item.get(key)
+        return value
+    return accessor
+
+
+@lru_cache(maxsize=128)
+def _compile_mapping(mapping_json: str) -> PunchExtractor:
+    mapping = json.loads(mapping_json)
+    employee_field = mapping.get('employee_identifier_field', 'employee_id')
+    timestamp_field = mapping.get('timestamp_field', 'timestamp')
+    direction_field = mapping.get('direction_field', 'direction')
+    return PunchExtractor(
+        employee_identifier=_with_fallbacks(_compile_accessor(employee_field), 'employee_id'),
+        timestamp=_with_fallbacks(_compile_accessor(timestamp_field), 'timestamp', 'time'),
+        direction=_compile_accessor(direction_field),
+        employee_identifier_type=mapping.get('employee_identifier_type', 'employee_id'),
+        field_sources=tuple(
+            (name, tuple(path for path in (mapped, *fallbacks) if path))
+            for name, mapped, fallbacks in (
+                ('employee_identifier', employee_field, ('employee_id',)),
+                ('timestamp', timestamp_field, ('timestamp', 'time')),
+                ('direction', direction_field, ()),
+            )
+        ),
+    )
+
+
+def get_punch_extractor(data_mapping: Dict[str, Any] | None) -> PunchExtractor:
+    """Return the compiled extractor for a mapping, cached by its canonical JSON."""
+    return _compile_mapping(json.dumps(data_mapping or {}, sort_keys=True, default=str))
+
+
+def parse_timestamps(values: Iterable[Any], default_tz: tzinfo | None = None) -> List[Optional[datetime]]:
+    """Parse ISO-8601 timestamps in one pass; unparseable values become ``None``."""
+    tz = default_tz or timezone.get_current_timezone()
+    parsed: List[Optional[datetime]] = []
+    for value in values:
+        if not value:
+            parsed.append(None)
+            continue
+        try:
+            punch_time = datetime.fromisoformat(str(value))
+        except ValueError:
+            parsed.append(None)
+            continue
+        if punch_time.tzinfo is None:
+            punch_time = timezone.make_aware(punch_time, tz)
+        parsed.append(punch_time)
+    return parsed
 
 
 def resolve_employee(identifier: Any, identifier_type: str | None) -> Optional[Employee]:
@@ -32,66 +137,151 @@ def resolve_employee(identifier: Any, identifier_type: str | None) -> Optional[E
     return Employee.objects.filter(email__iexact=identifier_value).first()
 
 
-def parse_punch_payload(integration: BiometricIntegration, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
-    mapping = integration.data_mapping or {}
-    employee_field = mapping.get('employee_identifier_field', 'employee_id')
-    employee_type = mapping.get('employee_identifier_type', 'employee_id')
-    timestamp_field = mapping.get('timestamp_field', 'timestamp')
-    direction_field = mapping.get('direction_field', 'direction')
+def resolve_employees(identifiers: Iterable[Any], identifier_type: str | None) -> Dict[str, Employee]:
+    """Bulk variant of ``resolve_employee``; keys are the normalized identifiers."""
+    values = {str(identifier).strip() for identifier in identifiers if identifier}
+    values.discard('')
+    if not values:
+        return {}
+    if identifier_type == 'employee_id':
+        numeric = {value for value in values if value.isdigit()}
+        if not numeric:
+            return {}
+        employees = Employee.objects.filter(employee_id__in=[int(value) for value in numeric])
+        return {str(employee.employee_id): employee for employee in employees}
+    employees = (
+        Employee.objects
+        .annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=[value.lower() for value in values])
+    )
+    return {employee.email_lower: employee for employee in employees}
 
-    records = payload.get('punches')
-    if isinstance(records, list):
-        punch_items = records
-    else:
-        punch_items = [payload]
 
-    parsed: List[Dict[str, Any]] = []
-    for item in punch_items:
+def parse_punch_items(integration: BiometricIntegration, items: Iterable[Any]) -> List[Dict[str, Any]]:
+    extractor = get_punch_extractor(integration.data_mapping)
+    identifier_type = extractor.employee_identifier_type
+    get_identifier = extractor.employee_identifier
+    get_timestamp = extractor.timestamp
+    get_direction = extractor.direction
+
+    punch_items: List[Dict[str, Any]] = []
+    identifiers: List[Any] = []
+    timestamps: List[Any] = []
+    for item in items:
         if not isinstance(item, dict):
             continue
-        employee_identifier = _get_nested_value(item, employee_field) or item.get('employee_id')
-        timestamp_raw = _get_nested_value(item, timestamp_field) or item.get('timestamp') or item.get('time')
-        direction = _get_nested_value(item, direction_field)
+        timestamp_raw = get_timestamp(item)
         if not timestamp_raw:
             continue
-        try:
-            punch_time = datetime.fromisoformat(str(timestamp_raw).replace('Z', '+00:00'))
-        except ValueError:
-            continue
-        if timezone.is_naive(punch_time):
-            punch_time = timezone.make_aware(punch_time, timezone.get_current_timezone())
+        punch_items.append(item)
+        identifiers.append(get_identifier(item))
+        timestamps.append(timestamp_raw)
+
+    # Devices report local wall-clock time; naive timestamps are read in the site's timezone.
+    punch_times = parse_timestamps(timestamps, integration_timezone(integration))
+    employees = resolve_employees(identifiers, identifier_type)
+    normalize_key = str.lower if identifier_type != 'employee_id' else None
 
-        employee = resolve_employee(employee_identifier, employee_type)
+    parsed: List[Dict[str, Any]] = []
+    for item, employee_identifier, punch_time in zip(punch_items, identifiers, punch_times):
+        if punch_time is None:
+            continue
+        employee = None
+        identifier_value = str(employee_identifier) if employee_identifier else None
+        if identifier_value and employees:
+            lookup_key = identifier_value.strip()
+            employee = employees.get(normalize_key(lookup_key) if normalize_key else lookup_key)
         parsed.append({
             'employee': employee,
-            'employee_identifier': str(employee_identifier) if employee_identifier else None,
+            'employee_identifier': identifier_value,
             'punch_time': punch_time,
-            'direction': direction,
+            'direction': get_direction(item),
             'raw_payload': item,
         })
     return parsed
 
 
-def update_attendance_from_punch(employee: Employee, punch_time: datetime) -> None:
-    day = punch_time.date()
-    punches = BiometricPunch.objects.filter(employee=employee, punch_time__date=day).order_by('punch_time')
+def parse_punch_payload(integration: BiometricIntegration, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    records = payload.get('punches')
+    if isinstance(records, list):
+        punch_items = records
+    else:
+        punch_items = [payload]
+    return parse_punch_items(integration, punch_items)
+
+
+def ingest_punch_items(
+    integration: BiometricIntegration,
+    items: Iterable[Any],
+    chunk_size: int,
+    device_id: Optional[str] = None,
+) -> int:
+    """Parse, store and derive attendance for punch items in fixed-size chunks.
+
+    Each chunk is committed in its own transaction, so a large push never
+    holds one long transaction. If reading the items fails part-way, the
+    ``PunchStreamError`` carries the number of punches already committed.
+    """
+    device_id = device_id or integration.device_id
+    extractor = get_punch_extractor(integration.data_mapping)
+    tz = integration_timezone(integration)
+    boundaries = day_boundaries(tz)
+    created = 0
+    try:
+        for chunk in chunked(items, chunk_size):
+            with transaction.atomic():
+                created += _ingest_chunk(integration, chunk, device_id, extractor, tz, boundaries)
+    except PunchStreamError as exc:
+        exc.created = created
+        raise
+    return created
+
+
+def _ingest_chunk(
+    integration: BiometricIntegration,
+    chunk: List[Any],
+    device_id: Optional[str],
+    extractor: PunchExtractor,
+    tz: tzinfo,
+    boundaries: DayBoundaries,
+) -> int:
+    punches = parse_punch_items(integration, chunk)
     if not punches:
-        return
-
-    first_punch = punches.first().punch_time
-    last_punch = punches.last().punch_time
-    working_hours = 0
-    if first_punch and last_punch and last_punch >= first_punch:
-        working_hours = round((last_punch - first_punch).total_seconds() / 3600, 2)
-
-    attendance, _ = Attendance.objects.get_or_create(
-        employee=employee,
-        date=day,
-        defaults={'status': 'Present'},
-    )
-    attendance.clock_in_time = first_punch.time()
-    attendance.clock_out_time = last_punch.time()
-    attendance.working_hours = working_hours
-    attendance.status = 'Present'
-    attendance.save(update_fields=['clock_in_time', 'clock_out_time', 'working_hours', 'status', 'updated_at'])
-    update_timesheet_from_attendance(attendance, source='Biometric')
+        return 0
+    digests = store_payload_blobs((punch_data['raw_payload'] for punch_data in punches), extractor)
+    BiometricPunch.objects.bulk_create([
+        BiometricPunch(
+            integration=integration,
+            employee=punch_data['employee'],
+            employee_identifier=punch_data['employee_identifier'],
+            device_id=device_id,
+            punch_time=punch_data['punch_time'],
+            direction=punch_data['direction'],
+            payload_blob_id=digest,
+        )
+        for punch_data, digest in zip(punches, digests)
+    ])
+    record_occupancy(integration.integration_id, device_id, punches)
+    publish_punches(integration.integration_id, device_id, punches)
+
+    by_employee: Dict[int, Tuple[Employee, List[Tuple[datetime, Any]]]] = {}
+    for punch_data in punches:
+        employee = punch_data['employee']
+        if employee:
+            by_employee.setdefault(employee.employee_id, (employee, []))[1].append(
+                (punch_data['punch_time'], punch_data['direction'])
+            )
+    if by_employee:
+        punch_days = [boundaries.day_of(punch_data['punch_time']) for punch_data in punches]
+        resolver = ShiftResolver(
+            by_employee.keys(),
+            min(punch_days) - timedelta(days=1),
+            max(punch_days) + timedelta(days=1),
+        )
+        for employee, employee_punches in by_employee.values():
+            apply_punches(employee, employee_punches, shift_lookup=resolver, tz=tz)
+    return len(punches)
+
+
+def update_attendance_from_punch(employee: Employee, punch_time: datetime, tz: tzinfo | None = None) -> None:
+    rederive_attendance(employee, punch_time, tz=tz)
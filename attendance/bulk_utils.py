@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List
+
+from django.db import transaction
+
+from .live_utils import publish_attendance
+from .models import Attendance
+from .shift_utils import ShiftResolver
+from .timesheet_utils import _calculate_working_hours, upsert_timesheets_from_attendance
+
+
+# Uploaded rows replace any punch pairing, so the pairing columns are reset
+# with them; the row then counts as hand-entered (see has_manual_times).
+BULK_ATTENDANCE_FIELDS = [
+    'clock_in_time', 'clock_out_time', 'working_hours', 'status', 'notes',
+    'first_punch_at', 'last_punch_at', 'open_punch_at', 'last_out_at',
+    'worked_seconds', 'break_seconds', 'updated_at',
+]
+
+
+def bulk_upsert_attendance(
+    records: Iterable[Dict[str, Any]],
+    source: str = 'Attendance',
+    batch_size: int = 1000,
+) -> Dict[str, int]:
+    """Create or overwrite attendance rows in bulk, then recompute their timesheets once.
+
+    ``records`` are validated dicts with ``employee`` (id), ``date`` and the
+    attendance columns; each (employee, date) may appear only once. Rows
+    are written with one upsert, and the timesheets of every affected day
+    are recomputed afterwards in a single pass sharing one shift lookup,
+    instead of once per row. Missing working hours are derived from the
+    clock times, and any punch pairing saved on an overwritten row is
+    cleared.
+    """
+    attendances: List[Attendance] = []
+    for record in records:
+        attendance = Attendance(
+            employee_id=record['employee'],
+            date=record['date'],
+            clock_in_time=record.get('clock_in_time'),
+            clock_out_time=record.get('clock_out_time'),
+            working_hours=record.get('working_hours'),
+            status=record.get('status') or 'Present',
+            notes=record.get('notes'),
+        )
+        if attendance.working_hours is None:
+            attendance.working_hours = _calculate_working_hours(attendance)
+        attendances.append(attendance)
+    if not attendances:
+        return {'created': 0, 'updated': 0, 'timesheets': 0}
+
+    employee_ids = {attendance.employee_id for attendance in attendances}
+    days = [attendance.date for attendance in attendances]
+    keys = {(attendance.employee_id, attendance.date) for attendance in attendances}
+    with transaction.atomic():
+        existing = sum(
+            1
+            for key in Attendance.objects.filter(
+                employee_id__in=employee_ids,
+                date__gte=min(days),
+                date__lte=max(days),
+            ).values_list('employee_id', 'date')
+            if key in keys
+        )
+        Attendance.objects.bulk_create(
+            attendances,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['employee', 'date'],
+            update_fields=BULK_ATTENDANCE_FIELDS,
+        )
+        publish_attendance(attendances)
+        timesheets = upsert_timesheets_from_attendance(
+            attendances,
+            ShiftResolver(employee_ids, min(days), max(days)),
+            source=source,
+            batch_size=batch_size,
+        )
+    return {'created': len(attendances) - existing, 'updated': existing, 'timesheets': timesheets}
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Count, F, Func, IntegerField, Max, QuerySet, Subquery
+from django.utils import timezone
+
+from leave_management.models import Holiday, LeaveRequest
+
+from .models import Attendance
+
+
+CALENDAR_LEGEND = {
+    'P': 'Present',
+    'A': 'Absent',
+    'L': 'Leave',
+    'H': 'Half Day',
+    'O': 'Holiday',
+    '-': 'No record',
+}
+
+_STATUS_CODES = {'Present': 'P', 'Absent': 'A', 'Leave': 'L', 'Half Day': 'H'}
+
+
+def month_bounds(month: Optional[str]) -> Tuple[date, date]:
+    """First and last day of a ``YYYY-MM`` month; defaults to the current month."""
+    if month:
+        year, _, number = month.partition('-')
+        start = date(int(year), int(number), 1)
+    else:
+        start = timezone.localdate().replace(day=1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+
+def _scoped(queryset: QuerySet, employees: QuerySet) -> QuerySet:
+    return queryset.filter(employee_id__in=employees.values('employee_id'))
+
+
+def _month_leaves(employees: QuerySet, start: date, end: date) -> QuerySet:
+    return _scoped(LeaveRequest.objects, employees).filter(start_date__lte=end, end_date__gte=start)
+
+
+def month_holidays(start: date, end: date) -> List[Tuple[date, str]]:
+    return list(
+        Holiday.objects
+        .filter(is_active=True, date__range=(start, end))
+        .order_by('date')
+        .values_list('date', 'name')
+    )
+
+
+def _scalar(queryset: QuerySet, function: str, field: str, output_field=None) -> Max:
+    # Func (not an aggregate) keeps the subquery free of GROUP BY, so it
+    # yields a single row; Max() lets it sit inside the outer aggregate.
+    value = Func(F(field), function=function, output_field=output_field)
+    return Max(Subquery(queryset.order_by().annotate(value=value).values('value')[:1]))
+
+
+def calendar_etag(employees: QuerySet, start: date, end: date, holidays: List[Tuple[date, str]]) -> str:
+    """Cheap fingerprint of everything the month matrix is built from.
+
+    Row counts and the latest ``updated_at`` catch inserts, edits and deletes
+    without reading the rows themselves. Employees, attendance and leave are
+    fingerprinted in a single query; ``holidays`` are the month's holidays,
+    fetched once and shared with ``build_attendance_calendar``.
+    """
+    attendance = _scoped(Attendance.objects, employees).filter(date__range=(start, end))
+    leaves = _month_leaves(employees, start, end)
+    signature = {
+        'range': (start, end),
+        'scope': str(employees.values('employee_id').query),
+        'counts': employees.aggregate(
+            employees=Count('employee_id'),
+            employees_last=Max('updated_at'),
+            attendance=_scalar(attendance, 'COUNT', 'attendance_id', IntegerField()),
+            attendance_last=_scalar(attendance, 'MAX', 'updated_at'),
+            leaves=_scalar(leaves, 'COUNT', 'leave_id', IntegerField()),
+            leaves_last=_scalar(leaves, 'MAX', 'updated_at'),
+        ),
+        'holidays': holidays,
+    }
+    digest = hashlib.sha1(json.dumps(signature, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_attendance_calendar(
+    employees: QuerySet,
+    start: date,
+    end: date,
+    holidays: Optional[List[Tuple[date, str]]] = None,
+) -> Dict[str, Any]:
+    """Month matrix of day codes (see ``CALENDAR_LEGEND``) for ``employees``.
+
+    Each employee gets one character per day. A recorded attendance status
+    wins over an approved leave, which wins over a holiday.
+    """
+    days = (end - start).days + 1
+    if holidays is None:
+        holidays = month_holidays(start, end)
+    base = ['-'] * days
+    for day, _ in holidays:
+        base[(day - start).days] = 'O'
+
+    rows = list(
+        employees
+        .order_by('first_name', 'last_name', 'employee_id')
+        .values('employee_id', 'first_name', 'last_name', 'department_id', 'department__name')
+    )
+    cells = {row['employee_id']: list(base) for row in rows}
+    leaves: Dict[int, List[Dict[str, Any]]] = {row['employee_id']: [] for row in rows}
+
+    approved = (
+        _month_leaves(employees, start, end)
+        .filter(status='Approved')
+        .order_by('start_date')
+        .values('leave_id', 'employee_id', 'leave_type', 'start_date', 'end_date')
+    )
+    for leave in approved:
+        first = max(leave['start_date'], start)
+        last = min(leave['end_date'], end)
+        days_off = cells[leave['employee_id']]
+        for offset in range((first - start).days, (last - start).days + 1):
+            days_off[offset] = 'L'
+        leaves[leave.pop('employee_id')].append(leave)
+
+    records = (
+        _scoped(Attendance.objects, employees)
+        .filter(date__range=(start, end))
+        .values_list('employee_id', 'date', 'status')
+    )
+    for employee_id, day, status in records:
+        cells[employee_id][(day - start).days] = _STATUS_CODES.get(status, '-')
+
+    return {
+        'month': start.strftime('%Y-%m'),
+        'start_date': start,
+        'end_date': end,
+        'legend': CALENDAR_LEGEND,
+        'holidays': [{'date': day, 'name': name} for day, name in holidays],
+        'employees': [
+            {
+                'employee_id': row['employee_id'],
+                'name': f"{row['first_name']} {row['last_name']}",
+                'department': row['department_id'],
+                'department_name': row['department__name'],
+                'days': ''.join(cells[row['employee_id']]),
+                'leaves': leaves[row['employee_id']],
+            }
+            for row in rows
+        ],
+    }
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Attendance
+
+
+# Both statements are accepted verbatim by PostgreSQL and SQLite (3.35+ for
+# RETURNING).
+_CLOCK_IN_SQL = f"""
+    INSERT INTO {Attendance._meta.db_table}
+        (employee_id, date, clock_in_time, working_hours, status,
+         worked_seconds, break_seconds, created_at, updated_at)
+    VALUES (%s, %s, %s, 0, 'Present', 0, 0, %s, %s)
+    ON CONFLICT (employee_id, date) DO UPDATE SET
+        clock_in_time = EXCLUDED.clock_in_time,
+        status = 'Present',
+        updated_at = EXCLUDED.updated_at
+    WHERE {Attendance._meta.db_table}.clock_in_time IS NULL
+"""
+
+# A clock-out repeated within the debounce window (a double tap) keeps the
+# first time instead of moving it forward; CASE expressions see the old row,
+# and the returned flag tells whether this statement wrote the time.
+_CLOCK_OUT_SQL = f"""
+    UPDATE {Attendance._meta.db_table}
+    SET clock_out_time = CASE
+            WHEN clock_out_time IS NOT NULL AND updated_at >= %s THEN clock_out_time
+            ELSE %s
+        END,
+        updated_at = CASE
+            WHEN clock_out_time IS NOT NULL AND updated_at >= %s THEN updated_at
+            ELSE %s
+        END
+    WHERE attendance_id = (
+        SELECT attendance_id FROM {Attendance._meta.db_table}
+        WHERE employee_id = %s
+          AND clock_in_time IS NOT NULL
+          AND (date = %s OR (date = %s AND clock_out_time IS NULL))
+        ORDER BY date DESC
+        LIMIT 1
+    )
+    RETURNING date, updated_at = %s
+"""
+
+
+def _adapt(day: date, moment: time, now: datetime) -> tuple:
+    ops = connection.ops
+    return (
+        ops.adapt_datefield_value(day),
+        ops.adapt_timefield_value(moment),
+        ops.adapt_datetimefield_value(now),
+    )
+
+
+def record_clock_in(employee_id: int, now: datetime, local_now: datetime) -> bool:
+    """Upsert today's clock-in in one statement; returns False if already clocked in."""
+    day, moment, stamp = _adapt(local_now.date(), local_now.time().replace(microsecond=0), now)
+    with connection.cursor() as cursor:
+        cursor.execute(_CLOCK_IN_SQL, [employee_id, day, moment, stamp, stamp])
+        return cursor.rowcount > 0
+
+
+def record_clock_out(employee_id: int, now: datetime, local_now: datetime) -> Optional[Tuple[date, bool]]:
+    """Close today's attendance, or yesterday's if it is still open (overnight shifts).
+
+    Returns the attendance date and whether the clock-out time was written;
+    a repeat within ``ATTENDANCE_CLOCK_OUT_DEBOUNCE_SECONDS`` of the last
+    clock-out leaves it unchanged. Returns ``None`` when there is no
+    clock-in to close.
+    """
+    today = local_now.date()
+    yesterday = today - timedelta(days=1)
+    ops = connection.ops
+    _, moment, stamp = _adapt(today, local_now.time().replace(microsecond=0), now)
+    debounce = ops.adapt_datetimefield_value(now - timedelta(seconds=settings.ATTENDANCE_CLOCK_OUT_DEBOUNCE_SECONDS))
+    with connection.cursor() as cursor:
+        cursor.execute(_CLOCK_OUT_SQL, [
+            debounce,
+            moment,
+            debounce,
+            stamp,
+            employee_id,
+            ops.adapt_datefield_value(today),
+            ops.adapt_datefield_value(yesterday),
+            stamp,
+        ])
+        row = cursor.fetchone()
+    if not row:
+        return None
+    attendance_date = row[0] if isinstance(row[0], date) else date.fromisoformat(row[0])
+    return attendance_date, bool(row[1])
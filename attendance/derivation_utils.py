@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Attendance, BiometricPunch
+from .shift_utils import ShiftLookup, ShiftResolver, ShiftWindow, get_assigned_shift, resolve_shift_window
+from .timesheet_utils import update_timesheet_from_attendance, upsert_timesheets_from_attendance
+from .tz_utils import day_boundaries
+
+
+IN = 'IN'
+OUT = 'OUT'
+
+# Device direction codes. ZKTeco/eSSL states: 0 check-in, 1 check-out,
+# 2 break-out, 3 break-in, 4 overtime-in, 5 overtime-out.
+_IN_DIRECTIONS = {
+    'in', 'i', 'entry', 'checkin', 'check-in', 'check_in', 'clockin', 'clock-in', 'clock_in',
+    'breakin', 'break-in', 'break_in', 'otin', 'ot-in', 'ot_in', '0', '3', '4',
+}
+_OUT_DIRECTIONS = {
+    'out', 'o', 'exit', 'checkout', 'check-out', 'check_out', 'clockout', 'clock-out', 'clock_out',
+    'breakout', 'break-out', 'break_out', 'otout', 'ot-out', 'ot_out', '1', '2', '5',
+}
+
+
+def normalize_direction(direction: Any) -> Optional[str]:
+    if direction is None:
+        return None
+    value = str(direction).strip().lower()
+    if value in _IN_DIRECTIONS:
+        return IN
+    if value in _OUT_DIRECTIONS:
+        return OUT
+    return None
+
+
+@dataclass
+class PunchPairingState:
+    """Running IN/OUT pairing for one attendance date.
+
+    Punches are applied in time order. Time between an OUT and the next IN
+    is counted as break, so appending a punch never needs earlier punches.
+    """
+    first_punch_at: Optional[datetime] = None
+    last_punch_at: Optional[datetime] = None
+    open_punch_at: Optional[datetime] = None
+    last_out_at: Optional[datetime] = None
+    worked_seconds: int = 0
+    break_seconds: int = 0
+
+    @classmethod
+    def from_attendance(cls, attendance: Attendance) -> 'PunchPairingState':
+        return cls(
+            first_punch_at=attendance.first_punch_at,
+            last_punch_at=attendance.last_punch_at,
+            open_punch_at=attendance.open_punch_at,
+            last_out_at=attendance.last_out_at,
+            worked_seconds=attendance.worked_seconds or 0,
+            break_seconds=attendance.break_seconds or 0,
+        )
+
+    def accepts(self, punch_time: datetime) -> bool:
+        return self.last_punch_at is None or punch_time >= self.last_punch_at
+
+    def _last_kind(self) -> Optional[str]:
+        if self.last_punch_at is None:
+            return None
+        if self.open_punch_at == self.last_punch_at:
+            return IN
+        if self.last_out_at == self.last_punch_at:
+            return OUT
+        return None
+
+    def is_duplicate(self, punch_time: datetime, kind: Optional[str]) -> bool:
+        """A punch at the instant of the last one is a resend unless it explicitly reverses it."""
+        if punch_time != self.last_punch_at:
+            return False
+        last_kind = self._last_kind()
+        return kind is None or last_kind is None or kind == last_kind
+
+    def apply(self, punch_time: datetime, direction: Any) -> None:
+        kind = normalize_direction(direction)
+        if self.is_duplicate(punch_time, kind):
+            # Devices resend punches; without a direction a resend would flip every later pairing.
+            return
+        if kind is None:
+            # Devices without a direction alternate IN/OUT.
+            kind = OUT if self.open_punch_at else IN
+
+        if self.first_punch_at is None:
+            self.first_punch_at = punch_time
+        self.last_punch_at = punch_time
+
+        if kind == IN:
+            if self.open_punch_at:
+                return  # repeated IN: keep the earliest
+            if self.last_out_at:
+                self.break_seconds += int((punch_time - self.last_out_at).total_seconds())
+            self.open_punch_at = punch_time
+            return
+
+        if self.open_punch_at:
+            self.worked_seconds += int((punch_time - self.open_punch_at).total_seconds())
+            self.open_punch_at = None
+        elif self.last_out_at:
+            # Repeated OUT extends the session that just closed.
+            self.worked_seconds += int((punch_time - self.last_out_at).total_seconds())
+        else:
+            return  # OUT with nothing to close
+        self.last_out_at = punch_time
+
+    def working_seconds(self, window: ShiftWindow) -> int:
+        # Subtract the part of the scheduled break that was not punched out,
+        # but only for sessions long enough to have included that break.
+        worked = self.worked_seconds
+        if worked * 2 >= window.scheduled_seconds:
+            worked -= max(window.scheduled_break_seconds - self.break_seconds, 0)
+        return max(worked, 0)
+
+    def write_to(self, attendance: Attendance, window: ShiftWindow) -> None:
+        tz = window.start.tzinfo
+        attendance.first_punch_at = self.first_punch_at
+        attendance.last_punch_at = self.last_punch_at
+        attendance.open_punch_at = self.open_punch_at
+        attendance.last_out_at = self.last_out_at
+        attendance.worked_seconds = self.worked_seconds
+        attendance.break_seconds = self.break_seconds
+        attendance.clock_in_time = (
+            timezone.localtime(self.first_punch_at, tz).time() if self.first_punch_at else None
+        )
+        attendance.clock_out_time = (
+            timezone.localtime(self.last_out_at, tz).time() if self.last_out_at else None
+        )
+        attendance.working_hours = round(self.working_seconds(window) / 3600, 2)
+        # Punches prove presence, but a leave or half day recorded for the date stands.
+        if attendance.status in (None, '', 'Absent'):
+            attendance.status = 'Present'
+
+
+def has_manual_times(attendance: Attendance) -> bool:
+    """Clock times entered by hand (clock API, upload, regularization) rather than paired from punches.
+
+    Derivation leaves such rows alone; the punches stay stored.
+    """
+    return attendance.last_punch_at is None and bool(attendance.clock_in_time or attendance.clock_out_time)
+
+
+DERIVED_FIELDS = [
+    'first_punch_at', 'last_punch_at', 'open_punch_at', 'last_out_at',
+    'worked_seconds', 'break_seconds', 'clock_in_time', 'clock_out_time',
+    'working_hours', 'status', 'updated_at',
+]
+
+
+def _memoized(shift_lookup: ShiftLookup) -> ShiftLookup:
+    cache: Dict[Tuple[int, Any], Any] = {}
+
+    def lookup(employee, day):
+        key = (getattr(employee, 'pk', employee), day)
+        if key not in cache:
+            cache[key] = shift_lookup(employee, day)
+        return cache[key]
+    return lookup
+
+
+def _window_punches(employee, window: ShiftWindow, shift_lookup: ShiftLookup) -> List[Tuple[datetime, Any]]:
+    punches = (
+        BiometricPunch.objects
+        .filter(employee=employee, punch_time__gte=window.start, punch_time__lt=window.end)
+        .order_by('punch_time', 'punch_id')
+        .values_list('punch_time', 'direction')
+    )
+    return [
+        (punch_time, direction)
+        for punch_time, direction in punches
+        if resolve_shift_window(employee, punch_time, shift_lookup, window.start.tzinfo).date == window.date
+    ]
+
+
+def apply_punches(
+    employee,
+    punches: Iterable[Tuple[datetime, Any]],
+    shift_lookup: ShiftLookup = get_assigned_shift,
+    tz: tzinfo | None = None,
+) -> List[Attendance]:
+    """Fold newly stored punches into the employee's attendance.
+
+    Punches are grouped by shift window in the site timezone ``tz``. Punches
+    that arrive in order are appended to the saved pairing state; an
+    out-of-order punch triggers a rescan of that window only. Dates whose
+    clock times were entered by hand are skipped (see ``has_manual_times``).
+    """
+    shift_lookup = _memoized(shift_lookup)
+    windows: Dict[Any, Tuple[ShiftWindow, List[Tuple[datetime, Any]]]] = {}
+    for punch_time, direction in sorted(punches, key=lambda punch: punch[0]):
+        window = resolve_shift_window(employee, punch_time, shift_lookup, tz)
+        windows.setdefault(window.date, (window, []))[1].append((punch_time, direction))
+
+    updated: List[Attendance] = []
+    for window, window_punches in windows.values():
+        attendance, _ = Attendance.objects.get_or_create(
+            employee=employee,
+            date=window.date,
+            defaults={'status': 'Present'},
+        )
+        if has_manual_times(attendance):
+            continue
+        state = PunchPairingState.from_attendance(attendance)
+        if attendance.last_punch_at is None or not state.accepts(window_punches[0][0]):
+            state = PunchPairingState()
+            window_punches = _window_punches(employee, window, shift_lookup)
+        for punch_time, direction in window_punches:
+            state.apply(punch_time, direction)
+        state.write_to(attendance, window)
+        attendance.save(update_fields=DERIVED_FIELDS)
+        update_timesheet_from_attendance(attendance, source='Biometric', shift_lookup=shift_lookup)
+        updated.append(attendance)
+    return updated
+
+
+def rederive_attendance(
+    employee,
+    punch_time: datetime,
+    shift_lookup: ShiftLookup = get_assigned_shift,
+    tz: tzinfo | None = None,
+) -> Optional[Attendance]:
+    """Rebuild the attendance of the shift window containing ``punch_time`` from stored punches."""
+    shift_lookup = _memoized(shift_lookup)
+    window = resolve_shift_window(employee, punch_time, shift_lookup, tz)
+    punches = _window_punches(employee, window, shift_lookup)
+    if not punches:
+        return None
+    state = PunchPairingState()
+    for moment, direction in punches:
+        state.apply(moment, direction)
+    attendance, _ = Attendance.objects.get_or_create(
+        employee=employee,
+        date=window.date,
+        defaults={'status': 'Present'},
+    )
+    if has_manual_times(attendance):
+        return attendance
+    state.write_to(attendance, window)
+    attendance.save(update_fields=DERIVED_FIELDS)
+    update_timesheet_from_attendance(attendance, source='Biometric', shift_lookup=shift_lookup)
+    return attendance
+
+
+def rederive_range(employee_ids: Iterable[int], start: date, end: date, tz: tzinfo | None = None) -> int:
+    """Rebuild punch-derived attendance and timesheets of ``employee_ids`` from ``start`` to ``end``.
+
+    All punches of the range are read in one ordered query and folded per
+    shift window in memory, then attendance and timesheets are upserted in
+    bulk. Meant for bulk imports, where replaying punches one at a time
+    would dominate the run. Returns the number of attendance dates written.
+    """
+    employee_ids = list(employee_ids)
+    tz = tz or timezone.get_current_timezone()
+    resolver = ShiftResolver(employee_ids, start - timedelta(days=2), end + timedelta(days=2))
+    # One day either side covers windows that start before or end after the range.
+    lower, upper = day_boundaries(tz).span(start - timedelta(days=1), end + timedelta(days=1))
+    punches = (
+        BiometricPunch.objects
+        .filter(employee_id__in=employee_ids, punch_time__gte=lower, punch_time__lt=upper)
+        .order_by('employee_id', 'punch_time', 'punch_id')
+        .values_list('employee_id', 'punch_time', 'direction')
+    )
+    states: Dict[Tuple[int, date], Tuple[ShiftWindow, PunchPairingState]] = {}
+    for employee_id, punch_time, direction in punches.iterator(chunk_size=5000):
+        window = resolve_shift_window(employee_id, punch_time, resolver, tz)
+        if not start <= window.date <= end:
+            continue
+        entry = states.get((employee_id, window.date))
+        if entry is None:
+            entry = states[(employee_id, window.date)] = (window, PunchPairingState())
+        entry[1].apply(punch_time, direction)
+    if not states:
+        return 0
+
+    existing = {
+        (attendance.employee_id, attendance.date): attendance
+        for attendance in (
+            Attendance.objects
+            .filter(employee_id__in=employee_ids, date__gte=start, date__lte=end)
+            .only('employee_id', 'date', 'notes', 'status', 'last_punch_at', 'clock_in_time', 'clock_out_time')
+        )
+    }
+    attendances = []
+    for (employee_id, day), (window, state) in states.items():
+        current = existing.get((employee_id, day))
+        if current is not None and has_manual_times(current):
+            continue
+        attendance = Attendance(
+            employee_id=employee_id,
+            date=day,
+            notes=current.notes if current else None,
+            status=current.status if current else 'Present',
+        )
+        state.write_to(attendance, window)
+        attendances.append(attendance)
+    if not attendances:
+        return 0
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            attendances,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['employee', 'date'],
+            update_fields=DERIVED_FIELDS,
+        )
+        upsert_timesheets_from_attendance(attendances, resolver, source='Biometric')
+    return len(attendances)
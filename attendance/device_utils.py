@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Case, F, Q, QuerySet, Value, When
+from django.utils import timezone
+
+from .models import BiometricDevice, BiometricIntegration
+
+
+# Process-local caches; entries expire after BIOMETRIC_TOKEN_CACHE_TTL so
+# changes made through another worker are picked up without a shared store.
+_lock = threading.Lock()
+_integrations: Dict[str, Tuple[float, BiometricIntegration]] = {}
+_devices: Dict[Tuple[int, str], Tuple[float, Tuple[int, bool]]] = {}
+
+
+def _cached(store: Dict, key):
+    with _lock:
+        entry = store.get(key)
+    if entry and entry[0] > monotonic():
+        return entry[1]
+    return None
+
+
+def _remember(store: Dict, key, value) -> None:
+    with _lock:
+        store[key] = (monotonic() + settings.BIOMETRIC_TOKEN_CACHE_TTL, value)
+
+
+def clear_integration_cache() -> None:
+    with _lock:
+        _integrations.clear()
+        _devices.clear()
+
+
+def clear_device_cache() -> None:
+    with _lock:
+        _devices.clear()
+
+
+def integration_for_token(token: Optional[str]) -> Optional[BiometricIntegration]:
+    """Active integration owning a webhook token.
+
+    The returned instance is shared between requests and must not be
+    modified; write sync status with a queryset update instead.
+    """
+    if not token:
+        return None
+    integration = _cached(_integrations, token)
+    if integration is None:
+        integration = BiometricIntegration.objects.filter(webhook_token=token, is_active=True).first()
+        if integration:
+            _remember(_integrations, token, integration)
+    return integration
+
+
+def resolve_device(integration: BiometricIntegration, device_id: Optional[str]) -> Optional[Tuple[int, bool]]:
+    """``(pk, is_active)`` of a device, registering it on first contact."""
+    device_id = (device_id or integration.device_id or '').strip()
+    if not device_id:
+        return None
+    key = (integration.integration_id, device_id)
+    device = _cached(_devices, key)
+    if device is None:
+        record, _ = BiometricDevice.objects.get_or_create(integration=integration, device_id=device_id)
+        device = (record.biometric_device_id, record.is_active)
+        _remember(_devices, key, device)
+    return device
+
+
+def _current_hour(now: datetime) -> datetime:
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+def record_punches(device_pk: int, count: int, now: Optional[datetime] = None) -> None:
+    """Bump a device's counters in one UPDATE, rolling the hourly window over when needed."""
+    now = now or timezone.now()
+    hour = _current_hour(now)
+    # Assignments only read columns set after them, so the result is the same
+    # whether the backend evaluates SET against old or already-updated values.
+    BiometricDevice.objects.filter(pk=device_pk).update(
+        punches_last_hour=Case(
+            When(hour_started_at=hour, then=F('punches_last_hour')),
+            When(hour_started_at=hour - timedelta(hours=1), then=F('punches_this_hour')),
+            default=Value(0),
+        ),
+        punches_this_hour=Case(
+            When(hour_started_at=hour, then=F('punches_this_hour') + count),
+            default=Value(count),
+        ),
+        hour_started_at=hour,
+        punch_count=F('punch_count') + count,
+        last_punch_at=now,
+        last_seen_at=now,
+        updated_at=now,
+    )
+
+
+def record_heartbeat(device_pk: int, now: Optional[datetime] = None) -> None:
+    now = now or timezone.now()
+    BiometricDevice.objects.filter(pk=device_pk).update(last_heartbeat_at=now, last_seen_at=now, updated_at=now)
+
+
+def record_error(device_pk: int, message: str, now: Optional[datetime] = None) -> None:
+    now = now or timezone.now()
+    BiometricDevice.objects.filter(pk=device_pk).update(
+        error_count=F('error_count') + 1,
+        last_error_at=now,
+        last_error=message[:1000],
+        last_seen_at=now,
+        updated_at=now,
+    )
+
+
+def punches_per_hour(device: BiometricDevice, now: Optional[datetime] = None) -> int:
+    """Punches received during the last complete clock hour."""
+    hour = _current_hour(now or timezone.now())
+    if device.hour_started_at == hour:
+        return device.punches_last_hour
+    if device.hour_started_at == hour - timedelta(hours=1):
+        return device.punches_this_hour
+    return 0
+
+
+def stale_devices(minutes: Optional[int] = None, now: Optional[datetime] = None) -> QuerySet:
+    """Active devices not heard from in ``minutes`` (``BIOMETRIC_DEVICE_STALE_MINUTES`` by default)."""
+    cutoff = (now or timezone.now()) - timedelta(minutes=minutes or settings.BIOMETRIC_DEVICE_STALE_MINUTES)
+    return (
+        BiometricDevice.objects
+        .select_related('integration')
+        .filter(is_active=True, integration__is_active=True)
+        .filter(Q(last_seen_at__lt=cutoff) | Q(last_seen_at__isnull=True))
+    )
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from functools import reduce
+from operator import or_
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from employees.models import Employee
+from leave_management.models import Holiday, LeaveRequest
+
+from .models import Attendance, AttendanceException, Shift
+from .shift_utils import ShiftResolver
+from .timesheet_utils import refresh_timesheets
+
+
+# Notes of the Absent rows this job inserts, so later runs can tell them from manual entries.
+AUTO_ABSENT_NOTE = 'Marked absent: no attendance on a scheduled working day.'
+
+
+def _shift_span(shift: Shift, day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, shift.start_time)
+    end = datetime.combine(day, shift.end_time)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def _nearest(day: date, moment: time, anchor: datetime) -> datetime:
+    # Clock times carry no date; an overnight shift's times may fall on the next day.
+    same_day = datetime.combine(day, moment)
+    next_day = same_day + timedelta(days=1)
+    return min((same_day, next_day), key=lambda candidate: abs(candidate - anchor))
+
+
+def _minutes(delta: timedelta) -> int:
+    return int(delta.total_seconds() // 60)
+
+
+def _leave_days(employee_ids: Sequence[int], start: date, end: date) -> Set[Tuple[int, date]]:
+    days: Set[Tuple[int, date]] = set()
+    leaves = (
+        LeaveRequest.objects
+        .filter(employee_id__in=employee_ids, status='Approved', start_date__lte=end, end_date__gte=start)
+        .values_list('employee_id', 'start_date', 'end_date')
+    )
+    for employee_id, first, last in leaves:
+        day = max(first, start)
+        while day <= min(last, end):
+            days.add((employee_id, day))
+            day += timedelta(days=1)
+    return days
+
+
+def detect_attendance_exceptions(employee_ids: Sequence[int], start: date, end: date) -> Dict[str, int]:
+    """Compare attendance with assigned shifts for ``employee_ids`` between ``start`` and ``end``.
+
+    Shifts, attendance, approved leave and holidays are each loaded in one
+    query. Scheduled working days without attendance, leave or a holiday are
+    stored as ``Absent`` attendance, with timesheets. Absences on days that
+    have since become approved leave or holidays are no longer flagged, and
+    absences inserted by this job turn into ``Leave``. Late arrivals and early exits beyond the
+    grace periods are stored as ``AttendanceException`` rows, replacing any
+    earlier results for the same employees and dates.
+    """
+    late_grace = settings.ATTENDANCE_LATE_GRACE_MINUTES
+    early_grace = settings.ATTENDANCE_EARLY_EXIT_GRACE_MINUTES
+    off_days = set(settings.ATTENDANCE_WEEKLY_OFF_DAYS)
+
+    employees = list(
+        Employee.objects
+        .filter(employee_id__in=employee_ids, status='Active', hire_date__lte=end)
+        .values_list('employee_id', 'hire_date')
+    )
+    ids = [employee_id for employee_id, _ in employees]
+    resolver = ShiftResolver(ids, start, end)
+    records = {
+        (employee_id, day): (status, clock_in, clock_out, notes)
+        for employee_id, day, status, clock_in, clock_out, notes in (
+            Attendance.objects
+            .filter(employee_id__in=ids, date__gte=start, date__lte=end)
+            .values_list('employee_id', 'date', 'status', 'clock_in_time', 'clock_out_time', 'notes')
+        )
+    }
+    leave_days = _leave_days(ids, start, end)
+    holidays = set(
+        Holiday.objects.filter(is_active=True, date__gte=start, date__lte=end).values_list('date', flat=True)
+    )
+
+    absences: List[Attendance] = []
+    on_leave_absences: List[Tuple[int, date]] = []
+    exceptions: List[AttendanceException] = []
+    for employee_id, hire_date in employees:
+        day = max(start, hire_date)
+        while day <= end:
+            assignment = resolver.assignment_for(employee_id, day)
+            current, day = day, day + timedelta(days=1)
+            if not assignment:
+                continue
+            shift = assignment.shift
+            record = records.get((employee_id, current))
+            exception = AttendanceException(
+                employee_id=employee_id,
+                shift=shift,
+                date=current,
+                expected_time=shift.start_time,
+            )
+
+            on_leave = (employee_id, current) in leave_days
+            day_off = on_leave or current in holidays or current.weekday() in off_days
+            if record is None:
+                if day_off:
+                    continue
+                absences.append(Attendance(
+                    employee_id=employee_id,
+                    date=current,
+                    status='Absent',
+                    notes=AUTO_ABSENT_NOTE,
+                ))
+                exception.kind = 'Absent'
+                exceptions.append(exception)
+                continue
+
+            status, clock_in, clock_out, notes = record
+            if status == 'Absent':
+                # Leave or holidays recorded after an earlier run clear the flag;
+                # absences this job inserted become leave.
+                if on_leave and notes == AUTO_ABSENT_NOTE:
+                    on_leave_absences.append((employee_id, current))
+                if not day_off:
+                    exception.kind = 'Absent'
+                    exceptions.append(exception)
+                continue
+            if status != 'Present':
+                continue
+
+            shift_start, shift_end = _shift_span(shift, current)
+            if clock_in:
+                late = _minutes(_nearest(current, clock_in, shift_start) - shift_start)
+                if late > late_grace:
+                    exception.kind = 'Late'
+                    exception.minutes = late
+                    exception.actual_time = clock_in
+                    exceptions.append(exception)
+            if clock_out:
+                early = _minutes(shift_end - _nearest(current, clock_out, shift_end))
+                if early > early_grace:
+                    exceptions.append(AttendanceException(
+                        employee_id=employee_id,
+                        shift=shift,
+                        date=current,
+                        kind='Early Exit',
+                        minutes=early,
+                        expected_time=shift.end_time,
+                        actual_time=clock_out,
+                    ))
+
+    with transaction.atomic():
+        AttendanceException.objects.filter(
+            employee_id__in=ids, date__gte=start, date__lte=end,
+        ).delete()
+        Attendance.objects.bulk_create(absences, batch_size=1000, ignore_conflicts=True)
+        if on_leave_absences:
+            Attendance.objects.filter(
+                reduce(or_, (Q(employee_id=employee_id, date=day) for employee_id, day in on_leave_absences)),
+                status='Absent',
+                notes=AUTO_ABSENT_NOTE,
+            ).update(status='Leave', updated_at=timezone.now())
+        AttendanceException.objects.bulk_create(exceptions, batch_size=1000)
+        # Recomputed from the stored rows, which also marks the month summaries stale.
+        refresh_timesheets(
+            [(absence.employee_id, absence.date) for absence in absences] + on_leave_absences
+        )
+
+    counts = {kind: 0 for kind, _ in AttendanceException.KIND_CHOICES}
+    for exception in exceptions:
+        counts[exception.kind] += 1
+    counts['marked_absent'] = len(absences)
+    return counts
+
+
+def default_detection_date(today: Optional[date] = None) -> date:
+    """The nightly run checks the previous day, which is complete by then."""
+    return (today or timezone.localdate()) - timedelta(days=1)
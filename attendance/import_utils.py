@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import os
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .biometric_utils import get_punch_extractor, parse_punch_items
+from .derivation_utils import rederive_range
+from .models import BiometricIntegration, BiometricPunch, PunchImport
+from .payload_utils import store_payload_blobs
+from .stream_utils import chunked
+from .tz_utils import day_boundaries, get_zone, integration_timezone
+
+
+# ZKTeco/eSSL attlog.dat: PIN, timestamp, verify mode, in/out state, work code, reserved.
+DAT_COLUMNS = ('employee_id', 'timestamp', 'verify_mode', 'direction', 'work_code', 'reserved')
+
+_COPY_COLUMNS = (
+    'integration_id', 'employee_id', 'employee_identifier', 'device_id',
+    'punch_time', 'direction', 'payload_blob_id', 'created_at',
+)
+
+Progress = Callable[[PunchImport], None]
+
+
+def export_options(integration: BiometricIntegration) -> Dict[str, Any]:
+    """File settings from ``data_mapping['export']``.
+
+    Keys: ``format`` (csv/dat), ``delimiter``, ``columns`` (names for files
+    without a header row), ``skip_rows``, ``encoding``, ``date_field`` and
+    ``time_field`` (split date/time columns), ``timestamp_format`` (strptime
+    format for non-ISO timestamps) and ``device_field``.
+    """
+    return dict((integration.data_mapping or {}).get('export') or {})
+
+
+# Bytes hashed to recognise a file. Device exports are cumulative (attlog.dat
+# only ever grows), so the head identifies the file and the size does not.
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def _fingerprint(head: bytes) -> str:
+    return hashlib.sha256(head).hexdigest()
+
+
+def file_fingerprint(path: str) -> Tuple[str, int]:
+    """Return ``(hash, prefix_size)`` of the first ``FINGERPRINT_BYTES`` of a file."""
+    with open(path, 'rb') as handle:
+        head = handle.read(FINGERPRINT_BYTES)
+    return _fingerprint(head), len(head)
+
+
+def find_import(integration: BiometricIntegration, path: str) -> Optional[PunchImport]:
+    """Return the earlier import of this file, or of a shorter copy it grew from.
+
+    A job matches when the bytes it fingerprinted are still the head of the
+    file. Files smaller than ``FINGERPRINT_BYTES`` were hashed whole, so they
+    are compared on their own (shorter) prefix.
+    """
+    with open(path, 'rb') as handle:
+        head = handle.read(FINGERPRINT_BYTES)
+    prefix_sizes = set(
+        PunchImport.objects
+        .filter(integration=integration, prefix_size__gt=0, prefix_size__lt=len(head))
+        .order_by()
+        .values_list('prefix_size', flat=True)
+        .distinct()
+    )
+    prefix_sizes.add(len(head))
+    return (
+        PunchImport.objects
+        .filter(integration=integration, fingerprint__in=[_fingerprint(head[:size]) for size in prefix_sizes])
+        .order_by('-prefix_size')
+        .first()
+    )
+
+
+def _complete_lines(path: str) -> bool:
+    with open(path, 'rb') as handle:
+        handle.seek(0, os.SEEK_END)
+        if not handle.tell():
+            return True
+        handle.seek(-1, os.SEEK_END)
+        return handle.read(1) in (b'\n', b'\r')
+
+
+def _without_last(items: Iterator[Any]) -> Iterator[Any]:
+    iterator = iter(items)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield previous
+        previous = item
+
+
+def iter_export_rows(stream: TextIO, fmt: str, options: Dict[str, Any]) -> Iterator[Optional[Dict[str, str]]]:
+    """Yield one dict per data line; blank lines yield ``None`` so row counts stay stable."""
+    skip_rows = int(options.get('skip_rows') or 0)
+    lines = islice(stream, skip_rows, None)
+    if fmt == 'dat':
+        columns = options.get('columns') or DAT_COLUMNS
+        delimiter = options.get('delimiter') or '\t'
+        for line in lines:
+            line = line.strip()
+            yield dict(zip(columns, (value.strip() for value in line.split(delimiter)))) if line else None
+        return
+
+    reader = csv.reader(lines, delimiter=options.get('delimiter') or ',')
+    columns = options.get('columns') or [column.strip() for column in next(reader, [])]
+    for values in reader:
+        yield dict(zip(columns, (value.strip() for value in values))) if any(values) else None
+
+
+def _row_normalizer(integration: BiometricIntegration, options: Dict[str, Any]) -> Callable[[Any], Any]:
+    timestamp_field = (integration.data_mapping or {}).get('timestamp_field') or 'timestamp'
+    date_field = options.get('date_field')
+    time_field = options.get('time_field')
+    timestamp_format = options.get('timestamp_format')
+    if not (date_field or timestamp_format):
+        return lambda row: row
+
+    def normalize(row):
+        if not row:
+            return row
+        value = row.get(timestamp_field)
+        if date_field:
+            value = f"{row.get(date_field, '')} {row.get(time_field, '') if time_field else ''}".strip()
+        if value and timestamp_format:
+            try:
+                value = datetime.strptime(value, timestamp_format).isoformat()
+            except ValueError:
+                value = None
+        row[timestamp_field] = value
+        return row
+    return normalize
+
+
+def _insert_punches(punches: List[BiometricPunch]) -> None:
+    if connection.vendor != 'postgresql':
+        BiometricPunch.objects.bulk_create(punches, batch_size=1000)
+        return
+    now = timezone.now()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for punch in punches:
+        writer.writerow([
+            punch.integration_id, punch.employee_id, punch.employee_identifier, punch.device_id,
+            punch.punch_time.isoformat(), punch.direction, punch.payload_blob_id, now.isoformat(),
+        ])
+    buffer.seek(0)
+    sql = f"COPY {BiometricPunch._meta.db_table} ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):  # psycopg2
+            raw_cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def import_export_file(
+    integration: BiometricIntegration,
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = 5000,
+    progress: Optional[Progress] = None,
+) -> PunchImport:
+    """Stream a device export file into ``biometric_punches``.
+
+    Each chunk is inserted together with its checkpoint in one transaction,
+    so an interrupted import resumes after the last committed row, and a file
+    that has grown since it was imported continues from the same row. Attendance
+    is not derived here; see ``derive_import_tasks``.
+    """
+    options = export_options(integration)
+    fmt = (fmt or options.get('format') or ('dat' if path.lower().endswith(('.dat', '.txt')) else 'csv')).lower()
+    file_size = os.path.getsize(path)
+    fingerprint, prefix_size = file_fingerprint(path)
+    job = find_import(integration, path)
+    if job is None:
+        job = PunchImport.objects.create(
+            integration=integration,
+            fingerprint=fingerprint,
+            prefix_size=prefix_size,
+            file_name=os.path.basename(path),
+            file_size=file_size,
+        )
+    elif job.status != 'Importing' and file_size <= job.file_size:
+        return job
+    else:
+        # Same file, grown since the last run: read on from the stored row.
+        if job.status == 'Completed':
+            # Earlier rows are derived already; only the new ones need it.
+            job.first_punch_at = job.last_punch_at = None
+        job.status = 'Importing'
+        job.fingerprint, job.prefix_size = fingerprint, prefix_size
+        job.file_name, job.file_size = os.path.basename(path), max(job.file_size, file_size)
+        job.save()
+
+    extractor = get_punch_extractor(integration.data_mapping)
+    normalize = _row_normalizer(integration, options)
+    device_field = options.get('device_field')
+    with open(path, encoding=options.get('encoding') or 'utf-8-sig', errors='replace', newline='') as stream:
+        rows = islice(iter_export_rows(stream, fmt, options), job.rows_read, None)
+        if not _complete_lines(path):
+            # The device is still writing the last line; pick it up next run.
+            rows = _without_last(rows)
+        for chunk in chunked(rows, chunk_size):
+            parsed = parse_punch_items(integration, [normalize(row) for row in chunk])
+            with transaction.atomic():
+                digests = store_payload_blobs((punch['raw_payload'] for punch in parsed), extractor)
+                _insert_punches([
+                    BiometricPunch(
+                        integration_id=integration.integration_id,
+                        employee=punch['employee'],
+                        employee_identifier=punch['employee_identifier'],
+                        device_id=(punch['raw_payload'].get(device_field) if device_field else None)
+                        or integration.device_id,
+                        punch_time=punch['punch_time'],
+                        direction=punch['direction'],
+                        payload_blob_id=digest,
+                    )
+                    for punch, digest in zip(parsed, digests)
+                ])
+                job.rows_read += len(chunk)
+                job.rows_skipped += len(chunk) - len(parsed)
+                job.punches_created += len(parsed)
+                if parsed:
+                    first = min(punch['punch_time'] for punch in parsed)
+                    last = max(punch['punch_time'] for punch in parsed)
+                    job.first_punch_at = min(job.first_punch_at or first, first)
+                    job.last_punch_at = max(job.last_punch_at or last, last)
+                job.save()
+            if progress:
+                progress(job)
+
+    job.status = 'Imported'
+    job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def _month_ranges(start: date, end: date) -> List[Tuple[date, date]]:
+    ranges = []
+    while start <= end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        ranges.append((start, min(end, next_month - timedelta(days=1))))
+        start = next_month
+    return ranges
+
+
+DeriveTask = Tuple[List[int], date, date, str]
+
+
+def derive_import_task(task: DeriveTask) -> int:
+    employee_ids, start, end, timezone_name = task
+    return rederive_range(employee_ids, start, end, get_zone(timezone_name))
+
+
+def derive_import_tasks(job: PunchImport, employees_per_task: int = 200) -> List[DeriveTask]:
+    """Split the employee-days touched by an import into (employees, month) tasks."""
+    if not job.first_punch_at:
+        return []
+    integration = job.integration
+    boundaries = day_boundaries(integration_timezone(integration))
+    # Overnight shifts can place a punch on the previous day's attendance.
+    start = boundaries.day_of(job.first_punch_at) - timedelta(days=1)
+    end = boundaries.day_of(job.last_punch_at)
+    employee_ids = sorted(
+        BiometricPunch.objects
+        .filter(
+            integration=integration,
+            employee__isnull=False,
+            punch_time__gte=job.first_punch_at,
+            punch_time__lte=job.last_punch_at,
+        )
+        .order_by()
+        .values_list('employee_id', flat=True)
+        .distinct()
+    )
+    return [
+        (employee_ids[index:index + employees_per_task], month_start, month_end, integration.timezone)
+        for month_start, month_end in _month_ranges(start, end)
+        for index in range(0, len(employee_ids), employees_per_task)
+    ]
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from employees.models import Employee
+from employees.permissions import get_employee_profile, has_role_permission, is_admin_or_hr, is_employee
+
+from .models import Attendance
+
+
+# Deltas are appended to a short-lived log in the shared cache: a sequence
+# counter plus one entry per published batch. Stream clients poll the
+# counter and fetch only the entries they have not seen, so dashboards
+# cost cache reads instead of attendance/punch queries.
+#
+# The default DatabaseCache has no atomic incr, so a batch claims its slot
+# with ``cache.add`` (an insert, which only one writer can win) before the
+# counter is moved. A reader therefore never sees a sequence whose batch is
+# not stored yet. Concurrent writers may leave the counter briefly behind
+# the newest batch; readers look one slot past it to pick that batch up.
+LIVE_SEQUENCE_KEY = 'attendance:live:seq'
+LIVE_BATCH_KEY = 'attendance:live:batch:{}'
+LIVE_MAX_BATCHES_PER_READ = 200
+
+
+def _append_batch(batch: Dict[str, Any]) -> int:
+    sequence = latest_sequence()
+    while True:
+        sequence += 1
+        if cache.add(LIVE_BATCH_KEY.format(sequence), batch, settings.LIVE_EVENT_TTL):
+            break
+    if latest_sequence() < sequence:
+        cache.set(LIVE_SEQUENCE_KEY, sequence, None)
+    return sequence
+
+
+def publish_live(kind: str, items: Iterable[Dict[str, Any]]) -> None:
+    """Publish deltas for stream clients once the current transaction commits.
+
+    Every item carries an ``employee`` id, used to scope what each client
+    sees. Each call becomes one batch. The items travel inside the commit
+    callback, so Django discards them with it when the transaction or
+    savepoint rolls back.
+    """
+    items = list(items)
+    if not items:
+        return
+    transaction.on_commit(lambda: _publish_batch(kind, items))
+
+
+def _publish_batch(kind: str, items: List[Dict[str, Any]]) -> None:
+    if kind == 'attendance':
+        # A row listed several times is sent once, in its final state.
+        items = list({(item['employee'], item['date']): item for item in items}.values())
+    _append_batch({'type': kind, 'at': timezone.now().isoformat(), 'items': items})
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def punch_delta(integration_id: int, device_id: Optional[str], punch: Dict[str, Any]) -> Dict[str, Any]:
+    employee = punch['employee']
+    return {
+        'employee': employee.employee_id,
+        'employee_name': employee.full_name,
+        'integration': integration_id,
+        'device_id': device_id,
+        'punch_time': punch['punch_time'].isoformat(),
+        'direction': punch['direction'],
+    }
+
+
+def attendance_delta(attendance: Attendance, deleted: bool = False) -> Dict[str, Any]:
+    return {
+        'employee': attendance.employee_id,
+        'date': _iso(attendance.date),
+        'clock_in_time': _iso(attendance.clock_in_time),
+        'clock_out_time': _iso(attendance.clock_out_time),
+        'working_hours': str(attendance.working_hours) if attendance.working_hours is not None else None,
+        'status': attendance.status,
+        'deleted': deleted,
+    }
+
+
+def publish_punches(integration_id: int, device_id: Optional[str], punches: Iterable[Dict[str, Any]]) -> None:
+    publish_live('punch', (
+        punch_delta(integration_id, device_id, punch)
+        for punch in punches
+        if punch['employee'] is not None
+    ))
+
+
+def publish_attendance(attendances: Iterable[Attendance]) -> None:
+    publish_live('attendance', (attendance_delta(attendance) for attendance in attendances))
+
+
+def publish_clock(employee_id: int, day: date, **fields) -> None:
+    """Partial attendance delta for the single-statement clock-in/out path."""
+    publish_live('attendance', [{
+        'employee': employee_id,
+        'date': day.isoformat(),
+        **{name: value.isoformat() if hasattr(value, 'isoformat') else value for name, value in fields.items()},
+        'deleted': False,
+    }])
+
+
+def latest_sequence() -> int:
+    return cache.get(LIVE_SEQUENCE_KEY) or 0
+
+
+def read_batches(after: int) -> Tuple[int, List[Tuple[int, Dict[str, Any]]]]:
+    """Batches published after sequence ``after`` that are still in the log.
+
+    Returns the sequence to resume from and ``(sequence, batch)`` pairs in
+    order. A client that fell further behind than the log's TTL simply
+    misses the expired batches.
+    """
+    latest = latest_sequence()
+    if latest < after:
+        if LIVE_BATCH_KEY.format(after) not in cache:
+            # The counter was reset (cache flush); start over from the new log.
+            after = 0
+        latest = max(latest, after)
+    first = max(after + 1, latest - LIVE_MAX_BATCHES_PER_READ + 1)
+    # One slot past the counter, in case a concurrent writer has not moved it yet.
+    sequences = range(first, latest + 2)
+    found = cache.get_many([LIVE_BATCH_KEY.format(sequence) for sequence in sequences])
+    batches = [
+        (sequence, found[LIVE_BATCH_KEY.format(sequence)])
+        for sequence in sequences
+        if LIVE_BATCH_KEY.format(sequence) in found
+    ]
+    if batches and batches[-1][0] > latest:
+        latest = batches[-1][0]
+    return latest, batches
+
+
+_TICKET_SALT = 'attendance.live.ticket'
+
+
+def issue_stream_ticket(user) -> str:
+    """Signed, short-lived credential for ``?ticket=`` on the stream URL.
+
+    Browsers' EventSource cannot send an Authorization header, so the token
+    has to travel in the query string, where proxies and access logs record
+    it. A ticket only opens the stream and expires after
+    LIVE_STREAM_TICKET_SECONDS, unlike a JWT access token.
+    """
+    return signing.dumps(user.pk, salt=_TICKET_SALT)
+
+
+def stream_ticket_user_id(ticket: str) -> Optional[int]:
+    try:
+        return signing.loads(ticket, salt=_TICKET_SALT, max_age=settings.LIVE_STREAM_TICKET_SECONDS)
+    except signing.BadSignature:
+        return None
+
+
+def live_scope(user) -> Optional[Set[int]]:
+    """Employee ids whose deltas ``user`` may see; ``None`` means everyone.
+
+    HR/admin and other non-employee roles holding ``attendance.view`` see
+    every employee; everyone else sees themselves plus their direct
+    reports. Resolved once per stream connection.
+    """
+    if is_admin_or_hr(user):
+        return None
+    if not is_employee(user) and has_role_permission(user, 'attendance.view'):
+        return None
+    profile = get_employee_profile(user)
+    if not profile:
+        return set()
+    reports = Employee.objects.filter(managers=profile).values_list('employee_id', flat=True)
+    return {profile.employee_id, *reports}
+
+
+def scoped_items(batch: Dict[str, Any], scope: Optional[Set[int]]) -> List[Dict[str, Any]]:
+    if scope is None:
+        return batch['items']
+    return [item for item in batch['items'] if item['employee'] in scope]
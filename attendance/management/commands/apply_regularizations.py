@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from attendance.regularization_utils import apply_regularizations
+
+
+class Command(BaseCommand):
+    help = 'Apply approved attendance regularizations that have not been written to attendance yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Requests per transaction.')
+
+    def handle(self, *args, **options):
+        applied = apply_regularizations(batch_size=max(options['batch_size'], 1))
+        self.stdout.write(self.style.SUCCESS(f'Applied {applied} attendance regularizations.'))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.archive_utils import archive_punches
+
+
+class Command(BaseCommand):
+    help = 'Move biometric punches older than the retention window into NDJSON.gz archives.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=None,
+            help='Defaults to BIOMETRIC_PUNCH_RETENTION_DAYS.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        retention_days = options['retention_days']
+        if retention_days is None:
+            retention_days = settings.BIOMETRIC_PUNCH_RETENTION_DAYS
+        if retention_days < 0:
+            raise CommandError('--retention-days must not be negative.')
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        archives = archive_punches(cutoff, batch_size=options['batch_size'])
+        for archive in archives:
+            self.stdout.write(
+                f'Archived {archive.punch_count} punches of integration {archive.integration_id} '
+                f'for {archive.month:%Y-%m} to {archive.file.name}'
+            )
+        total = sum(archive.punch_count for archive in archives)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total} punches older than {cutoff:%Y-%m-%d} into {len(archives)} file(s).'
+        ))
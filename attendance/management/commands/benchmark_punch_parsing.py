@@ -0,0 +1,109 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attendance.biometric_utils import parse_punch_payload, resolve_employee
+from attendance.models import BiometricIntegration
+
+
+DATA_MAPPING = {
+    'employee_identifier_field': 'user.code',
+    'employee_identifier_type': 'employee_id',
+    'timestamp_field': 'event.time',
+    'direction_field': 'event.direction',
+}
+
+
+def _legacy_parse(payload, mapping):
+    """The pre-compilation extraction loop, kept as the benchmark baseline."""
+    def nested(item, field_path):
+        value = item
+        for part in field_path.split('.'):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+
+    parsed = []
+    for item in payload['punches']:
+        identifier = nested(item, mapping['employee_identifier_field']) or item.get('employee_id')
+        timestamp_raw = nested(item, mapping['timestamp_field']) or item.get('timestamp') or item.get('time')
+        direction = nested(item, mapping['direction_field'])
+        try:
+            punch_time = datetime.fromisoformat(str(timestamp_raw).replace('Z', '+00:00'))
+        except ValueError:
+            continue
+        if timezone.is_naive(punch_time):
+            punch_time = timezone.make_aware(punch_time, timezone.get_current_timezone())
+        parsed.append({
+            'employee': None,
+            'employee_identifier': str(identifier) if identifier else None,
+            'punch_time': punch_time,
+            'direction': direction,
+            'raw_payload': item,
+        })
+    return parsed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark parse_punch_payload on a synthetic payload (no rows are written).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--punches', type=int, default=100_000)
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--lookup-sample', type=int, default=1_000)
+
+    def handle(self, *args, **options):
+        count = options['punches']
+        start = datetime(2024, 1, 1, 8, 0, 0)
+        payload = {
+            'punches': [
+                {
+                    'user': {'code': str(index % options['employees'] + 1)},
+                    'event': {
+                        'time': (start + timedelta(seconds=index * 7)).isoformat() + 'Z',
+                        'direction': 'IN' if index % 2 == 0 else 'OUT',
+                    },
+                    'device': {'serial': 'BENCH-001'},
+                }
+                for index in range(count)
+            ]
+        }
+        integration = BiometricIntegration(display_name='Benchmark', data_mapping=DATA_MAPPING)
+
+        legacy = self._best_of(options['repeat'], lambda: _legacy_parse(payload, DATA_MAPPING))
+        compiled = self._best_of(options['repeat'], lambda: parse_punch_payload(integration, payload))
+
+        # The legacy path also ran one employee query per punch; time a sample
+        # of those lookups and extrapolate rather than issuing 100k queries.
+        sample = payload['punches'][:max(options['lookup_sample'], 1)]
+        started = time.perf_counter()
+        for item in sample:
+            resolve_employee(item['user']['code'], DATA_MAPPING['employee_identifier_type'])
+        lookups = (time.perf_counter() - started) / len(sample) * count
+
+        self.stdout.write(f'Punches: {count}')
+        self.stdout.write(
+            f'Legacy extraction (no employee lookup): {legacy:.3f}s '
+            f'({count / legacy:,.0f} punches/s)'
+        )
+        self.stdout.write(
+            f'Legacy total (extrapolated per-punch lookups): {legacy + lookups:.3f}s '
+            f'({count / (legacy + lookups):,.0f} punches/s)'
+        )
+        self.stdout.write(
+            f'Compiled parse (incl. bulk employee lookup): {compiled:.3f}s '
+            f'({count / compiled:,.0f} punches/s)'
+        )
+
+    @staticmethod
+    def _best_of(repeat, func):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
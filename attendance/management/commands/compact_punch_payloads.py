@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from attendance.biometric_utils import get_punch_extractor
+from attendance.models import BiometricIntegration, BiometricPunch, PunchPayloadBlob
+from attendance.payload_utils import store_payload_blobs, table_size_bytes
+
+
+class Command(BaseCommand):
+    help = 'Move legacy raw_payload JSON into compressed, deduplicated payload blobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Reclaim freed space afterwards so the reported sizes reflect the compaction.',
+        )
+
+    def handle(self, *args, **options):
+        tables = [BiometricPunch._meta.db_table, PunchPayloadBlob._meta.db_table]
+        before = {table: table_size_bytes(table) for table in tables}
+
+        compacted = 0
+        for integration in BiometricIntegration.objects.all():
+            extractor = get_punch_extractor(integration.data_mapping)
+            last_id = 0
+            while True:
+                batch = list(
+                    BiometricPunch.objects
+                    .filter(integration=integration, raw_payload__isnull=False, punch_id__gt=last_id)
+                    .order_by('punch_id')
+                    .values_list('punch_id', 'raw_payload')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                with transaction.atomic():
+                    digests = store_payload_blobs((payload for _, payload in batch), extractor)
+                    # Envelopes are mostly shared, so one UPDATE per distinct digest.
+                    punch_ids_by_digest = defaultdict(list)
+                    for (punch_id, _), digest in zip(batch, digests):
+                        punch_ids_by_digest[digest].append(punch_id)
+                    for digest, punch_ids in punch_ids_by_digest.items():
+                        BiometricPunch.objects.filter(punch_id__in=punch_ids).update(
+                            payload_blob_id=digest,
+                            raw_payload=None,
+                        )
+                compacted += len(batch)
+                self.stdout.write(f'{integration}: {compacted} punches compacted')
+
+        if options['vacuum']:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    for table in tables:
+                        cursor.execute(f'VACUUM FULL {connection.ops.quote_name(table)}')
+                elif connection.vendor == 'sqlite':
+                    cursor.execute('VACUUM')
+
+        after = {table: table_size_bytes(table) for table in tables}
+        self.stdout.write(self.style.SUCCESS(f'Compacted {compacted} punches.'))
+        for table in tables:
+            self.stdout.write(f'{table}: {self._format(before[table])} -> {self._format(after[table])}')
+
+    @staticmethod
+    def _format(size):
+        if size is None:
+            return 'n/a'
+        return f'{size / 1024:,.0f} KiB'
@@ -0,0 +1,52 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.exception_utils import default_detection_date, detect_attendance_exceptions
+from backend.parallel import default_worker_count, run_in_processes, split_into_chunks
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = 'Flag late arrivals, early exits and absences against assigned shifts (run nightly).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='Defaults to yesterday.')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Defaults to --from.')
+        parser.add_argument('--department', type=int, help='Department id to limit detection to.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes (defaults to the CPU count; always 1 on SQLite).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Employees per worker task.')
+
+    def handle(self, *args, **options):
+        start = options['start'] or default_detection_date()
+        end = options['end'] or start
+        if start > end:
+            raise CommandError('--from must be on or before --to.')
+
+        employees = Employee.objects.filter(status='Active', hire_date__lte=end)
+        if options['department']:
+            employees = employees.filter(department_id=options['department'])
+        employee_ids = list(employees.order_by('employee_id').values_list('employee_id', flat=True))
+        if not employee_ids:
+            self.stdout.write('No active employees to check.')
+            return
+
+        workers = options['workers'] or default_worker_count()
+        chunks = split_into_chunks(employee_ids, max(options['chunk_size'], 1))
+        totals = {}
+        results = run_in_processes(detect_attendance_exceptions, chunks, workers, start, end)
+        for done, counts in enumerate(results, start=1):
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+            self.stdout.write(f'[{done}/{len(chunks)}] chunks checked')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals.get('Late', 0)} late, {totals.get('Early Exit', 0)} early exits, "
+            f"{totals.get('Absent', 0)} absences ({totals.get('marked_absent', 0)} newly marked) "
+            f'for {len(employee_ids)} employees between {start} and {end}.'
+        ))
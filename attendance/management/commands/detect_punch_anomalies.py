@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.anomaly_utils import detect_month_anomalies
+from backend.parallel import default_worker_count, run_in_processes
+
+
+def _month(value: str) -> date:
+    return date.fromisoformat(f'{value}-01')
+
+
+class Command(BaseCommand):
+    help = 'Flag suspicious biometric punch patterns per month for review.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=_month, help='YYYY-MM; defaults to last month.')
+        parser.add_argument('--to-month', type=_month, help='Analyse every month from --month to this one.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes, one month each (defaults to the CPU count; always 1 on SQLite).',
+        )
+
+    def handle(self, *args, **options):
+        first = options['month'] or (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+        last = options['to_month'] or first
+        if first > last:
+            raise CommandError('--month must be on or before --to-month.')
+
+        months = []
+        month = first
+        while month <= last:
+            months.append(month)
+            month = (month + timedelta(days=32)).replace(day=1)
+
+        workers = options['workers'] or default_worker_count()
+        # Results arrive in completion order, each tagged with its month.
+        for month, counts in run_in_processes(detect_month_anomalies, months, workers):
+            summary = ', '.join(f'{count} {kind.lower()}' for kind, count in counts.items())
+            self.stdout.write(f'{month:%Y-%m}: {summary}')
+        self.stdout.write(self.style.SUCCESS(f'Analysed {len(months)} month(s).'))
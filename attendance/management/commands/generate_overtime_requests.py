@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.overtime_utils import generate_overtime_requests
+
+
+class Command(BaseCommand):
+    help = 'Create pending OvertimeRequest rows for timesheets with overtime and no request yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, required=True)
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, required=True)
+        parser.add_argument('--department', type=int, help='Department id to limit generation to.')
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start > end:
+            raise CommandError('--from must be on or before --to.')
+        created = generate_overtime_requests(start, end, options['department'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} overtime requests between {start} and {end}.'
+        ))
@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.calendar_utils import month_bounds
+from attendance.summary_utils import month_end, months_between, rebuild_month_summaries
+from backend.parallel import default_worker_count, run_in_processes, split_into_chunks
+from employees.models import Employee
+
+
+def _month(value: str) -> date:
+    try:
+        return month_bounds(value)[0]
+    except ValueError:
+        raise CommandError(f'Invalid month {value!r}; expected YYYY-MM.')
+
+
+class Command(BaseCommand):
+    help = 'Recompute monthly attendance summaries from Attendance, Timesheet and approved leave.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='First month (YYYY-MM).')
+        parser.add_argument('--to', dest='end', help='Last month (YYYY-MM); defaults to --from.')
+        parser.add_argument('--department', type=int, help='Department id to limit the rebuild to.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes (defaults to the CPU count; always 1 on SQLite).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=200, help='Employees per worker task.')
+
+    def handle(self, *args, **options):
+        start = _month(options['start'])
+        end = _month(options['end']) if options['end'] else start
+        if start > end:
+            raise CommandError('--from must be on or before --to.')
+
+        employees = Employee.objects.filter(hire_date__lte=month_end(end))
+        if options['department']:
+            employees = employees.filter(department_id=options['department'])
+        employee_ids = sorted(employees.values_list('employee_id', flat=True))
+        if not employee_ids:
+            self.stdout.write('No employees found.')
+            return
+
+        workers = options['workers'] or default_worker_count()
+        chunks = split_into_chunks(employee_ids, max(options['chunk_size'], 1))
+        total = 0
+        tasks = run_in_processes(rebuild_month_summaries, chunks, workers, start, end)
+        for done, count in enumerate(tasks, start=1):
+            total += count
+            self.stdout.write(f'[{done}/{len(chunks)}] {total} summaries rebuilt')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {total} summaries for {len(employee_ids)} employees over '
+            f'{len(months_between(start, end))} month(s) using {workers} worker(s).'
+        ))
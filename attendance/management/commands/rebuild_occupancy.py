@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from attendance.occupancy_utils import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached live occupancy snapshots from recent biometric punches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--integration', type=int, action='append', dest='integrations',
+            help='Only rebuild this biometric integration (repeatable).',
+        )
+
+    def handle(self, *args, **options):
+        inside = rebuild_occupancy(options['integrations'])
+        self.stdout.write(self.style.SUCCESS(f'Occupancy rebuilt; {inside} employees currently inside.'))
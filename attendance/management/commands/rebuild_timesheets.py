@@ -0,0 +1,48 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.models import Attendance
+from attendance.timesheet_utils import rebuild_timesheets
+from backend.parallel import default_worker_count, run_in_processes, split_into_chunks
+
+
+class Command(BaseCommand):
+    help = 'Recompute Timesheet rows from Attendance for a date range in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, required=True)
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, required=True)
+        parser.add_argument('--department', type=int, help='Department id to limit the rebuild to.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes (defaults to the CPU count; always 1 on SQLite).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=200, help='Employees per worker task.')
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start > end:
+            raise CommandError('--from must be on or before --to.')
+
+        attendances = Attendance.objects.filter(date__gte=start, date__lte=end)
+        if options['department']:
+            attendances = attendances.filter(employee__department_id=options['department'])
+        employee_ids = sorted(set(attendances.values_list('employee_id', flat=True)))
+        if not employee_ids:
+            self.stdout.write('No attendance found for the requested range.')
+            return
+
+        workers = options['workers'] or default_worker_count()
+        chunks = split_into_chunks(employee_ids, max(options['chunk_size'], 1))
+        total = 0
+        for done, count in enumerate(run_in_processes(rebuild_timesheets, chunks, workers, start, end), start=1):
+            total += count
+            self.stdout.write(f'[{done}/{len(chunks)}] {total} timesheets rebuilt')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {total} timesheets for {len(employee_ids)} employees '
+            f'between {start} and {end} using {workers} worker(s).'
+        ))
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attendance.timesheet_utils import refresh_timesheets, stale_timesheet_keys
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute timesheets of attendance changed recently whose timesheet is older or missing, '
+        'e.g. deferred clock-in/out refreshes lost when a worker restarted. Run it periodically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=60, help='How far back to look for changed attendance.')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(minutes=max(options['minutes'], 1))
+        keys = stale_timesheet_keys(since)
+        refreshed = refresh_timesheets(keys)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} stale timesheets.'))
@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.archive_utils import restore_archive
+from attendance.models import BiometricPunchArchive
+
+
+class Command(BaseCommand):
+    help = (
+        'Restore archived biometric punches back into the punch table. '
+        'They are archived again by the next archive_biometric_punches run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive', type=int, help='Archive id to restore.')
+        parser.add_argument('--integration', type=int)
+        parser.add_argument('--month', help='Month to restore, as YYYY-MM.')
+
+    def handle(self, *args, **options):
+        archives = BiometricPunchArchive.objects.all()
+        if options['archive']:
+            archives = archives.filter(archive_id=options['archive'])
+        elif options['month']:
+            try:
+                month = date.fromisoformat(f"{options['month']}-01")
+            except ValueError as exc:
+                raise CommandError('--month must be formatted as YYYY-MM.') from exc
+            archives = archives.filter(month=month)
+            if options['integration']:
+                archives = archives.filter(integration_id=options['integration'])
+        else:
+            raise CommandError('Pass --archive, or --month with an optional --integration.')
+
+        archives = list(archives)
+        if not archives:
+            raise CommandError('No matching archives found.')
+        for archive in archives:
+            name = archive.file.name
+            restored = restore_archive(archive)
+            self.stdout.write(f'Restored {restored} punches from {name}')
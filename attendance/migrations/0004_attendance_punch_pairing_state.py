@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_timesheet_overtimerequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='break_seconds',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='first_punch_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='last_out_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='last_punch_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='open_punch_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='worked_seconds',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendance_punch_pairing_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BiometricPunchArchive',
+            fields=[
+                ('archive_id', models.AutoField(primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('file', models.FileField(upload_to='biometric_archives/')),
+                ('punch_count', models.IntegerField(default=0)),
+                ('first_punch_at', models.DateTimeField(blank=True, null=True)),
+                ('last_punch_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punch_archives', to='attendance.biometricintegration')),
+            ],
+            options={
+                'db_table': 'biometric_punch_archives',
+                'ordering': ['-month', 'integration'],
+            },
+        ),
+    ]
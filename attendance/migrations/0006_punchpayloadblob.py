@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_biometricpuncharchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PunchPayloadBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'biometric_payload_blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='biometricpunch',
+            name='payload_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='punches', to='attendance.punchpayloadblob'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_punchpayloadblob'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceException',
+            fields=[
+                ('exception_id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('Late', 'Late Arrival'), ('Early Exit', 'Early Exit'), ('Absent', 'Absent')], max_length=20)),
+                ('minutes', models.IntegerField(default=0)),
+                ('expected_time', models.TimeField(blank=True, null=True)),
+                ('actual_time', models.TimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_exceptions', to='employees.employee')),
+                ('shift', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_exceptions', to='attendance.shift')),
+            ],
+            options={
+                'db_table': 'attendance_exceptions',
+                'ordering': ['-date', 'employee'],
+                'indexes': [models.Index(fields=['date', 'kind'], name='attendance__date_5b7b0f_idx')],
+                'unique_together': {('employee', 'date', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_attendanceexception'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PunchAnomaly',
+            fields=[
+                ('anomaly_id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('Device Conflict', 'Device Conflict'), ('Excessive Punches', 'Excessive Punches'), ('Rounded Times', 'Rounded Times'), ('Hours Outlier', 'Hours Outlier')], max_length=30)),
+                ('date', models.DateField()),
+                ('score', models.FloatField(default=0)),
+                ('details', models.JSONField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('Open', 'Open'), ('Confirmed', 'Confirmed'), ('Dismissed', 'Dismissed')], default='Open', max_length=20)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punch_anomalies', to='employees.employee')),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_punch_anomalies', to='employees.employee')),
+            ],
+            options={
+                'db_table': 'punch_anomalies',
+                'ordering': ['-date', '-score'],
+                'unique_together': {('employee', 'kind', 'date')},
+            },
+        ),
+    ]
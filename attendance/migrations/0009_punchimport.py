@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_punchanomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PunchImport',
+            fields=[
+                ('import_id', models.AutoField(primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('rows_read', models.IntegerField(default=0)),
+                ('rows_skipped', models.IntegerField(default=0)),
+                ('punches_created', models.IntegerField(default=0)),
+                ('first_punch_at', models.DateTimeField(blank=True, null=True)),
+                ('last_punch_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('Importing', 'Importing'), ('Imported', 'Imported'), ('Completed', 'Completed')], default='Importing', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punch_imports', to='attendance.biometricintegration')),
+            ],
+            options={
+                'db_table': 'biometric_punch_imports',
+                'ordering': ['-created_at'],
+                'unique_together': {('integration', 'fingerprint')},
+            },
+        ),
+    ]
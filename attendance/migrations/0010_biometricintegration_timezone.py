@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_punchimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='biometricintegration',
+            name='timezone',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
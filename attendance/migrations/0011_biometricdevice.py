@@ -0,0 +1,57 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def register_integration_devices(apps, schema_editor):
+    BiometricIntegration = apps.get_model('attendance', 'BiometricIntegration')
+    BiometricDevice = apps.get_model('attendance', 'BiometricDevice')
+    BiometricDevice.objects.bulk_create([
+        BiometricDevice(integration_id=integration_id, device_id=device_id.strip())
+        for integration_id, device_id in (
+            BiometricIntegration.objects
+            .exclude(device_id__isnull=True)
+            .values_list('integration_id', 'device_id')
+        )
+        if device_id.strip()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_biometricintegration_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BiometricDevice',
+            fields=[
+                ('biometric_device_id', models.AutoField(primary_key=True, serialize=False)),
+                ('device_id', models.CharField(max_length=100)),
+                ('name', models.CharField(blank=True, default='', max_length=100)),
+                ('location', models.CharField(blank=True, default='', max_length=255)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_seen_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('last_heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('last_punch_at', models.DateTimeField(blank=True, null=True)),
+                ('punch_count', models.BigIntegerField(default=0)),
+                ('hour_started_at', models.DateTimeField(blank=True, null=True)),
+                ('punches_this_hour', models.IntegerField(default=0)),
+                ('punches_last_hour', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('last_error_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='devices', to='attendance.biometricintegration')),
+            ],
+            options={
+                'db_table': 'biometric_devices',
+                'ordering': ['integration', 'device_id'],
+                'unique_together': {('integration', 'device_id')},
+            },
+        ),
+        migrations.RunPython(register_integration_devices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_biometricdevice'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfflineClockEvent',
+            fields=[
+                ('event_id', models.AutoField(primary_key=True, serialize=False)),
+                ('idempotency_key', models.CharField(max_length=100)),
+                ('action', models.CharField(choices=[('clock_in', 'Clock In'), ('clock_out', 'Clock Out')], max_length=20)),
+                ('client_time', models.DateTimeField()),
+                ('recorded_time', models.DateTimeField()),
+                ('skew_seconds', models.IntegerField(default=0)),
+                ('attendance_date', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('Applied', 'Applied'), ('Ignored', 'Ignored'), ('Rejected', 'Rejected')], max_length=20)),
+                ('message', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offline_clock_events', to='employees.employee')),
+            ],
+            options={
+                'db_table': 'offline_clock_events',
+                'ordering': ['-recorded_time'],
+                'unique_together': {('employee', 'idempotency_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0012_offlineclockevent'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthSummary',
+            fields=[
+                ('summary_id', models.AutoField(primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('present_days', models.IntegerField(default=0)),
+                ('half_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('leave_days', models.IntegerField(default=0)),
+                ('working_hours', models.DecimalField(decimal_places=2, default=0.0, max_digits=7)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0.0, max_digits=7)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='employees.employee')),
+            ],
+            options={
+                'db_table': 'attendance_month_summaries',
+                'ordering': ['-month'],
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0013_attendancemonthsummary'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRegularization',
+            fields=[
+                ('regularization_id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('clock_in_time', models.TimeField(blank=True, null=True)),
+                ('clock_out_time', models.TimeField(blank=True, null=True)),
+                ('attendance_status', models.CharField(choices=[('Present', 'Present'), ('Absent', 'Absent'), ('Leave', 'Leave'), ('Half Day', 'Half Day')], default='Present', max_length=20)),
+                ('reason', models.TextField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Approved', 'Approved'), ('Rejected', 'Rejected')], default='Pending', max_length=20)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='approved_attendance_regularizations', to='employees.employee')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_regularizations', to='employees.employee')),
+            ],
+            options={
+                'db_table': 'attendance_regularizations',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'applied_at'], name='attendance__status_2f033f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:07
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0014_attendanceregularization'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClockRequest',
+            fields=[
+                ('request_id', models.AutoField(primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('clock_in', 'Clock In'), ('clock_out', 'Clock Out')], max_length=20)),
+                ('idempotency_key', models.CharField(max_length=100)),
+                ('response', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clock_requests', to='employees.employee')),
+            ],
+            options={
+                'db_table': 'clock_requests',
+                'ordering': ['-created_at'],
+                'unique_together': {('employee', 'action', 'idempotency_key')},
+            },
+        ),
+    ]
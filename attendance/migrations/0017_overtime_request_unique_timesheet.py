@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0016_cache_table'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='overtimerequest',
+            constraint=models.UniqueConstraint(condition=models.Q(('timesheet__isnull', False)), fields=('timesheet',), name='unique_overtime_request_timesheet'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0017_overtime_request_unique_timesheet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='punchimport',
+            name='prefix_size',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0018_punchimport_prefix_size'),
+        ('employees', '0010_seed_demo_users'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='biometricpunch',
+            index=models.Index(fields=['employee', 'punch_time'], name='biometric_p_employe_05aa52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='biometricpunch',
+            index=models.Index(fields=['punch_time'], name='biometric_p_punch_t_7cea22_idx'),
+        ),
+    ]
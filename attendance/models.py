@@ -1,4 +1,5 @@
 import secrets
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from employees.models import Employee
 
@@ -24,6 +25,14 @@ class Attendance(models.Model):
     working_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Present')
     notes = models.TextField(blank=True, null=True)
+    # Punch pairing state kept by the derivation engine so new punches can be
+    # appended without rescanning the shift window.
+    first_punch_at = models.DateTimeField(blank=True, null=True)
+    last_punch_at = models.DateTimeField(blank=True, null=True)
+    open_punch_at = models.DateTimeField(blank=True, null=True)
+    last_out_at = models.DateTimeField(blank=True, null=True)
+    worked_seconds = models.IntegerField(default=0)
+    break_seconds = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -107,6 +116,8 @@ class BiometricIntegration(models.Model):
     credentials = models.JSONField(blank=True, null=True)
     data_mapping = models.JSONField(blank=True, null=True)
     webhook_token = models.CharField(max_length=64, unique=True, default=default_biometric_token)
+    # IANA name of the site's timezone; blank means settings.TIME_ZONE.
+    timezone = models.CharField(max_length=64, blank=True, default='')
     is_active = models.BooleanField(default=True)
     auto_sync = models.BooleanField(default=True)
     last_sync_at = models.DateTimeField(blank=True, null=True)
@@ -123,6 +134,59 @@ class BiometricIntegration(models.Model):
         return f"{self.provider} - {self.display_name}"
 
 
+class BiometricDevice(models.Model):
+    """A terminal reporting through an integration, with its health counters.
+
+    Devices register themselves on their first punch or heartbeat. Counters
+    are updated in place on every hit, so health checks never scan punches.
+    """
+    biometric_device_id = models.AutoField(primary_key=True)
+    integration = models.ForeignKey(
+        BiometricIntegration,
+        on_delete=models.CASCADE,
+        related_name='devices'
+    )
+    device_id = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, blank=True, default='')
+    location = models.CharField(max_length=255, blank=True, default='')
+    is_active = models.BooleanField(default=True)
+    last_seen_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    last_heartbeat_at = models.DateTimeField(blank=True, null=True)
+    last_punch_at = models.DateTimeField(blank=True, null=True)
+    punch_count = models.BigIntegerField(default=0)
+    # Punches received in the current and the previous clock hour.
+    hour_started_at = models.DateTimeField(blank=True, null=True)
+    punches_this_hour = models.IntegerField(default=0)
+    punches_last_hour = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    last_error_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'biometric_devices'
+        unique_together = ['integration', 'device_id']
+        ordering = ['integration', 'device_id']
+
+    def __str__(self):
+        return f"{self.integration.display_name} - {self.name or self.device_id}"
+
+
+class PunchPayloadBlob(models.Model):
+    """Compressed device envelope shared by every punch with identical content."""
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    size = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'biometric_payload_blobs'
+
+    def __str__(self):
+        return self.digest
+
+
 class BiometricPunch(models.Model):
     punch_id = models.AutoField(primary_key=True)
     integration = models.ForeignKey(
@@ -141,16 +205,64 @@ class BiometricPunch(models.Model):
     device_id = models.CharField(max_length=100, blank=True, null=True)
     punch_time = models.DateTimeField()
     direction = models.CharField(max_length=20, blank=True, null=True)
+    # Legacy rows keep the full item here; new punches reference a shared blob.
     raw_payload = models.JSONField(blank=True, null=True)
+    payload_blob = models.ForeignKey(
+        PunchPayloadBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='punches'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'biometric_punches'
         ordering = ['-punch_time']
+        # Derivation, archiving and anomaly detection read punches by time range.
+        indexes = [
+            models.Index(fields=['employee', 'punch_time']),
+            models.Index(fields=['punch_time']),
+        ]
 
     def __str__(self):
         return f"{self.employee_identifier or self.employee_id} - {self.punch_time}"
 
+    @property
+    def payload(self):
+        if self.raw_payload is not None or not self.payload_blob_id:
+            return self.raw_payload
+        from .payload_utils import expand_payload
+        return expand_payload(
+            self.payload_blob.data,
+            self.employee_identifier,
+            self.punch_time,
+            self.direction,
+        )
+
+
+class BiometricPunchArchive(models.Model):
+    """Compressed NDJSON export of punches moved out of ``biometric_punches``."""
+    archive_id = models.AutoField(primary_key=True)
+    integration = models.ForeignKey(
+        BiometricIntegration,
+        on_delete=models.CASCADE,
+        related_name='punch_archives'
+    )
+    month = models.DateField()
+    file = models.FileField(upload_to='biometric_archives/')
+    punch_count = models.IntegerField(default=0)
+    first_punch_at = models.DateTimeField(blank=True, null=True)
+    last_punch_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'biometric_punch_archives'
+        ordering = ['-month', 'integration']
+
+    def __str__(self):
+        return f"{self.integration} - {self.month:%Y-%m} ({self.punch_count} punches)"
+
 
 class Timesheet(models.Model):
     STATUS_CHOICES = [
@@ -230,6 +342,283 @@ class OvertimeRequest(models.Model):
     class Meta:
         db_table = 'overtime_requests'
         ordering = ['-created_at']
+        constraints = [
+            # Concurrent generate runs cannot file a timesheet's overtime twice.
+            models.UniqueConstraint(
+                fields=['timesheet'],
+                condition=models.Q(timesheet__isnull=False),
+                name='unique_overtime_request_timesheet',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.employee.full_name} - {self.date} ({self.hours}h)"
+
+
+class AttendanceException(models.Model):
+    """Late arrival, early exit or absence found by the nightly shift comparison."""
+    KIND_CHOICES = [
+        ('Late', 'Late Arrival'),
+        ('Early Exit', 'Early Exit'),
+        ('Absent', 'Absent'),
+    ]
+
+    exception_id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='attendance_exceptions'
+    )
+    shift = models.ForeignKey(
+        Shift,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='attendance_exceptions'
+    )
+    date = models.DateField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    minutes = models.IntegerField(default=0)
+    expected_time = models.TimeField(blank=True, null=True)
+    actual_time = models.TimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'attendance_exceptions'
+        unique_together = ['employee', 'date', 'kind']
+        ordering = ['-date', 'employee']
+        indexes = [models.Index(fields=['date', 'kind'])]
+
+    def __str__(self):
+        return f"{self.employee.full_name} - {self.date} ({self.kind})"
+
+
+class PunchAnomaly(models.Model):
+    """Suspicious punch pattern flagged by detect_punch_anomalies, awaiting review."""
+    KIND_CHOICES = [
+        ('Device Conflict', 'Device Conflict'),
+        ('Excessive Punches', 'Excessive Punches'),
+        ('Rounded Times', 'Rounded Times'),
+        ('Hours Outlier', 'Hours Outlier'),
+    ]
+    STATUS_CHOICES = [
+        ('Open', 'Open'),
+        ('Confirmed', 'Confirmed'),
+        ('Dismissed', 'Dismissed'),
+    ]
+
+    anomaly_id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='punch_anomalies'
+    )
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    # Day of the anomaly; month-level kinds use the first day of the month.
+    date = models.DateField()
+    score = models.FloatField(default=0)
+    details = models.JSONField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Open')
+    reviewed_by = models.ForeignKey(
+        Employee,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reviewed_punch_anomalies'
+    )
+    reviewed_at = models.DateTimeField(blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'punch_anomalies'
+        unique_together = ['employee', 'kind', 'date']
+        ordering = ['-date', '-score']
+
+    def __str__(self):
+        return f"{self.employee.full_name} - {self.date} ({self.kind})"
+
+
+class PunchImport(models.Model):
+    """Checkpoint of a historical device export file being imported."""
+    STATUS_CHOICES = [
+        ('Importing', 'Importing'),
+        ('Imported', 'Imported'),
+        ('Completed', 'Completed'),
+    ]
+
+    import_id = models.AutoField(primary_key=True)
+    integration = models.ForeignKey(
+        BiometricIntegration,
+        on_delete=models.CASCADE,
+        related_name='punch_imports'
+    )
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField(default=0)
+    # Hash of the first prefix_size bytes, so renamed and grown copies resume too.
+    fingerprint = models.CharField(max_length=64)
+    prefix_size = models.IntegerField(default=0)
+    rows_read = models.IntegerField(default=0)
+    rows_skipped = models.IntegerField(default=0)
+    punches_created = models.IntegerField(default=0)
+    first_punch_at = models.DateTimeField(blank=True, null=True)
+    last_punch_at = models.DateTimeField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Importing')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'biometric_punch_imports'
+        unique_together = ['integration', 'fingerprint']
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+
+class ClockRequest(models.Model):
+    """Outcome of an online clock-in/out sent with an idempotency key.
+
+    The row is inserted in the same transaction as the clock update, so a
+    retry reaching any worker either waits for the first attempt or
+    replays its stored response.
+    """
+    ACTION_CHOICES = [
+        ('clock_in', 'Clock In'),
+        ('clock_out', 'Clock Out'),
+    ]
+
+    request_id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='clock_requests'
+    )
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    idempotency_key = models.CharField(max_length=100)
+    response = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'clock_requests'
+        unique_together = ['employee', 'action', 'idempotency_key']
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.employee.full_name} - {self.action} ({self.idempotency_key})"
+
+
+class OfflineClockEvent(models.Model):
+    """A clock event queued on a phone while offline and synced later.
+
+    Kept per (employee, idempotency key) so a retried sync returns the
+    original outcome instead of applying the event twice.
+    """
+    ACTION_CHOICES = [
+        ('clock_in', 'Clock In'),
+        ('clock_out', 'Clock Out'),
+    ]
+    STATUS_CHOICES = [
+        ('Applied', 'Applied'),
+        ('Ignored', 'Ignored'),
+        ('Rejected', 'Rejected'),
+    ]
+
+    event_id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='offline_clock_events'
+    )
+    idempotency_key = models.CharField(max_length=100)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    client_time = models.DateTimeField()
+    # client_time corrected by the batch's measured clock skew
+    recorded_time = models.DateTimeField()
+    skew_seconds = models.IntegerField(default=0)
+    attendance_date = models.DateField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    message = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'offline_clock_events'
+        unique_together = ['employee', 'idempotency_key']
+        ordering = ['-recorded_time']
+
+    def __str__(self):
+        return f"{self.employee.full_name} - {self.action} {self.recorded_time} ({self.status})"
+
+
+class AttendanceMonthSummary(models.Model):
+    """Per-employee monthly totals of attendance and timesheets.
+
+    Maintained by ``summary_utils`` whenever attendance, timesheets or
+    approved leave change; rebuilt in bulk by ``rebuild_attendance_summaries``.
+    """
+    summary_id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='attendance_summaries'
+    )
+    month = models.DateField()  # first day of the month
+    present_days = models.IntegerField(default=0)
+    half_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    leave_days = models.IntegerField(default=0)
+    working_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0.00)
+    overtime_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'attendance_month_summaries'
+        unique_together = ['employee', 'month']
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.employee.full_name} - {self.month:%Y-%m}"
+
+
+class AttendanceRegularization(models.Model):
+    """Employee request to correct a day's attendance, e.g. after a missed punch."""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Approved', 'Approved'),
+        ('Rejected', 'Rejected'),
+    ]
+
+    regularization_id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='attendance_regularizations'
+    )
+    date = models.DateField()
+    # Blank times keep the recorded value.
+    clock_in_time = models.TimeField(blank=True, null=True)
+    clock_out_time = models.TimeField(blank=True, null=True)
+    attendance_status = models.CharField(max_length=20, choices=Attendance.STATUS_CHOICES, default='Present')
+    reason = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    approved_by = models.ForeignKey(
+        Employee,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='approved_attendance_regularizations'
+    )
+    approved_at = models.DateTimeField(blank=True, null=True)
+    # Set once the approved correction has been written to attendance.
+    applied_at = models.DateTimeField(blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'attendance_regularizations'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'applied_at'])]
+
+    def __str__(self):
+        return f"{self.employee.full_name} - {self.date} ({self.status})"
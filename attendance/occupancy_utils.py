@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .derivation_utils import IN, OUT, normalize_direction
+from .models import BiometricPunch
+
+
+logger = logging.getLogger(__name__)
+
+# One snapshot per site (integration), shaped for serving without recomputation:
+#   {'updated_at': iso, 'devices': {device_id: count},
+#    'employees': {employee_id: {'name', 'device_id', 'since'}}}
+# Only employees currently inside are kept, so a snapshot stays as small as
+# the site's headcount.
+OCCUPANCY_KEY = 'attendance:occupancy:{}'
+OCCUPANCY_SITES_KEY = 'attendance:occupancy:sites'
+_LOCK_KEY = 'attendance:occupancy:lock:{}'
+_LOCK_ATTEMPTS = 50
+# Set when a batch could not be folded; the site's next fold rebuilds instead.
+_STALE_KEY = 'attendance:occupancy:stale:{}'
+
+
+class OccupancyLockTimeout(Exception):
+    """Raised when a site's occupancy lock stays held for the whole wait."""
+
+
+def _empty_snapshot() -> Dict[str, Any]:
+    return {'updated_at': None, 'devices': {}, 'employees': {}}
+
+
+@contextmanager
+def _site_lock(integration_id: int):
+    # cache.add is atomic, so concurrent ingestion for a site is serialized
+    # across workers; a holder that died releases the lock after the timeout.
+    key = _LOCK_KEY.format(integration_id)
+    for _ in range(_LOCK_ATTEMPTS):
+        if cache.add(key, 1, 10):
+            break
+        time.sleep(0.02)
+    else:
+        raise OccupancyLockTimeout(integration_id)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def _cutoff(now: datetime) -> datetime:
+    return now - timedelta(hours=settings.OCCUPANCY_MAX_HOURS)
+
+
+def _apply(snapshot: Dict[str, Any], employee, device_id: Optional[str], punch_time: datetime, direction: Any) -> None:
+    employees = snapshot['employees']
+    devices = snapshot['devices']
+    key = str(employee.employee_id)
+    entry = employees.get(key)
+    if entry and punch_time < datetime.fromisoformat(entry['since']):
+        return  # late-arriving older punch
+    kind = normalize_direction(direction)
+    if kind is None:
+        # Devices without a direction alternate IN/OUT, as in attendance derivation.
+        kind = OUT if entry else IN
+    if entry:
+        previous = entry['device_id'] or ''
+        devices[previous] = devices.get(previous, 1) - 1
+        if devices[previous] <= 0:
+            del devices[previous]
+        del employees[key]
+    if kind == IN:
+        employees[key] = {
+            'name': employee.full_name,
+            'device_id': device_id,
+            'since': punch_time.isoformat(),
+        }
+        devices[device_id or ''] = devices.get(device_id or '', 0) + 1
+
+
+def _prune(snapshot: Dict[str, Any], now: datetime) -> None:
+    """Drop occupants whose last IN is older than OCCUPANCY_MAX_HOURS (missed check-outs)."""
+    cutoff = _cutoff(now)
+    expired = [
+        key for key, entry in snapshot['employees'].items()
+        if datetime.fromisoformat(entry['since']) < cutoff
+    ]
+    for key in expired:
+        device = snapshot['employees'].pop(key)['device_id'] or ''
+        snapshot['devices'][device] = snapshot['devices'].get(device, 1) - 1
+        if snapshot['devices'][device] <= 0:
+            del snapshot['devices'][device]
+
+
+def _store(integration_id: int, snapshot: Dict[str, Any], now: datetime) -> None:
+    _prune(snapshot, now)
+    snapshot['updated_at'] = now.isoformat()
+    cache.set(OCCUPANCY_KEY.format(integration_id), snapshot, None)
+    if integration_id in occupancy_sites():
+        return
+    # The site list is shared by every site, so it is only changed under its own lock.
+    with _site_lock('sites'):
+        sites = occupancy_sites()
+        if integration_id not in sites:
+            cache.set(OCCUPANCY_SITES_KEY, sorted(sites + [integration_id]), None)
+
+
+def record_occupancy(
+    integration_id: int,
+    device_id: Optional[str],
+    punches: Iterable[Dict[str, Any]],
+    now: Optional[datetime] = None,
+) -> None:
+    """Fold a batch of parsed punches into the site's occupancy snapshot.
+
+    Called by the ingestion path after each stored batch. Punches without a
+    resolved employee, or older than OCCUPANCY_MAX_HOURS (backfills), are
+    ignored. Inside a transaction the snapshot is updated once it commits,
+    so a rolled-back batch never shows up. If the site stays locked, the
+    batch is not folded and the site is marked stale; its next fold then
+    rebuilds the snapshot from the stored punches.
+    """
+    now = now or timezone.now()
+    cutoff = _cutoff(now)
+    live = sorted(
+        (
+            punch for punch in punches
+            if punch['employee'] is not None and cutoff <= punch['punch_time'] <= now + timedelta(minutes=5)
+        ),
+        key=lambda punch: punch['punch_time'],
+    )
+    if not live:
+        return
+
+    def fold():
+        stale_key = _STALE_KEY.format(integration_id)
+        try:
+            with _site_lock(integration_id):
+                if cache.get(stale_key):
+                    snapshot = _replay([integration_id], timezone.now())[integration_id]
+                    cache.delete(stale_key)
+                else:
+                    snapshot = cache.get(OCCUPANCY_KEY.format(integration_id)) or _empty_snapshot()
+                    for punch in live:
+                        _apply(snapshot, punch['employee'], device_id, punch['punch_time'], punch['direction'])
+                _store(integration_id, snapshot, now)
+        except OccupancyLockTimeout:
+            logger.warning('Occupancy of site %s stayed locked; rebuilding on its next batch.', integration_id)
+            cache.set(stale_key, True, None)
+    transaction.on_commit(fold)
+
+
+def _replay(integration_ids: Optional[List[int]], now: datetime) -> Dict[int, Dict[str, Any]]:
+    punches = (
+        BiometricPunch.objects
+        .filter(employee__isnull=False, punch_time__gte=_cutoff(now), punch_time__lte=now)
+        .select_related('employee')
+        .only(
+            'integration_id', 'device_id', 'punch_time', 'direction',
+            'employee__employee_id', 'employee__first_name', 'employee__last_name',
+        )
+        .order_by('punch_time', 'punch_id')
+    )
+    if integration_ids is not None:
+        punches = punches.filter(integration_id__in=integration_ids)
+    snapshots: Dict[int, Dict[str, Any]] = {
+        integration_id: _empty_snapshot() for integration_id in integration_ids or []
+    }
+    for punch in punches.iterator(chunk_size=2000):
+        snapshot = snapshots.setdefault(punch.integration_id, _empty_snapshot())
+        _apply(snapshot, punch.employee, punch.device_id, punch.punch_time, punch.direction)
+    return snapshots
+
+
+def rebuild_occupancy(integration_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None) -> int:
+    """Recreate snapshots from the recent punches, e.g. after a cache flush.
+
+    Reads only punches inside the OCCUPANCY_MAX_HOURS window. Returns the
+    number of employees currently inside across the rebuilt sites.
+    """
+    now = now or timezone.now()
+    snapshots = _replay(list(integration_ids) if integration_ids is not None else None, now)
+    for integration_id, snapshot in snapshots.items():
+        with _site_lock(integration_id):
+            _store(integration_id, snapshot, now)
+            cache.delete(_STALE_KEY.format(integration_id))
+    return sum(len(snapshot['employees']) for snapshot in snapshots.values())
+
+
+def site_occupancy(integration_id: int) -> Dict[str, Any]:
+    return cache.get(OCCUPANCY_KEY.format(integration_id)) or _empty_snapshot()
+
+
+def occupancy_sites() -> List[int]:
+    return cache.get(OCCUPANCY_SITES_KEY) or []
+
+
+def all_occupancy() -> Dict[int, Dict[str, Any]]:
+    """Snapshots of every site seen so far, read with one cache round trip."""
+    sites = occupancy_sites()
+    found = cache.get_many([OCCUPANCY_KEY.format(integration_id) for integration_id in sites])
+    return {
+        integration_id: found.get(OCCUPANCY_KEY.format(integration_id)) or _empty_snapshot()
+        for integration_id in sites
+    }
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .live_utils import publish_attendance
+from .models import Attendance, OfflineClockEvent
+from .shift_utils import ShiftResolver
+from .timesheet_utils import _calculate_working_hours, upsert_timesheets_from_attendance
+
+
+OFFLINE_ATTENDANCE_FIELDS = ['clock_in_time', 'clock_out_time', 'working_hours', 'status', 'updated_at']
+
+
+class ClockSkewError(ValueError):
+    """Raised when a device clock is too far off to correct reliably."""
+
+
+def clock_correction(sent_at: Optional[datetime], now: datetime) -> timedelta:
+    """Offset to add to the batch's client timestamps.
+
+    ``sent_at`` is the device clock at upload time, so ``now - sent_at`` is
+    the device's skew. Small skews are trusted as-is, larger ones are
+    corrected, and beyond ``OFFLINE_CLOCK_MAX_SKEW_SECONDS`` the batch is
+    refused rather than guessed at.
+    """
+    if sent_at is None:
+        return timedelta()
+    skew = now - sent_at
+    seconds = abs(skew.total_seconds())
+    if seconds <= settings.OFFLINE_CLOCK_SKEW_TOLERANCE_SECONDS:
+        return timedelta()
+    if seconds > settings.OFFLINE_CLOCK_MAX_SKEW_SECONDS:
+        raise ClockSkewError(f'Device clock is off by {int(seconds)} seconds.')
+    return skew
+
+
+def _parse_time(value: Any, field: str) -> datetime:
+    try:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'{field} must be an ISO-8601 timestamp.')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_offline_batch(payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+    """Validate a sync request body; raises ``ValueError`` describing the first problem."""
+    events = payload.get('events')
+    if not isinstance(events, list) or not events:
+        raise ValueError('events must be a non-empty list.')
+    if len(events) > settings.OFFLINE_CLOCK_MAX_EVENTS:
+        raise ValueError(f'At most {settings.OFFLINE_CLOCK_MAX_EVENTS} events per request.')
+    actions = {action for action, _ in OfflineClockEvent.ACTION_CHOICES}
+    parsed = []
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            raise ValueError(f'events[{index}] must be an object.')
+        key = str(event.get('idempotency_key') or '').strip()
+        if not key or len(key) > 100:
+            raise ValueError(f'events[{index}].idempotency_key is required (max 100 characters).')
+        if event.get('action') not in actions:
+            raise ValueError(f'events[{index}].action must be one of: {", ".join(sorted(actions))}.')
+        parsed.append({
+            'idempotency_key': key,
+            'action': event['action'],
+            'timestamp': _parse_time(event.get('timestamp'), f'events[{index}].timestamp'),
+        })
+    sent_at = payload.get('sent_at')
+    return parsed, _parse_time(sent_at, 'sent_at') if sent_at else None
+
+
+def _span(attendance: Attendance) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Naive local clock-in/out of a row; a clock-out before the clock-in is on the next day."""
+    start = datetime.combine(attendance.date, attendance.clock_in_time) if attendance.clock_in_time else None
+    end = datetime.combine(attendance.date, attendance.clock_out_time) if attendance.clock_out_time else None
+    if start and end and end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+class _OfflineDay:
+    """Attendance rows of one employee around the synced events, changed in memory."""
+
+    def __init__(self, employee_id: int, first: date, last: date):
+        self.employee_id = employee_id
+        self.rows: Dict[date, Attendance] = {
+            attendance.date: attendance
+            for attendance in (
+                Attendance.objects
+                .select_for_update()
+                .filter(employee_id=employee_id, date__gte=first - timedelta(days=1), date__lte=last)
+            )
+        }
+        self.touched: Dict[date, Attendance] = {}
+
+    def clock_in(self, local: datetime) -> Tuple[str, date, str]:
+        day = local.date()
+        attendance = self.rows.get(day)
+        if attendance is None:
+            attendance = self.rows[day] = Attendance(employee_id=self.employee_id, date=day)
+        start, _ = _span(attendance)
+        if start and start <= local:
+            return 'Ignored', day, 'Already clocked in'
+        # An earlier offline clock-in is the true start of the day.
+        attendance.clock_in_time = local.time().replace(microsecond=0)
+        attendance.status = 'Present'
+        self.touched[day] = attendance
+        return 'Applied', day, 'Clocked in'
+
+    def clock_out(self, local: datetime) -> Tuple[str, Optional[date], str]:
+        # Same rule as the online clock-out: today's attendance, or yesterday's
+        # if it is still open (overnight shifts).
+        today = self.rows.get(local.date())
+        yesterday = self.rows.get(local.date() - timedelta(days=1))
+        if today and today.clock_in_time and _span(today)[0] <= local:
+            attendance = today
+        elif yesterday and yesterday.clock_in_time and not yesterday.clock_out_time:
+            attendance = yesterday
+        else:
+            return 'Rejected', None, 'No clock-in found to close.'
+        start, end = _span(attendance)
+        if local < start or (local - start) > timedelta(days=1):
+            return 'Rejected', attendance.date, 'Clock-out is outside the open attendance.'
+        if end and end >= local:
+            return 'Ignored', attendance.date, 'Already clocked out'
+        attendance.clock_out_time = local.time().replace(microsecond=0)
+        self.touched[attendance.date] = attendance
+        return 'Applied', attendance.date, 'Clocked out'
+
+
+def _result(event: OfflineClockEvent, duplicate: bool = False) -> Dict[str, Any]:
+    return {
+        'idempotency_key': event.idempotency_key,
+        'action': event.action,
+        'status': event.status,
+        'date': event.attendance_date,
+        'recorded_time': event.recorded_time,
+        'message': event.message,
+        'duplicate': duplicate,
+    }
+
+
+def sync_offline_events(
+    employee_id: int,
+    events: List[Dict[str, Any]],
+    sent_at: Optional[datetime] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Apply a batch of queued clock events for one employee in one transaction.
+
+    ``events`` are dicts with ``idempotency_key``, ``action`` (clock_in /
+    clock_out) and an aware ``timestamp``. Events are replayed in time
+    order against the employee's attendance; keys seen before return their
+    stored outcome. Touched attendance rows and their timesheets are
+    upserted in bulk. Raises ``ClockSkewError`` when the device clock is
+    beyond the skew policy.
+    """
+    now = now or timezone.now()
+    correction = clock_correction(sent_at, now)
+    tolerance = timedelta(seconds=settings.OFFLINE_CLOCK_SKEW_TOLERANCE_SECONDS)
+    oldest = now - timedelta(days=settings.OFFLINE_CLOCK_MAX_AGE_DAYS)
+
+    with transaction.atomic():
+        known = {
+            event.idempotency_key: event
+            for event in OfflineClockEvent.objects.filter(
+                employee_id=employee_id,
+                idempotency_key__in=[event['idempotency_key'] for event in events],
+            )
+        }
+        pending: List[OfflineClockEvent] = []
+        for event in events:
+            if event['idempotency_key'] in known:
+                continue
+            recorded = event['timestamp'] + correction
+            record = OfflineClockEvent(
+                employee_id=employee_id,
+                idempotency_key=event['idempotency_key'],
+                action=event['action'],
+                client_time=event['timestamp'],
+                recorded_time=recorded,
+                skew_seconds=int(correction.total_seconds()),
+            )
+            if recorded > now + tolerance:
+                record.status, record.message = 'Rejected', 'Event is in the future.'
+            elif recorded < oldest:
+                record.status, record.message = 'Rejected', 'Event is too old to sync.'
+            known[record.idempotency_key] = record
+            pending.append(record)
+
+        replay = [record for record in pending if not record.status]
+        replay.sort(key=lambda record: (record.recorded_time, record.action != 'clock_in'))
+        days = None
+        if replay:
+            local_days = [timezone.localtime(record.recorded_time).date() for record in replay]
+            days = _OfflineDay(employee_id, min(local_days), max(local_days))
+            for record in replay:
+                local = timezone.localtime(record.recorded_time).replace(tzinfo=None)
+                handler = days.clock_in if record.action == 'clock_in' else days.clock_out
+                record.status, record.attendance_date, record.message = handler(local)
+
+        if days and days.touched:
+            attendances = list(days.touched.values())
+            for attendance in attendances:
+                attendance.working_hours = _calculate_working_hours(attendance)
+            Attendance.objects.bulk_create(
+                [
+                    Attendance(
+                        employee_id=employee_id,
+                        date=attendance.date,
+                        clock_in_time=attendance.clock_in_time,
+                        clock_out_time=attendance.clock_out_time,
+                        working_hours=attendance.working_hours,
+                        status=attendance.status,
+                        notes=attendance.notes,
+                    )
+                    for attendance in attendances
+                ],
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=OFFLINE_ATTENDANCE_FIELDS,
+            )
+            resolver = ShiftResolver([employee_id], min(days.touched), max(days.touched))
+            upsert_timesheets_from_attendance(attendances, resolver, source='Attendance')
+        OfflineClockEvent.objects.bulk_create(pending)
+        # Only once the idempotency keys are stored; a concurrent sync of the same keys rolls back above.
+        if days and days.touched:
+            publish_attendance(attendances)
+
+    new_keys = {record.idempotency_key for record in pending}
+    results = []
+    counts = {'Applied': 0, 'Ignored': 0, 'Rejected': 0}
+    for event in events:
+        record = known[event['idempotency_key']]
+        duplicate = record.idempotency_key not in new_keys
+        new_keys.discard(record.idempotency_key)
+        if not duplicate:
+            counts[record.status] += 1
+        results.append(_result(record, duplicate))
+    return {
+        'applied': counts['Applied'],
+        'ignored': counts['Ignored'],
+        'rejected': counts['Rejected'],
+        'duplicates': sum(result['duplicate'] for result in results),
+        'skew_seconds': int(correction.total_seconds()),
+        'results': results,
+    }
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import OvertimeRequest, Timesheet
+
+
+AUTO_OVERTIME_REASON = 'Generated from timesheet overtime.'
+
+
+def generate_overtime_requests(
+    start: date,
+    end: date,
+    department_id: Optional[int] = None,
+    batch_size: int = 1000,
+) -> int:
+    """Create pending overtime requests for timesheets with overtime between ``start`` and ``end``.
+
+    Timesheets that already have a request, either linked to them or filed
+    by hand for the same employee and date, are skipped, so reruns only pick
+    up new overtime. One select and one bulk insert regardless of headcount;
+    requests a concurrent run inserted first are skipped by the unique
+    timesheet constraint, and the count is of rows actually inserted.
+    """
+    existing = OvertimeRequest.objects.filter(
+        Q(timesheet=OuterRef('pk')) | Q(employee=OuterRef('employee'), date=OuterRef('date'))
+    )
+    timesheets = (
+        Timesheet.objects
+        .filter(
+            date__gte=start,
+            date__lte=end,
+            overtime_hours__gt=0,
+            overtime_hours__gte=Decimal(str(settings.OVERTIME_REQUEST_MIN_HOURS)),
+        )
+        .exclude(status='Rejected')
+        .filter(~Exists(existing))
+    )
+    if department_id:
+        timesheets = timesheets.filter(employee__department_id=department_id)
+
+    requests = [
+        OvertimeRequest(
+            employee_id=row['employee_id'],
+            timesheet_id=row['timesheet_id'],
+            date=row['date'],
+            hours=row['overtime_hours'],
+            reason=AUTO_OVERTIME_REASON,
+            status='Pending',
+        )
+        for row in timesheets.values('timesheet_id', 'employee_id', 'date', 'overtime_hours')
+    ]
+    if not requests:
+        return 0
+    timesheet_ids = [overtime_request.timesheet_id for overtime_request in requests]
+    with transaction.atomic():
+        already_filed = OvertimeRequest.objects.filter(timesheet_id__in=timesheet_ids).count()
+        OvertimeRequest.objects.bulk_create(requests, batch_size=batch_size, ignore_conflicts=True)
+        return OvertimeRequest.objects.filter(timesheet_id__in=timesheet_ids).count() - already_filed
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence
+
+from django.db import connection
+
+if TYPE_CHECKING:
+    from .biometric_utils import PunchExtractor
+
+
+def _without_path(value: Any, parts: Sequence[str]) -> Any:
+    """Copy of ``value`` with the leaf at ``parts`` removed; untouched branches are shared."""
+    if not isinstance(value, dict) or parts[0] not in value:
+        return value
+    head, rest = parts[0], parts[1:]
+    copy = dict(value)
+    if rest:
+        copy[head] = _without_path(value[head], rest)
+    else:
+        del copy[head]
+    return copy
+
+
+def _set_path(value: Dict[str, Any], parts: Sequence[str], leaf: Any) -> None:
+    for part in parts[:-1]:
+        child = value.get(part)
+        if not isinstance(child, dict):
+            child = value[part] = {}
+        value = child
+    value[parts[-1]] = leaf
+
+
+def _get_path(value: Any, parts: Sequence[str]) -> Any:
+    for part in parts:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def split_payload(item: Dict[str, Any], extractor: 'PunchExtractor') -> Dict[str, Any]:
+    """Strip the normalized fields from a raw punch item.
+
+    What remains is the device envelope, which is identical across punches
+    from the same device and firmware. Only the path that actually supplied
+    each value is stripped, and it travels with the envelope so the item
+    can be rebuilt even if the integration mapping changes later; other
+    keys, including unused fallback keys, stay in the envelope.
+    """
+    envelope = item
+    fields = {}
+    for name, paths in extractor.field_sources:
+        for path in paths:
+            parts = path.split('.')
+            if _get_path(item, parts):
+                envelope = _without_path(envelope, parts)
+                fields[name] = path
+                break
+    return {'fields': fields, 'envelope': envelope}
+
+
+def _canonical(document: Dict[str, Any]) -> bytes:
+    return json.dumps(document, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def store_payload_blobs(items: Iterable[Dict[str, Any]], extractor: 'PunchExtractor') -> List[str]:
+    """Store the envelopes of ``items`` content-addressed and return one digest per item."""
+    from .models import PunchPayloadBlob
+
+    digests: List[str] = []
+    blobs: Dict[str, bytes] = {}
+    for item in items:
+        canonical = _canonical(split_payload(item, extractor))
+        digest = hashlib.sha256(canonical).hexdigest()
+        digests.append(digest)
+        blobs.setdefault(digest, canonical)
+
+    PunchPayloadBlob.objects.bulk_create(
+        [
+            PunchPayloadBlob(digest=digest, data=zlib.compress(canonical), size=len(canonical))
+            for digest, canonical in blobs.items()
+        ],
+        ignore_conflicts=True,
+    )
+    return digests
+
+
+def expand_payload(
+    data: bytes | memoryview,
+    employee_identifier: Optional[str],
+    punch_time: Optional[datetime],
+    direction: Optional[str],
+) -> Dict[str, Any]:
+    """Rebuild a raw punch item from its stored envelope and normalized columns.
+
+    The mapped fields come back in normalized form: the identifier as a
+    string and the timestamp as an ISO-8601 string in UTC.
+    """
+    document = json.loads(zlib.decompress(bytes(data)))
+    item = document.get('envelope') or {}
+    values = {
+        'employee_identifier': employee_identifier,
+        'timestamp': punch_time.isoformat() if punch_time else None,
+        'direction': direction,
+    }
+    for name, path in (document.get('fields') or {}).items():
+        if values.get(name) is not None:
+            _set_path(item, path.split('.'), values[name])
+    return item
+
+
+def table_size_bytes(table: str) -> Optional[int]:
+    """On-disk size of a table and its indexes, or ``None`` if the backend cannot tell."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            return cursor.fetchone()[0]
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = %s OR name IN "
+                    "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                    [table, table],
+                )
+            except Exception:  # noqa: BLE001 - dbstat is an optional SQLite module
+                return None
+            return cursor.fetchone()[0] or 0
+    return None
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .live_utils import publish_attendance
+from .models import Attendance, AttendanceRegularization
+from .shift_utils import ShiftResolver
+from .timesheet_utils import _calculate_working_hours, upsert_timesheets_from_attendance
+
+
+REGULARIZED_FIELDS = ['clock_in_time', 'clock_out_time', 'working_hours', 'status', 'updated_at']
+
+
+def apply_regularizations(ids: Optional[Iterable[int]] = None, batch_size: int = 500) -> int:
+    """Write approved, not yet applied regularizations to attendance and timesheets.
+
+    Requests are taken in batches; within a batch every affected employee-day
+    is computed once (later requests for the same day override earlier ones
+    field by field), then attendance and timesheets are upserted in bulk.
+    ``ids`` limits the run to specific requests. Returns the number applied.
+    """
+    pending = AttendanceRegularization.objects.filter(status='Approved', applied_at__isnull=True)
+    if ids is not None:
+        pending = pending.filter(pk__in=list(ids))
+    applied = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                pending
+                .select_for_update(skip_locked=True)
+                .order_by('approved_at', 'regularization_id')[:batch_size]
+            )
+            if not batch:
+                return applied
+            _apply_batch(batch)
+            AttendanceRegularization.objects.filter(pk__in=[item.pk for item in batch]).update(
+                applied_at=timezone.now(),
+            )
+        applied += len(batch)
+
+
+def _apply_batch(batch: List[AttendanceRegularization]) -> None:
+    keys = {(item.employee_id, item.date) for item in batch}
+    employee_ids = {employee_id for employee_id, _ in keys}
+    days = [day for _, day in keys]
+    existing: Dict[Tuple[int, date], Attendance] = {
+        (attendance.employee_id, attendance.date): attendance
+        for attendance in Attendance.objects.filter(
+            employee_id__in=employee_ids,
+            date__gte=min(days),
+            date__lte=max(days),
+        )
+        if (attendance.employee_id, attendance.date) in keys
+    }
+
+    rows: Dict[Tuple[int, date], Attendance] = {}
+    for item in batch:
+        key = (item.employee_id, item.date)
+        row = rows.get(key)
+        if row is None:
+            current = existing.get(key)
+            row = rows[key] = Attendance(
+                employee_id=item.employee_id,
+                date=item.date,
+                clock_in_time=current.clock_in_time if current else None,
+                clock_out_time=current.clock_out_time if current else None,
+                notes=current.notes if current else None,
+            )
+        row.clock_in_time = item.clock_in_time or row.clock_in_time
+        row.clock_out_time = item.clock_out_time or row.clock_out_time
+        row.status = item.attendance_status
+
+    attendances = list(rows.values())
+    for attendance in attendances:
+        attendance.working_hours = _calculate_working_hours(attendance)
+    Attendance.objects.bulk_create(
+        attendances,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['employee', 'date'],
+        update_fields=REGULARIZED_FIELDS,
+    )
+    publish_attendance(attendances)
+    upsert_timesheets_from_attendance(attendances, ShiftResolver(employee_ids, min(days), max(days)), source='Manual')
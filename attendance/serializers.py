@@ -1,14 +1,25 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
     Attendance,
     Shift,
     EmployeeShift,
     BiometricIntegration,
+    BiometricDevice,
     BiometricPunch,
     Timesheet,
     OvertimeRequest,
+    AttendanceException,
+    PunchAnomaly,
+    AttendanceMonthSummary,
+    AttendanceRegularization,
 )
+from employees.models import Employee
 from employees.serializers import EmployeeListSerializer
+from .device_utils import punches_per_hour
 
 
 class AttendanceSerializer(serializers.ModelSerializer):
@@ -35,6 +46,41 @@ class AttendanceCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class AttendanceBulkRecordSerializer(serializers.Serializer):
+    """One row of a bulk upload; the employee is an id so validation stays query-free."""
+    employee = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    clock_in_time = serializers.TimeField(required=False, allow_null=True)
+    clock_out_time = serializers.TimeField(required=False, allow_null=True)
+    working_hours = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=Attendance.STATUS_CHOICES, default='Present')
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class AttendanceBulkUploadSerializer(serializers.Serializer):
+    records = serializers.ListField(
+        child=AttendanceBulkRecordSerializer(),
+        allow_empty=False,
+        max_length=settings.ATTENDANCE_BULK_MAX_RECORDS,
+    )
+
+    def validate_records(self, records):
+        seen = set()
+        for index, record in enumerate(records):
+            key = (record['employee'], record['date'])
+            if key in seen:
+                raise serializers.ValidationError(
+                    f'records[{index}]: duplicate employee {key[0]} on {key[1]}.'
+                )
+            seen.add(key)
+        employee_ids = {employee_id for employee_id, _ in seen}
+        found = set(Employee.objects.filter(employee_id__in=employee_ids).values_list('employee_id', flat=True))
+        missing = sorted(employee_ids - found)
+        if missing:
+            raise serializers.ValidationError(f'Unknown employee ids: {", ".join(map(str, missing))}.')
+        return records
+
+
 class ShiftSerializer(serializers.ModelSerializer):
     class Meta:
         model = Shift
@@ -64,7 +110,7 @@ class BiometricIntegrationSerializer(serializers.ModelSerializer):
         model = BiometricIntegration
         fields = [
             'integration_id', 'provider', 'display_name', 'connection_type',
-            'base_url', 'device_id', 'credentials', 'data_mapping',
+            'base_url', 'device_id', 'timezone', 'credentials', 'data_mapping',
             'webhook_token', 'is_active', 'auto_sync', 'last_sync_at',
             'last_sync_status', 'last_sync_message', 'created_at', 'updated_at'
         ]
@@ -76,9 +122,40 @@ class BiometricIntegrationSerializer(serializers.ModelSerializer):
             'credentials': {'write_only': True, 'required': False},
         }
 
+    def validate_timezone(self, value):
+        if value:
+            try:
+                ZoneInfo(value)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise serializers.ValidationError('Unknown timezone.')
+        return value
+
+
+class BiometricDeviceSerializer(serializers.ModelSerializer):
+    integration_name = serializers.CharField(source='integration.display_name', read_only=True)
+    punches_per_hour = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BiometricDevice
+        fields = [
+            'biometric_device_id', 'integration', 'integration_name', 'device_id',
+            'name', 'location', 'is_active', 'last_seen_at', 'last_heartbeat_at',
+            'last_punch_at', 'punch_count', 'punches_per_hour', 'error_count',
+            'last_error_at', 'last_error', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'biometric_device_id', 'last_seen_at', 'last_heartbeat_at', 'last_punch_at',
+            'punch_count', 'error_count', 'last_error_at', 'last_error',
+            'created_at', 'updated_at'
+        ]
+
+    def get_punches_per_hour(self, obj):
+        return punches_per_hour(obj)
+
 
 class BiometricPunchSerializer(serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.full_name', read_only=True)
+    raw_payload = serializers.JSONField(source='payload', read_only=True)
 
     class Meta:
         model = BiometricPunch
@@ -131,3 +208,82 @@ class OvertimeRequestCreateSerializer(serializers.ModelSerializer):
             'employee': {'required': False},
         }
 
+
+class AttendanceExceptionSerializer(serializers.ModelSerializer):
+    employee_name = serializers.CharField(source='employee.full_name', read_only=True)
+    shift_name = serializers.CharField(source='shift.name', read_only=True)
+
+    class Meta:
+        model = AttendanceException
+        fields = [
+            'exception_id', 'employee', 'employee_name', 'shift', 'shift_name',
+            'date', 'kind', 'minutes', 'expected_time', 'actual_time', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+class PunchAnomalySerializer(serializers.ModelSerializer):
+    employee_name = serializers.CharField(source='employee.full_name', read_only=True)
+    reviewed_by_name = serializers.CharField(source='reviewed_by.full_name', read_only=True)
+
+    class Meta:
+        model = PunchAnomaly
+        fields = [
+            'anomaly_id', 'employee', 'employee_name', 'kind', 'date', 'score',
+            'details', 'status', 'reviewed_by', 'reviewed_by_name', 'reviewed_at',
+            'notes', 'created_at',
+        ]
+        read_only_fields = [
+            'anomaly_id', 'employee', 'kind', 'date', 'score', 'details',
+            'reviewed_by', 'reviewed_at', 'created_at',
+        ]
+
+
+class AttendanceMonthSummarySerializer(serializers.ModelSerializer):
+    employee_name = serializers.CharField(source='employee.full_name', read_only=True)
+
+    class Meta:
+        model = AttendanceMonthSummary
+        fields = [
+            'summary_id', 'employee', 'employee_name', 'month', 'present_days',
+            'half_days', 'absent_days', 'leave_days', 'working_hours',
+            'overtime_hours', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class AttendanceRegularizationSerializer(serializers.ModelSerializer):
+    employee_name = serializers.CharField(source='employee.full_name', read_only=True)
+    approved_by_name = serializers.CharField(source='approved_by.full_name', read_only=True)
+
+    class Meta:
+        model = AttendanceRegularization
+        fields = [
+            'regularization_id', 'employee', 'employee_name', 'date', 'clock_in_time',
+            'clock_out_time', 'attendance_status', 'reason', 'status', 'approved_by',
+            'approved_by_name', 'approved_at', 'applied_at', 'notes', 'created_at', 'updated_at',
+        ]
+        read_only_fields = [
+            'regularization_id', 'status', 'approved_by', 'approved_at', 'applied_at',
+            'created_at', 'updated_at',
+        ]
+
+
+class AttendanceRegularizationCreateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AttendanceRegularization
+        fields = [
+            'employee', 'date', 'clock_in_time', 'clock_out_time', 'attendance_status', 'reason',
+        ]
+        extra_kwargs = {
+            'employee': {'required': False},
+        }
+
+    def validate(self, attrs):
+        if attrs['date'] > timezone.localdate():
+            raise serializers.ValidationError({'date': 'Cannot regularize a future date.'})
+        if attrs.get('attendance_status', 'Present') in ('Present', 'Half Day') and not (
+            attrs.get('clock_in_time') or attrs.get('clock_out_time')
+        ):
+            raise serializers.ValidationError('Provide a clock-in or clock-out time.')
+        return attrs
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmployeeShift, Shift
+from .tz_utils import day_boundaries
+
+
+ShiftLookup = Callable[[object, date], Optional[Shift]]
+
+
+def get_assigned_shift(employee, day: date) -> Optional[Shift]:
+    assignment = (
+        EmployeeShift.objects
+        .filter(employee=employee, is_active=True, start_date__lte=day)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=day))
+        .select_related('shift')
+        .order_by('-start_date', '-id')
+        .first()
+    )
+    return assignment.shift if assignment else None
+
+
+class ShiftResolver:
+    """Batch shift lookup for a set of employees over a date range.
+
+    All overlapping assignments are loaded in one query and kept as
+    per-employee lists sorted by ``start_date``; lookups bisect those lists.
+    The resolver is itself a ``ShiftLookup`` and can be passed wherever
+    ``get_assigned_shift`` is accepted. Days outside the loaded range fall
+    back to a single-row query.
+    """
+
+    def __init__(self, employees: Iterable, start: date, end: date):
+        self.start = start
+        self.end = end
+        employee_ids = {getattr(employee, 'pk', employee) for employee in employees}
+        self._starts: Dict[int, List[date]] = {}
+        self._assignments: Dict[int, List[EmployeeShift]] = {}
+        assignments = (
+            EmployeeShift.objects
+            .filter(employee_id__in=employee_ids, is_active=True, start_date__lte=end)
+            .filter(Q(end_date__isnull=True) | Q(end_date__gte=start))
+            .select_related('shift')
+            .order_by('employee_id', 'start_date', 'id')
+        )
+        for assignment in assignments:
+            self._starts.setdefault(assignment.employee_id, []).append(assignment.start_date)
+            self._assignments.setdefault(assignment.employee_id, []).append(assignment)
+
+    def assignment_for(self, employee, day: date) -> Optional[EmployeeShift]:
+        employee_id = getattr(employee, 'pk', employee)
+        starts = self._starts.get(employee_id)
+        if not starts:
+            return None
+        assignments = self._assignments[employee_id]
+        # Latest assignment starting on or before ``day`` that has not ended.
+        index = bisect_right(starts, day) - 1
+        while index >= 0:
+            assignment = assignments[index]
+            if assignment.end_date is None or assignment.end_date >= day:
+                return assignment
+            index -= 1
+        return None
+
+    def __call__(self, employee, day: date) -> Optional[Shift]:
+        if not self.start <= day <= self.end:
+            return get_assigned_shift(employee, day)
+        assignment = self.assignment_for(employee, day)
+        return assignment.shift if assignment else None
+
+
+def shift_bounds(shift: Shift, day: date, tz: tzinfo) -> tuple[datetime, datetime]:
+    """Aware start/end of ``shift`` worked on ``day``; overnight shifts end the next day."""
+    start = timezone.make_aware(datetime.combine(day, shift.start_time), tz)
+    end = timezone.make_aware(datetime.combine(day, shift.end_time), tz)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+@dataclass(frozen=True)
+class ShiftWindow:
+    """The span of time whose punches belong to one attendance date."""
+    date: date
+    start: datetime
+    end: datetime
+    shift: Optional[Shift] = None
+
+    @property
+    def scheduled_seconds(self) -> int:
+        if not self.shift:
+            return 0
+        start, end = shift_bounds(self.shift, self.date, self.start.tzinfo)
+        return int((end - start).total_seconds())
+
+    @property
+    def scheduled_break_seconds(self) -> int:
+        if not self.shift:
+            return 0
+        return (self.shift.break_duration or 0) * 60
+
+    def contains(self, moment: datetime) -> bool:
+        return self.start <= moment < self.end
+
+
+def _calendar_window(day: date, tz: tzinfo) -> ShiftWindow:
+    start, end = day_boundaries(tz).span(day, day)
+    return ShiftWindow(date=day, start=start.astimezone(tz), end=end.astimezone(tz))
+
+
+def shift_window(shift: Shift, day: date, tz: tzinfo) -> ShiftWindow:
+    slack = timedelta(hours=settings.ATTENDANCE_SHIFT_WINDOW_SLACK_HOURS)
+    start, end = shift_bounds(shift, day, tz)
+    return ShiftWindow(date=day, start=start - slack, end=end + slack, shift=shift)
+
+
+def resolve_shift_window(
+    employee,
+    moment: datetime,
+    shift_lookup: ShiftLookup = get_assigned_shift,
+    tz: tzinfo | None = None,
+) -> ShiftWindow:
+    """Assign a punch to the shift window it falls in.
+
+    A punch after midnight belongs to the previous day's shift when that
+    shift's window (including slack) still covers it, so overnight workers
+    stay on a single attendance date. Punches outside any shift window fall
+    back to the local calendar day.
+    """
+    tz = tz or timezone.get_current_timezone()
+    local_day = day_boundaries(tz).day_of(moment)
+    for day in (local_day - timedelta(days=1), local_day):
+        shift = shift_lookup(employee, day)
+        if not shift:
+            continue
+        window = shift_window(shift, day, tz)
+        if window.contains(moment):
+            return window
+    return _calendar_window(local_day, tz)
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from leave_management.models import LeaveRequest
+
+from .device_utils import clear_device_cache, clear_integration_cache
+from .live_utils import attendance_delta, publish_live
+from .models import Attendance, BiometricDevice, BiometricIntegration, Timesheet
+from .summary_utils import mark_summaries_stale, months_between
+
+
+@receiver(post_save, sender=BiometricIntegration)
+@receiver(post_delete, sender=BiometricIntegration)
+def invalidate_integration_cache(sender, instance: BiometricIntegration, **kwargs):
+    """Token changes and deactivation take effect immediately in this process."""
+    clear_integration_cache()
+
+
+@receiver(post_save, sender=BiometricDevice)
+@receiver(post_delete, sender=BiometricDevice)
+def invalidate_device_cache(sender, instance: BiometricDevice, **kwargs):
+    clear_device_cache()
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=Timesheet)
+@receiver(post_delete, sender=Timesheet)
+def refresh_attendance_summary(sender, instance, **kwargs):
+    """Single-row changes; bulk writers mark their rows stale themselves."""
+    mark_summaries_stale([(instance.employee_id, instance.date)])
+
+
+@receiver(post_save, sender=Attendance)
+def publish_attendance_change(sender, instance: Attendance, **kwargs):
+    publish_live('attendance', [attendance_delta(instance)])
+
+
+@receiver(post_delete, sender=Attendance)
+def publish_attendance_delete(sender, instance: Attendance, **kwargs):
+    publish_live('attendance', [attendance_delta(instance, deleted=True)])
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def refresh_leave_summary(sender, instance: LeaveRequest, **kwargs):
+    if instance.start_date and instance.end_date:
+        mark_summaries_stale(
+            (instance.employee_id, month) for month in months_between(instance.start_date, instance.end_date)
+        )
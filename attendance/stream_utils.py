@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import codecs
+import json
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_CONTAINER_STARTS = '{["'
+_SCALAR_TERMINATORS = ',]}' + _WHITESPACE
+
+
+class PunchStreamError(ValueError):
+    """Raised when a streamed punch payload is not valid JSON."""
+
+    # Punches committed from earlier chunks before the error was hit.
+    created = 0
+
+
+class PunchPayloadTooLarge(PunchStreamError):
+    """Raised when a streamed punch payload exceeds its size limit."""
+
+
+class _LimitedStream:
+    """Byte stream wrapper enforcing a body size limit while it is read.
+
+    Reading ``request.stream`` directly bypasses ``DATA_UPLOAD_MAX_MEMORY_SIZE``,
+    so the limit is applied here instead, on the bytes actually consumed.
+    """
+
+    def __init__(self, stream: BinaryIO, max_bytes: int):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.consumed += len(data)
+        if self.consumed > self.max_bytes:
+            raise PunchPayloadTooLarge(f'Punch payload exceeds {self.max_bytes} bytes.')
+        return data
+
+
+class _JSONStreamReader:
+    """Incremental reader that decodes one JSON value at a time from a byte stream.
+
+    Only the value currently being decoded (plus one read chunk) is held in
+    memory, so large ``punches`` arrays never materialize as a whole.
+    """
+
+    def __init__(self, stream: BinaryIO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            tail = self.decoder.decode(b'', final=True)
+            if tail:
+                self.buffer = self.buffer[self.pos:] + tail
+                self.pos = 0
+            return bool(tail)
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(data)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            buffer = self.buffer
+            while self.pos < len(buffer) and buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(buffer):
+                return buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise PunchStreamError(f"Expected '{char}' in punch payload.")
+        self.pos += 1
+
+    def _scalar_complete(self) -> bool:
+        # Numbers and literals have no closing delimiter, so only decode them
+        # once the character that terminates them has been read.
+        buffer = self.buffer
+        for index in range(self.pos, len(buffer)):
+            if buffer[index] in _SCALAR_TERMINATORS:
+                return True
+        return self.eof
+
+    def value(self) -> Any:
+        first = self.peek()
+        while first not in _CONTAINER_STARTS and not self._scalar_complete():
+            if not self._fill():
+                break
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise PunchStreamError('Malformed JSON in punch payload.')
+            self.pos = end
+            return value
+
+
+def iter_punch_items(
+    stream: BinaryIO | None,
+    chunk_size: int = 64 * 1024,
+    max_bytes: Optional[int] = None,
+) -> Iterator[Any]:
+    """Yield punch items from a JSON body without loading it all into memory.
+
+    Mirrors ``parse_punch_payload``: items of a top-level ``punches`` array are
+    yielded one by one; a body without such an array is yielded as a single
+    punch item. ``PunchPayloadTooLarge`` is raised once more than
+    ``max_bytes`` have been read.
+    """
+    if stream is None:
+        return
+    if max_bytes is not None:
+        stream = _LimitedStream(stream, max_bytes)
+    reader = _JSONStreamReader(stream, chunk_size)
+    if reader.peek() == '':
+        return
+    reader.expect('{')
+
+    envelope: Dict[str, Any] = {}
+    streamed = False
+    if reader.peek() == '}':
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.value()
+            if not isinstance(key, str):
+                raise PunchStreamError('Object keys must be strings.')
+            reader.expect(':')
+            if key == 'punches' and reader.peek() == '[':
+                streamed = True
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        separator = reader.peek()
+                        reader.pos += 1
+                        if separator == ']':
+                            break
+                        if separator != ',':
+                            raise PunchStreamError("Expected ',' or ']' in punches array.")
+            else:
+                envelope[key] = reader.value()
+
+            separator = reader.peek()
+            reader.pos += 1
+            if separator == '}':
+                break
+            if separator != ',':
+                raise PunchStreamError("Expected ',' or '}' in punch payload.")
+
+    if not streamed:
+        yield envelope
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
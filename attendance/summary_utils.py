@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Count, DateField, ExpressionWrapper, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+from employees.models import Employee
+from leave_management.models import LeaveRequest
+
+from .models import Attendance, AttendanceMonthSummary, Timesheet
+
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = [
+    'present_days',
+    'half_days',
+    'absent_days',
+    'leave_days',
+    'working_hours',
+    'overtime_hours',
+    'updated_at',
+]
+
+
+def month_end(month: date) -> date:
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def months_between(first: date, last: date) -> List[date]:
+    months = []
+    month = first.replace(day=1)
+    while month <= last:
+        months.append(month)
+        month = month_end(month) + timedelta(days=1)
+    return months
+
+
+def build_month_summaries(employee_ids: Iterable[int], month: date) -> List[AttendanceMonthSummary]:
+    """Aggregate one month for ``employee_ids`` with a fixed number of grouped queries.
+
+    Leave days are attendance rows marked ``Leave`` plus approved leave days
+    that have no other attendance status recorded.
+    """
+    employee_ids = list(employee_ids)
+    month = month.replace(day=1)
+    end = month_end(month)
+    summaries = {
+        employee_id: AttendanceMonthSummary(employee_id=employee_id, month=month)
+        for employee_id in employee_ids
+    }
+
+    attendance = Attendance.objects.filter(employee_id__in=employee_ids, date__gte=month, date__lte=end).order_by()
+    counts = attendance.values('employee_id').annotate(
+        present=Count('attendance_id', filter=Q(status='Present')),
+        half=Count('attendance_id', filter=Q(status='Half Day')),
+        absent=Count('attendance_id', filter=Q(status='Absent')),
+        leave=Count('attendance_id', filter=Q(status='Leave')),
+    )
+    for row in counts:
+        summary = summaries[row['employee_id']]
+        summary.present_days = row['present']
+        summary.half_days = row['half']
+        summary.absent_days = row['absent']
+        summary.leave_days = row['leave']
+
+    hours = (
+        Timesheet.objects
+        .filter(employee_id__in=employee_ids, date__gte=month, date__lte=end)
+        .order_by()
+        .values('employee_id')
+        .annotate(working=Sum('working_hours'), overtime=Sum('overtime_hours'))
+    )
+    for row in hours:
+        summary = summaries[row['employee_id']]
+        summary.working_hours = row['working'] or 0
+        summary.overtime_hours = row['overtime'] or 0
+
+    leave_days: Dict[int, Set[date]] = defaultdict(set)
+    leaves = (
+        LeaveRequest.objects
+        .filter(employee_id__in=employee_ids, status='Approved', start_date__lte=end, end_date__gte=month)
+        .values_list('employee_id', 'start_date', 'end_date')
+    )
+    for employee_id, first, last in leaves:
+        day = max(first, month)
+        while day <= min(last, end):
+            leave_days[employee_id].add(day)
+            day += timedelta(days=1)
+    if leave_days:
+        # Any recorded status already counted for that day wins over the leave.
+        recorded = attendance.filter(employee_id__in=list(leave_days)).values_list('employee_id', 'date')
+        for employee_id, day in recorded:
+            leave_days[employee_id].discard(day)
+        for employee_id, days in leave_days.items():
+            summaries[employee_id].leave_days += len(days)
+    return list(summaries.values())
+
+
+def _upsert(summaries: List[AttendanceMonthSummary]) -> int:
+    AttendanceMonthSummary.objects.bulk_create(
+        summaries,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['employee', 'month'],
+        update_fields=SUMMARY_FIELDS,
+    )
+    return len(summaries)
+
+
+def refresh_month_summaries(keys: Iterable[Tuple[int, date]]) -> int:
+    """Recompute the summaries of specific (employee_id, month) pairs.
+
+    Employees deleted since their keys were queued (deleting an employee
+    deletes their attendance, which queues it) are skipped.
+    """
+    keys = list(keys)
+    existing = set(
+        Employee.objects.filter(employee_id__in={employee_id for employee_id, _ in keys})
+        .values_list('employee_id', flat=True)
+    )
+    by_month: Dict[date, Set[int]] = defaultdict(set)
+    for employee_id, month in keys:
+        if employee_id in existing:
+            by_month[month.replace(day=1)].add(employee_id)
+    summaries = []
+    for month, employee_ids in by_month.items():
+        summaries.extend(build_month_summaries(employee_ids, month))
+    with transaction.atomic():
+        return _upsert(summaries)
+
+
+def rebuild_month_summaries(employee_ids: Iterable[int], first: date, last: date) -> int:
+    """Recompute every month from ``first`` to ``last`` for ``employee_ids``."""
+    employee_ids = list(employee_ids)
+    total = 0
+    for month in months_between(first, last):
+        with transaction.atomic():
+            total += _upsert(build_month_summaries(employee_ids, month))
+    return total
+
+
+_pending = threading.local()
+
+
+def mark_summaries_stale(keys: Iterable[Tuple[int, date]]) -> None:
+    """Queue the months of (employee_id, day) pairs for recomputation.
+
+    Each month is recomputed once after the surrounding transaction commits,
+    however many of its rows changed. Keys queued by a rolled-back
+    transaction are recomputed with the next flush, which is harmless.
+    """
+    pending = getattr(_pending, 'keys', None)
+    if pending is None:
+        pending = _pending.keys = set()
+    pending.update((employee_id, day.replace(day=1)) for employee_id, day in keys)
+    transaction.on_commit(flush_summary_refreshes)
+
+
+def flush_summary_refreshes() -> int:
+    keys = getattr(_pending, 'keys', None)
+    if not keys:
+        return 0
+    _pending.keys = set()
+    try:
+        return refresh_month_summaries(keys)
+    except Exception:  # noqa: BLE001
+        logger.exception('Attendance summary refresh failed for %d employee-months.', len(keys))
+        return 0
+
+
+def summary_annotations(employee_ref: str, day_ref: str) -> Dict[str, Subquery]:
+    """Subqueries reading the summary of ``employee_ref`` for the month containing ``day_ref``.
+
+    Lets other apps attach monthly attendance to their rows in the same
+    query, e.g. ``Payroll.objects.annotate(**summary_annotations('employee', 'pay_period_start'))``.
+    """
+    summary = AttendanceMonthSummary.objects.filter(
+        employee_id=OuterRef(employee_ref),
+        month=TruncMonth(ExpressionWrapper(OuterRef(day_ref), output_field=DateField())),
+    )
+    return {
+        f'attendance_{field}': Subquery(summary.values(field)[:1])
+        for field in SUMMARY_FIELDS
+        if field != 'updated_at'
+    }
@@ -1,3 +1,1028 @@
-from django.test import TestCase
+import json
+import os
+import zlib
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from employees.models import Employee
+from leave_management.models import LeaveRequest
+from .anomaly_utils import detect_punch_anomalies
+from .archive_utils import archive_punches, hot_window_start, restore_archive
+from .biometric_utils import get_punch_extractor, parse_punch_items
+from .derivation_utils import apply_punches, rederive_range
+from .device_utils import clear_integration_cache, integration_for_token, resolve_device
+from .exception_utils import detect_attendance_exceptions
+from .import_utils import import_export_file
+from .models import (
+    Attendance,
+    AttendanceException,
+    AttendanceMonthSummary,
+    AttendanceRegularization,
+    BiometricDevice,
+    BiometricIntegration,
+    BiometricPunch,
+    BiometricPunchArchive,
+    ClockRequest,
+    EmployeeShift,
+    OvertimeRequest,
+    PunchAnomaly,
+    Shift,
+    Timesheet,
+)
+from .live_utils import LIVE_BATCH_KEY, LIVE_SEQUENCE_KEY, publish_live, read_batches
+from .offline_utils import sync_offline_events
+from .occupancy_utils import occupancy_sites, record_occupancy, site_occupancy
+from .payload_utils import expand_payload, split_payload
+from .shift_utils import ShiftResolver, get_assigned_shift
+from .timesheet_utils import (
+    _DeferredTimesheetRefresher,
+    rebuild_timesheets,
+    refresh_timesheets,
+    stale_timesheet_keys,
+    upsert_timesheets_from_attendance,
+)
+from .views import AttendanceViewSet, _stream_user
+
+
+def create_employee(email, role='Employee', user=None, **fields):
+    fields.setdefault('hire_date', date(2024, 1, 1))
+    return Employee.objects.create(
+        first_name=email.split('@')[0].title(),
+        last_name='Test',
+        email=email,
+        designation='Staff',
+        salary=1000,
+        role=role,
+        user=user,
+        **fields,
+    )
+
+
+def create_employee_user(username, role='Employee'):
+    user = User.objects.create_user(username, f'{username}@example.com', 'password')
+    return user, create_employee(f'{username}@example.com', role=role, user=user)
+
+
+class BiometricWebhookTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('punch@example.com')
+        self.integration = BiometricIntegration.objects.create(display_name='Gate', is_active=True)
+        self.url = f'/api/v1/attendance/biometric-webhook/?token={self.integration.webhook_token}'
+
+    def _punches(self, count):
+        return [
+            {'employee_id': str(self.employee.employee_id), 'timestamp': f'2024-01-02T08:{minute:02d}:00Z'}
+            for minute in range(count)
+        ]
+
+    @override_settings(BIOMETRIC_INGEST_CHUNK_SIZE=2)
+    def test_chunks_before_a_stream_error_stay_committed(self):
+        body = json.dumps({'punches': self._punches(3)})[:-2] + ' oops'
+        response = APIClient().post(self.url, data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(BiometricPunch.objects.count(), 2)
+
+    @override_settings(BIOMETRIC_WEBHOOK_MAX_BODY_SIZE=200)
+    def test_body_size_limit(self):
+        body = json.dumps({'punches': self._punches(10)})
+        response = APIClient().post(self.url, data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(BiometricPunch.objects.exists())
+
+
+class PunchParsingTests(TestCase):
+    def test_extractor_is_compiled_once_per_mapping(self):
+        first = get_punch_extractor({'timestamp_field': 'event.time', 'employee_identifier_field': 'user.code'})
+        second = get_punch_extractor({'employee_identifier_field': 'user.code', 'timestamp_field': 'event.time'})
+        self.assertIs(first, second)
+        self.assertIsNot(first, get_punch_extractor({'timestamp_field': 'event.at'}))
+
+    def test_mapped_paths_and_fallbacks(self):
+        extractor = get_punch_extractor({
+            'employee_identifier_field': 'a.b.c', 'timestamp_field': 'event.time', 'direction_field': 'state',
+        })
+        item = {'a': {'b': {'c': '7'}}, 'event': {'time': 'T1'}, 'state': 'in'}
+        self.assertEqual(
+            (extractor.employee_identifier(item), extractor.timestamp(item), extractor.direction(item)),
+            ('7', 'T1', 'in'),
+        )
+        fallback = {'a': 'not a dict', 'employee_id': '8', 'time': 'T2'}
+        self.assertEqual((extractor.employee_identifier(fallback), extractor.timestamp(fallback)), ('8', 'T2'))
+
+    def test_items_are_parsed_with_one_employee_query(self):
+        employees = [create_employee(f'reader{index}@example.com') for index in range(3)]
+        integration = BiometricIntegration(
+            display_name='Gate', timezone='Asia/Kolkata', data_mapping={'employee_identifier_type': 'email'},
+        )
+        items = [
+            {'employee_id': employee.email.upper(), 'timestamp': f'2024-01-02T0{index}:00:00'}
+            for index, employee in enumerate(employees)
+        ] + [
+            {'employee_id': 'stranger@example.com', 'timestamp': '2024-01-02T08:00:00+00:00'},
+            {'employee_id': employees[0].email, 'timestamp': 'yesterday'},
+            'not a punch',
+        ]
+        with self.assertNumQueries(1):
+            punches = parse_punch_items(integration, items)
+        self.assertEqual([punch['employee'] for punch in punches], employees + [None])
+        # Naive device times are read in the site timezone.
+        self.assertEqual(punches[1]['punch_time'], datetime(2024, 1, 1, 19, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(punches[3]['punch_time'], datetime(2024, 1, 2, 8, tzinfo=dt_timezone.utc))
+
+
+class DeviceCacheTests(TestCase):
+    def setUp(self):
+        clear_integration_cache()
+        self.integration = BiometricIntegration.objects.create(display_name='Gate', is_active=True)
+        self.token = self.integration.webhook_token
+
+    def test_integration_changes_take_effect_at_once(self):
+        self.assertEqual(integration_for_token(self.token), self.integration)
+        with self.assertNumQueries(0):
+            integration_for_token(self.token)
+        self.integration.is_active = False
+        self.integration.save()
+        self.assertIsNone(integration_for_token(self.token))
+
+        self.integration.is_active = True
+        self.integration.save()
+        self.assertEqual(integration_for_token(self.token), self.integration)
+        self.integration.delete()
+        self.assertIsNone(integration_for_token(self.token))
+
+    def test_device_changes_take_effect_at_once(self):
+        pk, active = resolve_device(self.integration, 'door-1')
+        self.assertTrue(active)
+        with self.assertNumQueries(0):
+            resolve_device(self.integration, 'door-1')
+        BiometricDevice.objects.get(pk=pk).delete()
+        replacement, _ = resolve_device(self.integration, 'door-1')
+        self.assertNotEqual(replacement, pk)
+
+        device = BiometricDevice.objects.get(pk=replacement)
+        device.is_active = False
+        device.save()
+        self.assertEqual(resolve_device(self.integration, 'door-1'), (replacement, False))
+
+
+class BiometricPunchListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_non_numeric_integration_is_reported_as_such(self):
+        response = self.client.get('/api/v1/attendance/biometric-punches/', {'integration': 'gate', 'date': '2024-01-02'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('integration', response.data)
+
+    def test_bad_date_is_still_a_date_error(self):
+        response = self.client.get('/api/v1/attendance/biometric-punches/', {'date': '02/01/2024'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.data)
+
+
+class ShiftResolverTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('rota@example.com')
+        self.leaver = create_employee('leaver@example.com')
+        self.unassigned = create_employee('unassigned@example.com')
+        shifts = [
+            Shift.objects.create(name=f'Shift {index}', start_time=time(9), end_time=time(17))
+            for index in range(6)
+        ]
+        for shift, start, end, active in [
+            (shifts[0], date(2024, 1, 1), None, True),
+            (shifts[1], date(2024, 1, 10), date(2024, 1, 20), True),
+            (shifts[2], date(2024, 1, 15), date(2024, 1, 15), True),
+            (shifts[3], date(2024, 1, 5), date(2024, 1, 6), False),
+            # Two assignments starting the same day: the later one wins.
+            (shifts[4], date(2024, 1, 25), None, True),
+            (shifts[5], date(2024, 1, 25), date(2024, 2, 3), True),
+        ]:
+            EmployeeShift.objects.create(employee=self.employee, shift=shift, start_date=start, end_date=end, is_active=active)
+        EmployeeShift.objects.create(employee=self.leaver, shift=shifts[1], start_date=date(2023, 12, 1), end_date=date(2024, 1, 3))
+
+    def test_matches_single_lookups(self):
+        employees = [self.employee, self.leaver, self.unassigned]
+        resolver = ShiftResolver(employees, date(2024, 1, 1), date(2024, 1, 31))
+        for offset in range(45):
+            day = date(2023, 12, 25) + timedelta(days=offset)
+            for employee in employees:
+                self.assertEqual(resolver(employee, day), get_assigned_shift(employee, day), (employee, day))
+
+    def test_only_days_outside_the_range_query(self):
+        resolver = ShiftResolver([self.employee.pk], date(2024, 1, 1), date(2024, 1, 31))
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver(self.employee.pk, date(2024, 1, 15)).name, 'Shift 2')
+            self.assertEqual(resolver(self.employee.pk, date(2024, 1, 21)).name, 'Shift 0')
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver(self.employee.pk, date(2024, 2, 4)).name, 'Shift 4')
+
+
+class PunchDerivationTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('pairing@example.com')
+        self.integration = BiometricIntegration.objects.create(display_name='Gate')
+        self.shift = Shift.objects.create(name='Day', start_time=time(9), end_time=time(17), break_duration=60)
+        EmployeeShift.objects.create(employee=self.employee, shift=self.shift, start_date=date(2024, 1, 1))
+
+    def _at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def _punch(self, moment, direction=None):
+        # Punches are stored before they are folded, as the webhook does.
+        BiometricPunch.objects.create(
+            integration=self.integration, employee=self.employee, punch_time=moment, direction=direction,
+        )
+        return apply_punches(self.employee, [(moment, direction)])
+
+    def _attendance(self, day=date(2024, 1, 2)):
+        return Attendance.objects.get(employee=self.employee, date=day)
+
+    def test_unpunched_break_is_subtracted(self):
+        day = date(2024, 1, 2)
+        self._punch(self._at(day, 9))
+        self._punch(self._at(day, 17))
+        attendance = self._attendance()
+        self.assertEqual(attendance.worked_seconds, 8 * 3600)
+        self.assertEqual(attendance.working_hours, Decimal('7.00'))
+        self.assertEqual((attendance.clock_in_time, attendance.clock_out_time), (time(9), time(17)))
+
+    def test_punched_break_is_not_subtracted_twice(self):
+        day = date(2024, 1, 2)
+        for hour, minute in [(9, 0), (12, 0), (12, 30), (17, 0)]:
+            self._punch(self._at(day, hour, minute))
+        attendance = self._attendance()
+        self.assertEqual(attendance.break_seconds, 30 * 60)
+        # 7.5 hours worked, less the 30 minutes of the scheduled hour not punched out.
+        self.assertEqual(attendance.working_hours, Decimal('7.00'))
+
+    def test_overnight_shift_lands_on_the_start_date(self):
+        night = Shift.objects.create(name='Night', start_time=time(22), end_time=time(6), break_duration=60)
+        EmployeeShift.objects.filter(employee=self.employee).update(shift=night)
+        self._punch(self._at(date(2024, 1, 2), 22), 'in')
+        self._punch(self._at(date(2024, 1, 3), 6), 'out')
+        attendance = self._attendance()
+        self.assertEqual(attendance.worked_seconds, 8 * 3600)
+        self.assertEqual(attendance.working_hours, Decimal('7.00'))
+        self.assertFalse(Attendance.objects.filter(employee=self.employee, date=date(2024, 1, 3)).exists())
+
+    def test_in_order_punches_are_appended_without_a_rescan(self):
+        day = date(2024, 1, 2)
+        self._punch(self._at(day, 9))
+        with mock.patch('attendance.derivation_utils._window_punches') as rescan:
+            self._punch(self._at(day, 12))
+            self._punch(self._at(day, 13))
+        rescan.assert_not_called()
+        self._punch(self._at(day, 17))
+        attendance = self._attendance()
+        self.assertEqual((attendance.worked_seconds, attendance.break_seconds), (7 * 3600, 3600))
+        self.assertEqual(attendance.working_hours, Decimal('7.00'))
+
+    def test_late_punch_rescans_its_window(self):
+        day = date(2024, 1, 2)
+        self._punch(self._at(day, 9), 'in')
+        self._punch(self._at(day, 17), 'out')
+        self._punch(self._at(day, 12), 'out')
+        self._punch(self._at(day, 12, 30), 'in')
+        attendance = self._attendance()
+        self.assertEqual((attendance.worked_seconds, attendance.break_seconds), (int(7.5 * 3600), 30 * 60))
+        self.assertEqual(attendance.last_punch_at, self._at(day, 17))
+        self.assertIsNone(attendance.open_punch_at)
+
+    def test_resent_punch_without_direction_is_dropped(self):
+        day = date(2024, 1, 2)
+        self._punch(self._at(day, 9))
+        self._punch(self._at(day, 12))
+        self._punch(self._at(day, 12))
+        self._punch(self._at(day, 13))
+        self._punch(self._at(day, 17))
+        attendance = self._attendance()
+        self.assertEqual((attendance.worked_seconds, attendance.break_seconds), (7 * 3600, 3600))
+        self.assertIsNone(attendance.open_punch_at)
+
+        # A rescan over the stored duplicate pairs the same way.
+        self.assertEqual(rederive_range([self.employee.pk], day, day), 1)
+        attendance = self._attendance()
+        self.assertEqual((attendance.worked_seconds, attendance.break_seconds), (7 * 3600, 3600))
+
+    def test_hand_entered_times_are_kept(self):
+        day = date(2024, 1, 2)
+        Attendance.objects.create(
+            employee=self.employee, date=day, status='Present',
+            clock_in_time=time(8, 30), clock_out_time=time(17, 30), working_hours=8,
+        )
+        self._punch(self._at(day, 9))
+        self._punch(self._at(day, 17))
+        self.assertEqual(rederive_range([self.employee.pk], day, day), 0)
+        attendance = self._attendance()
+        self.assertEqual((attendance.clock_in_time, attendance.clock_out_time), (time(8, 30), time(17, 30)))
+        self.assertEqual(attendance.working_hours, Decimal('8.00'))
+        self.assertIsNone(attendance.last_punch_at)
+
+    def test_recorded_status_is_kept(self):
+        Attendance.objects.create(employee=self.employee, date=date(2024, 1, 2), status='Half Day')
+        Attendance.objects.create(employee=self.employee, date=date(2024, 1, 3), status='Absent')
+        for day in (date(2024, 1, 2), date(2024, 1, 3)):
+            self._punch(self._at(day, 9))
+            self._punch(self._at(day, 13))
+        self.assertEqual(self._attendance().status, 'Half Day')
+        self.assertEqual(self._attendance(date(2024, 1, 3)).status, 'Present')
+
+        rederive_range([self.employee.pk], date(2024, 1, 2), date(2024, 1, 3))
+        self.assertEqual(self._attendance().status, 'Half Day')
+        self.assertEqual(self._attendance().clock_in_time, time(9))
+
+
+class BulkUploadTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('sheet@example.com')
+        self.integration = BiometricIntegration.objects.create(display_name='Gate')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('sheet-admin', 'admin@example.com', 'password'))
+
+    def _punch(self, hour):
+        moment = timezone.make_aware(datetime(2024, 1, 2, hour))
+        BiometricPunch.objects.create(integration=self.integration, employee=self.employee, punch_time=moment)
+        apply_punches(self.employee, [(moment, None)])
+
+    def test_upload_replaces_punch_pairing(self):
+        self._punch(9)
+        response = self.client.post('/api/v1/attendance/bulk/', {'records': [{
+            'employee': self.employee.pk, 'date': '2024-01-02',
+            'clock_in_time': '08:00', 'clock_out_time': '16:00', 'status': 'Present',
+        }]}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        attendance = Attendance.objects.get(employee=self.employee, date=date(2024, 1, 2))
+        self.assertIsNone(attendance.last_punch_at)
+        self.assertIsNone(attendance.open_punch_at)
+        self.assertEqual(attendance.worked_seconds, 0)
+
+        # A later punch no longer closes the pair opened before the upload.
+        self._punch(17)
+        attendance.refresh_from_db()
+        self.assertEqual((attendance.clock_in_time, attendance.clock_out_time), (time(8), time(16)))
+        self.assertEqual(attendance.worked_seconds, 0)
+
+
+class ClockActionTests(TestCase):
+    def setUp(self):
+        self.user, self.employee = create_employee_user('clocker')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_idempotency_key_replays_the_stored_response(self):
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'tap-1'}
+        first = self.client.post('/api/v1/attendance/clock_in/', {}, format='json', **headers)
+        Attendance.objects.filter(employee=self.employee).delete()
+        retry = self.client.post('/api/v1/attendance/clock_in/', {}, format='json', **headers)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(retry.data['duplicate'])
+        self.assertTrue(retry.data['applied'])
+        self.assertFalse(Attendance.objects.filter(employee=self.employee).exists())
+        self.assertEqual(ClockRequest.objects.filter(employee=self.employee).count(), 1)
+
+    def test_failed_attempt_is_not_recorded(self):
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'out-1'}
+        response = self.client.post('/api/v1/attendance/clock_out/', {}, format='json', **headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ClockRequest.objects.exists())
+
+    def test_double_tapped_clock_out_keeps_the_first_time(self):
+        self.client.post('/api/v1/attendance/clock_in/', {}, format='json')
+        first = self.client.post('/api/v1/attendance/clock_out/', {}, format='json')
+        attendance = Attendance.objects.get(employee=self.employee)
+        Attendance.objects.filter(pk=attendance.pk).update(clock_out_time=time(17, 0))
+        second = self.client.post('/api/v1/attendance/clock_out/', {}, format='json')
+        self.assertTrue(first.data['applied'])
+        self.assertFalse(second.data['applied'])
+        self.assertEqual(Attendance.objects.get(pk=attendance.pk).clock_out_time, time(17, 0))
+
+    def test_sweep_refreshes_timesheets_the_deferred_refresh_missed(self):
+        self.client.post('/api/v1/attendance/clock_in/', {}, format='json')
+        self.client.post('/api/v1/attendance/clock_out/', {}, format='json')
+        self.assertFalse(Timesheet.objects.exists())
+        call_command('refresh_stale_timesheets', stdout=StringIO())
+        self.assertTrue(Timesheet.objects.filter(employee=self.employee).exists())
+        self.assertEqual(stale_timesheet_keys(timezone.now() - timedelta(hours=1)), set())
+
+
+class TimesheetRefreshTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('hours@example.com')
+        self.day = date(2024, 1, 3)
+
+    def _clocked(self, clock_out=time(17, 30), **fields):
+        return Attendance.objects.create(
+            employee=self.employee, date=self.day, status='Present',
+            clock_in_time=time(9), clock_out_time=clock_out, **fields,
+        )
+
+    def _timesheet(self):
+        return Timesheet.objects.get(employee=self.employee, date=self.day)
+
+    def test_rebuild_keeps_the_approval_status(self):
+        self._clocked(working_hours=Decimal('9'))
+        Timesheet.objects.create(employee=self.employee, date=self.day, status='Approved', working_hours=Decimal('1'))
+        self.assertEqual(rebuild_timesheets([self.employee.pk], self.day, self.day), 1)
+        timesheet = self._timesheet()
+        self.assertEqual(timesheet.status, 'Approved')
+        self.assertEqual((timesheet.working_hours, timesheet.overtime_hours), (Decimal('9.00'), Decimal('1.00')))
+
+    def test_refresh_fills_hours_of_manually_clocked_rows(self):
+        manual = self._clocked()
+        punched = Attendance.objects.create(
+            employee=self.employee, date=self.day + timedelta(days=1), status='Present',
+            clock_in_time=time(9), clock_out_time=time(17), working_hours=Decimal('7'),
+            last_punch_at=timezone.now(),
+        )
+        keys = {(self.employee.pk, manual.date), (self.employee.pk, punched.date)}
+        self.assertEqual(refresh_timesheets(keys), 2)
+        manual.refresh_from_db()
+        punched.refresh_from_db()
+        self.assertEqual(manual.working_hours, Decimal('8.50'))
+        # Punch-derived hours already account for breaks and stay as they are.
+        self.assertEqual(punched.working_hours, Decimal('7.00'))
+        self.assertEqual((self._timesheet().working_hours, self._timesheet().overtime_hours), (Decimal('8.50'), Decimal('0.50')))
+
+    def test_stale_keys_include_outdated_timesheets(self):
+        attendance = self._clocked()
+        since = timezone.now() - timedelta(hours=1)
+        refresh_timesheets({(self.employee.pk, self.day)})
+        self.assertEqual(stale_timesheet_keys(since), set())
+        Timesheet.objects.filter(employee=self.employee).update(updated_at=since)
+        self.assertEqual(stale_timesheet_keys(since), {(self.employee.pk, attendance.date)})
+
+    @mock.patch('attendance.timesheet_utils.threading.Timer')
+    def test_deferred_refresh_coalesces_into_one_batch(self, timer):
+        self._clocked()
+        refresher = _DeferredTimesheetRefresher()
+        refresher.schedule(self.employee.pk, self.day)
+        refresher.schedule(self.employee.pk, self.day)
+        timer.return_value.start.assert_called_once()
+        with mock.patch('attendance.timesheet_utils.refresh_timesheets', wraps=refresh_timesheets) as refresh:
+            self.assertEqual(refresher.flush(), 1)
+            self.assertEqual(refresher.flush(), 0)
+        refresh.assert_called_once_with({(self.employee.pk, self.day)})
+        self.assertEqual(self._timesheet().working_hours, Decimal('8.50'))
+
+
+class OfflineSyncTests(TestCase):
+    def test_employee_can_sync_own_events(self):
+        user, employee = create_employee_user('field')
+        client = APIClient()
+        client.force_authenticate(user)
+        day = timezone.localdate() - timedelta(days=1)
+        response = client.post('/api/v1/attendance/offline-sync/', {
+            'sent_at': timezone.now().isoformat(),
+            'events': [
+                {'idempotency_key': 'a', 'action': 'clock_in', 'timestamp': f'{day}T09:00:00'},
+                {'idempotency_key': 'b', 'action': 'clock_out', 'timestamp': f'{day}T17:00:00'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        attendance = Attendance.objects.get(employee=employee, date=day)
+        self.assertEqual((attendance.clock_in_time, attendance.clock_out_time), (time(9), time(17)))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class OccupancyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = create_employee('guard@example.com')
+        self.punches = [{'employee': self.employee, 'punch_time': timezone.now(), 'direction': 'IN'}]
+
+    def test_snapshot_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_occupancy(1, 'gate', self.punches)
+            self.assertEqual(site_occupancy(1)['employees'], {})
+        self.assertIn(str(self.employee.employee_id), site_occupancy(1)['employees'])
+
+    def test_rolled_back_batch_is_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                record_occupancy(1, 'gate', self.punches)
+                raise DatabaseError('boom')
+        self.assertEqual(site_occupancy(1)['employees'], {})
+
+    @mock.patch('attendance.occupancy_utils.time.sleep')
+    def test_locked_site_is_rebuilt_on_its_next_batch(self, sleep):
+        integration = BiometricIntegration.objects.create(display_name='Gate')
+        visitor = create_employee('visitor@example.com')
+        for employee in (self.employee, visitor):
+            BiometricPunch.objects.create(
+                integration=integration, employee=employee, punch_time=timezone.now(), direction='IN',
+            )
+        cache.add(f'attendance:occupancy:lock:{integration.pk}', 1)
+        with self.assertLogs('attendance.occupancy_utils', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            record_occupancy(integration.pk, 'gate', self.punches)
+        self.assertEqual(site_occupancy(integration.pk)['employees'], {})
+
+        cache.delete(f'attendance:occupancy:lock:{integration.pk}')
+        with self.captureOnCommitCallbacks(execute=True):
+            record_occupancy(integration.pk, 'gate', [{'employee': visitor, 'punch_time': timezone.now(), 'direction': 'IN'}])
+        inside = site_occupancy(integration.pk)['employees']
+        self.assertEqual(set(inside), {str(self.employee.employee_id), str(visitor.employee_id)})
+        self.assertEqual(occupancy_sites(), [integration.pk])
+
+    def test_every_new_site_is_listed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_occupancy(2, 'gate', self.punches)
+            record_occupancy(1, 'gate', self.punches)
+        self.assertEqual(occupancy_sites(), [1, 2])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class LiveStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _publish(self, employee_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_live('punch', [{'employee': employee_id}])
+
+    def test_batches_never_overwrite_each_other(self):
+        self._publish(1)
+        # Another writer stored batch 2 but has not moved the counter yet.
+        cache.add(LIVE_BATCH_KEY.format(2), {'type': 'punch', 'at': '', 'items': [{'employee': 2}]}, None)
+        self.assertEqual(read_batches(1)[0], 2)
+        self._publish(3)
+        latest, batches = read_batches(0)
+        self.assertEqual(latest, 3)
+        self.assertEqual([batch['items'][0]['employee'] for _, batch in batches], [1, 2, 3])
+
+    def test_rolled_back_deltas_are_never_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                publish_live('punch', [{'employee': 1}])
+                raise DatabaseError('boom')
+        self._publish(2)
+        self.assertEqual([batch['items'] for _, batch in read_batches(0)[1]], [[{'employee': 2}]])
+
+    def test_rolled_back_offline_sync_is_not_published(self):
+        _, employee = create_employee_user('offline')
+        day = timezone.localdate() - timedelta(days=1)
+        events = [{'idempotency_key': 'a', 'action': 'clock_in', 'timestamp': timezone.make_aware(datetime.combine(day, time(9)))}]
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch('attendance.offline_utils.OfflineClockEvent.objects.bulk_create', side_effect=IntegrityError):
+                with self.assertRaises(IntegrityError):
+                    sync_offline_events(employee.employee_id, events)
+        self._publish(2)
+        self.assertEqual([batch['items'] for _, batch in read_batches(0)[1]], [[{'employee': 2}]])
+
+    def test_lagging_counter_is_not_taken_for_a_reset(self):
+        self._publish(1)
+        self._publish(2)
+        cache.set(LIVE_SEQUENCE_KEY, 1, None)
+        self.assertEqual(read_batches(2), (2, []))
+        cache.clear()
+        self.assertEqual(read_batches(2), (0, []))
+
+    def test_stream_accepts_ticket_not_access_token(self):
+        user, _ = create_employee_user('viewer')
+        client = APIClient()
+        client.force_authenticate(user)
+        ticket = client.post('/api/v1/attendance/live/ticket/').data['ticket']
+        factory = RequestFactory()
+        self.assertEqual(_stream_user(factory.get('/api/v1/attendance/live/', {'ticket': ticket})), user)
+        self.assertIsNone(_stream_user(factory.get('/api/v1/attendance/live/', {'ticket': ticket + 'x'})))
+        with self.settings(LIVE_STREAM_TICKET_SECONDS=-1):
+            self.assertIsNone(_stream_user(factory.get('/api/v1/attendance/live/', {'ticket': ticket})))
+
+
+class PunchAnomalyDetectionTests(TestCase):
+    def setUp(self):
+        self.month = date(2024, 3, 1)
+        self.integration = BiometricIntegration.objects.create(display_name='Gate')
+        self.shift = Shift.objects.create(name='Day', start_time=time(9), end_time=time(18), break_duration=60)
+
+    def _employee(self, email):
+        employee = create_employee(email)
+        EmployeeShift.objects.create(employee=employee, shift=self.shift, start_date=date(2024, 1, 1))
+        return employee
+
+    def _punches(self, employee, count, second):
+        BiometricPunch.objects.bulk_create(
+            BiometricPunch(
+                integration=self.integration, employee=employee,
+                punch_time=timezone.make_aware(datetime(2024, 3, 1 + index, 9, 5, second)),
+            )
+            for index in range(count)
+        )
+
+    def _worked(self, employee, hours):
+        Attendance.objects.bulk_create(
+            Attendance(employee=employee, date=date(2024, 3, 4 + index), status='Present', working_hours=value)
+            for index, value in enumerate(hours)
+        )
+
+    def _flagged(self, employee, kind):
+        detect_punch_anomalies(self.month)
+        return list(PunchAnomaly.objects.filter(employee=employee, kind=kind))
+
+    def test_rounded_times_need_enough_punches(self):
+        regular, newcomer, careful = (
+            self._employee(f'{name}@example.com') for name in ('regular', 'newcomer', 'careful')
+        )
+        self._punches(regular, 25, 0)
+        self._punches(newcomer, 3, 0)
+        self._punches(careful, 25, 17)
+        detect_punch_anomalies(self.month)
+        flagged = PunchAnomaly.objects.filter(kind='Rounded Times', employee__in=[regular, newcomer, careful])
+        self.assertEqual([anomaly.employee_id for anomaly in flagged], [regular.pk])
+        self.assertEqual(flagged[0].details, {'rounded': 25, 'punches': 25})
+
+    def test_hours_outlier_is_flagged(self):
+        employee = self._employee('outlier@example.com')
+        self._worked(employee, [8, 7.5, 8.25, 8, 7.75, 8.5, 8, 8.6, 13])
+        flagged = self._flagged(employee, 'Hours Outlier')
+        self.assertEqual([anomaly.date for anomaly in flagged], [date(2024, 3, 12)])
+        self.assertEqual(flagged[0].details, {'worked_hours': 13.0, 'expected_hours': 8.0})
+
+    def test_uniform_hours_flag_only_large_deviations(self):
+        # Every day matching the shift gives a zero spread, so any deviation scores as infinite.
+        employee = self._employee('steady@example.com')
+        self._worked(employee, [8] * 8 + [8.5])
+        self.assertEqual(self._flagged(employee, 'Hours Outlier'), [])
+        Attendance.objects.filter(employee=employee, working_hours=8.5).update(working_hours=11)
+        flagged = self._flagged(employee, 'Hours Outlier')
+        self.assertEqual([anomaly.score for anomaly in flagged], [1e6])
+
+
+class ArchivePunchesTests(TestCase):
+    def setUp(self):
+        self.integration = BiometricIntegration.objects.create(display_name='Gate')
+        BiometricPunch.objects.create(
+            integration=self.integration,
+            employee_identifier='1',
+            punch_time=timezone.now() - timedelta(hours=1),
+        )
+
+    def test_zero_retention_days_archives_everything(self):
+        with TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            call_command('archive_biometric_punches', retention_days=0, stdout=StringIO())
+        self.assertFalse(BiometricPunch.objects.exists())
+        self.assertEqual(BiometricPunchArchive.objects.get().punch_count, 1)
+
+    def test_failed_delete_removes_the_archive_file(self):
+        with TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            with mock.patch('django.db.models.query.QuerySet.delete', side_effect=DatabaseError('boom')):
+                with self.assertRaises(DatabaseError):
+                    archive_punches(timezone.now())
+            self.assertEqual([files for _, _, files in os.walk(media_root) if files], [])
+        self.assertEqual(BiometricPunch.objects.count(), 1)
+        self.assertFalse(BiometricPunchArchive.objects.exists())
+
+    def _archive_old_punch(self):
+        BiometricPunch.objects.update(punch_time=timezone.now() - timedelta(days=settings.BIOMETRIC_PUNCH_RETENTION_DAYS + 1))
+        punch = BiometricPunch.objects.get()
+        archive_punches(hot_window_start())
+        return punch
+
+    def test_restored_punches_are_listed_on_request(self):
+        with TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            punch = self._archive_old_punch()
+            self.assertEqual(restore_archive(BiometricPunchArchive.objects.get()), 1)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('archive-admin', 'admin@example.com', 'password'))
+        url = '/api/v1/attendance/biometric-punches/'
+        self.assertEqual(client.get(url).data['count'], 0)
+        response = client.get(url, {'include_restored': 'true'})
+        self.assertEqual([row['punch_id'] for row in response.data['results']], [punch.pk])
+
+    def test_restore_counts_only_inserted_punches(self):
+        with TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            punch = self._archive_old_punch()
+            punch.save(force_insert=True)
+            self.assertEqual(restore_archive(BiometricPunchArchive.objects.get()), 0)
+        self.assertEqual(BiometricPunch.objects.count(), 1)
+
+
+class ImportExportFileTests(TestCase):
+    def setUp(self):
+        self.integration = BiometricIntegration.objects.create(display_name='Gate')
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'attlog.dat')
+
+    def _append(self, lines):
+        with open(self.path, 'a', newline='') as handle:
+            handle.write(lines)
+
+    def _line(self, day):
+        return f'1\t2024-01-{day:02d} 08:00:00\t1\t0\t0\t0\n'
+
+    def test_grown_file_resumes_without_duplicating_punches(self):
+        self._append(''.join(self._line(day) for day in (1, 2)))
+        import_export_file(self.integration, self.path)
+        self._append(self._line(3))
+        job = import_export_file(self.integration, self.path)
+        self.assertEqual(job.rows_read, 3)
+        self.assertEqual(BiometricPunch.objects.filter(integration=self.integration).count(), 3)
+
+        # Unchanged file: nothing to do.
+        import_export_file(self.integration, self.path)
+        self.assertEqual(BiometricPunch.objects.filter(integration=self.integration).count(), 3)
+
+    def test_partial_last_line_waits_for_the_next_run(self):
+        self._append(self._line(1) + self._line(2)[:12])
+        self.assertEqual(import_export_file(self.integration, self.path).rows_read, 1)
+        self._append(self._line(2)[12:])
+        import_export_file(self.integration, self.path)
+        self.assertEqual(
+            sorted(BiometricPunch.objects.filter(integration=self.integration).values_list('punch_time__day', flat=True)),
+            [1, 2],
+        )
+
+
+class PunchPayloadTests(TestCase):
+    def _round_trip(self, item, mapping):
+        extractor = get_punch_extractor(mapping)
+        document = split_payload(item, extractor)
+        blob = zlib.compress(json.dumps(document).encode('utf-8'))
+        punch = parse_punch_items(BiometricIntegration(display_name='Gate', data_mapping=mapping), [item])[0]
+        return expand_payload(blob, punch['employee_identifier'], punch['punch_time'], punch['direction'])
+
+    def test_unused_fallback_keys_survive(self):
+        item = {
+            'user': {'code': '7'},
+            'event': {'time': '2024-01-02T08:00:00+00:00'},
+            'employee_id': 'badge-7',
+            'time': 'local 09:00',
+        }
+        mapping = {'employee_identifier_field': 'user.code', 'timestamp_field': 'event.time'}
+        self.assertEqual(self._round_trip(item, mapping), item)
+
+    def test_fallback_that_supplied_the_value_is_restored(self):
+        item = {'employee_id': '7', 'time': '2024-01-02T08:00:00+00:00', 'device': 'A1'}
+        self.assertEqual(self._round_trip(item, {}), item)
+
+
+class AttendanceCalendarTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('calendar-admin', 'admin@example.com', 'password')
+        self.employee = create_employee('cal@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = '/api/v1/attendance/calendar/?month=2024-01'
+
+    def test_conditional_request_takes_two_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_attendance(self):
+        etag = self.client.get(self.url)['ETag']
+        Attendance.objects.create(employee=self.employee, date=date(2024, 1, 3), status='Present')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        row = next(row for row in response.data['employees'] if row['employee_id'] == self.employee.employee_id)
+        self.assertEqual(row['days'][2], 'P')
+
+    def test_user_without_profile_sees_nobody(self):
+        request = Request(RequestFactory().get(self.url))
+        request.user = User.objects.create_user('no-profile', 'no-profile@example.com', 'password')
+        self.assertFalse(AttendanceViewSet()._calendar_employees(request).exists())
+        self.client.force_authenticate(request.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class MonthSummaryRefreshTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('summary@example.com')
+
+    def _summary(self, month=date(2024, 1, 1)):
+        return AttendanceMonthSummary.objects.get(employee=self.employee, month=month)
+
+    def test_attendance_changes_refresh_the_month_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance = Attendance.objects.create(employee=self.employee, date=date(2024, 1, 3), status='Present')
+            Attendance.objects.create(employee=self.employee, date=date(2024, 1, 4), status='Half Day')
+            self.assertFalse(AttendanceMonthSummary.objects.filter(employee=self.employee).exists())
+        self.assertEqual((self._summary().present_days, self._summary().half_days), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance.delete()
+        self.assertEqual(self._summary().present_days, 0)
+
+    def test_timesheet_changes_refresh_the_hours(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            timesheet = Timesheet.objects.create(
+                employee=self.employee, date=date(2024, 1, 3), working_hours=Decimal('9'), overtime_hours=Decimal('1'),
+            )
+        self.assertEqual((self._summary().working_hours, self._summary().overtime_hours), (Decimal('9.00'), Decimal('1.00')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            timesheet.delete()
+        self.assertEqual(self._summary().working_hours, Decimal('0.00'))
+
+    def test_leave_refreshes_every_month_it_spans(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            leave = LeaveRequest.objects.create(
+                employee=self.employee, leave_type='Annual', status='Approved',
+                start_date=date(2024, 1, 30), end_date=date(2024, 2, 2), total_days=4, reason='Trip',
+            )
+        self.assertEqual(self._summary().leave_days, 2)
+        self.assertEqual(self._summary(date(2024, 2, 1)).leave_days, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.delete()
+        self.assertEqual(self._summary(date(2024, 2, 1)).leave_days, 0)
+
+    def test_deleted_employee_is_not_summarized(self):
+        Attendance.objects.create(employee=self.employee, date=date(2024, 1, 3), status='Present')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.delete()
+        self.assertFalse(AttendanceMonthSummary.objects.exists())
+
+    def test_bulk_timesheet_upsert_marks_its_months_stale(self):
+        attendances = [
+            Attendance(employee=self.employee, date=day, clock_in_time=time(9), clock_out_time=time(17))
+            for day in (date(2024, 1, 31), date(2024, 2, 1))
+        ]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            upsert_timesheets_from_attendance(attendances, get_assigned_shift)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._summary().working_hours, Decimal('8.00'))
+        self.assertEqual(self._summary(date(2024, 2, 1)).working_hours, Decimal('8.00'))
+
+
+class AttendanceExceptionDetectionTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('absent@example.com')
+        shift = Shift.objects.create(name='Day', start_time=time(9, 0), end_time=time(17, 0))
+        EmployeeShift.objects.create(employee=self.employee, shift=shift, start_date=date(2024, 1, 1))
+        self.day = date(2024, 1, 3)  # a Wednesday
+
+    def test_absence_gets_a_timesheet(self):
+        counts = detect_attendance_exceptions([self.employee.employee_id], self.day, self.day)
+        self.assertEqual(counts['marked_absent'], 1)
+        self.assertEqual(Timesheet.objects.get(employee=self.employee, date=self.day).working_hours, 0)
+
+    def test_retroactive_leave_clears_the_absence(self):
+        detect_attendance_exceptions([self.employee.employee_id], self.day, self.day)
+        LeaveRequest.objects.create(
+            employee=self.employee,
+            leave_type='Sick',
+            start_date=self.day,
+            end_date=self.day,
+            total_days=1,
+            status='Approved',
+            reason='Flu',
+        )
+        counts = detect_attendance_exceptions([self.employee.employee_id], self.day, self.day)
+        self.assertEqual(counts['Absent'], 0)
+        self.assertFalse(AttendanceException.objects.filter(employee=self.employee).exists())
+        self.assertEqual(Attendance.objects.get(employee=self.employee, date=self.day).status, 'Leave')
+
+
+class OvertimeGenerationTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('overtime@example.com')
+        Timesheet.objects.create(
+            employee=self.employee,
+            date=date(2024, 1, 3),
+            working_hours=10,
+            overtime_hours=2,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('ot-admin', 'ot@example.com', 'password'))
+        self.body = {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+
+    def test_non_numeric_department_is_rejected(self):
+        response = self.client.post(
+            '/api/v1/attendance/overtime-requests/generate/',
+            {**self.body, 'department': 'sales'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_reruns_do_not_duplicate_requests(self):
+        first = self.client.post('/api/v1/attendance/overtime-requests/generate/', self.body, format='json')
+        second = self.client.post('/api/v1/attendance/overtime-requests/generate/', self.body, format='json')
+        self.assertEqual((first.data['created'], second.data['created']), (1, 0))
+        self.assertEqual(OvertimeRequest.objects.filter(employee=self.employee).count(), 1)
+
+
+class BulkReviewPermissionTests(TestCase):
+    def setUp(self):
+        self.manager_user, self.manager = create_employee_user('lead')
+        self.report = create_employee('report@example.com')
+        self.report.managers.add(self.manager)
+        self.outsider = create_employee('outsider@example.com')
+        self.own = Timesheet.objects.create(employee=self.report, date=date(2024, 1, 3))
+        self.other = Timesheet.objects.create(employee=self.outsider, date=date(2024, 1, 3))
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager_user)
+
+    def test_manager_approves_reports(self):
+        response = self.client.post(
+            '/api/v1/attendance/timesheets/bulk_approve/', {'ids': [self.own.pk]}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Timesheet.objects.get(pk=self.own.pk).status, 'Approved')
+
+    def test_manager_cannot_touch_other_teams(self):
+        response = self.client.post(
+            '/api/v1/attendance/timesheets/bulk_approve/', {'ids': [self.own.pk, self.other.pk]}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['denied'], [self.other.pk])
+        self.assertEqual(Timesheet.objects.filter(status='Approved').count(), 0)
+
+    def test_manager_filter_is_scoped_to_reports(self):
+        response = self.client.post(
+            '/api/v1/attendance/timesheets/bulk_reject/', {'filter': {'date_from': '2024-01-01'}}, format='json',
+        )
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(Timesheet.objects.get(pk=self.other.pk).status, 'Open')
+
+    def test_employee_without_reports_is_refused(self):
+        user, _ = create_employee_user('plain')
+        self.client.force_authenticate(user)
+        response = self.client.post(
+            '/api/v1/attendance/timesheets/bulk_approve/', {'ids': [self.own.pk]}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_overtime_rejection_records_reviewer_and_notes(self):
+        overtime = OvertimeRequest.objects.create(employee=self.report, date=date(2024, 1, 3), hours=2)
+        response = self.client.post(
+            '/api/v1/attendance/overtime-requests/bulk_reject/',
+            {'ids': [overtime.pk], 'notes': 'Not pre-approved'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        overtime.refresh_from_db()
+        self.assertEqual((overtime.status, overtime.approved_by, overtime.notes), ('Rejected', self.manager, 'Not pre-approved'))
+
+
+class RegularizationReviewTests(TestCase):
+    url = '/api/v1/attendance/regularizations/'
+
+    def setUp(self):
+        self.manager_user, self.manager = create_employee_user('lead')
+        self.report_user, self.report = create_employee_user('report')
+        self.report.managers.add(self.manager)
+        self.outsider = create_employee('outsider@example.com')
+        self.own = self._request(self.report)
+        self.other = self._request(self.outsider)
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager_user)
+
+    def _request(self, employee, **fields):
+        return AttendanceRegularization.objects.create(
+            employee=employee, date=date(2024, 1, 3), clock_in_time=time(9), reason='Missed punch', **fields,
+        )
+
+    def test_manager_approves_and_applies_report_request(self):
+        response = self.client.put(f'{self.url}{self.own.pk}/approve/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Attendance.objects.get(employee=self.report, date=date(2024, 1, 3)).clock_in_time, time(9))
+
+    def test_manager_cannot_review_other_teams(self):
+        response = self.client.put(f'{self.url}{self.other.pk}/approve/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(AttendanceRegularization.objects.get(pk=self.other.pk).status, 'Pending')
+
+    def test_employee_cannot_approve_own_request(self):
+        self.client.force_authenticate(self.report_user)
+        response = self.client.put(f'{self.url}{self.own.pk}/approve/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_reviewed_request_cannot_change_again(self):
+        self.client.put(f'{self.url}{self.own.pk}/reject/', {'notes': 'No proof'}, format='json')
+        response = self.client.put(f'{self.url}{self.own.pk}/approve/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(AttendanceRegularization.objects.get(pk=self.own.pk).status, 'Rejected')
+        self.assertFalse(Attendance.objects.filter(employee=self.report).exists())
+
+    def test_bulk_review_only_moves_pending_requests(self):
+        approved = self._request(self.report, status='Approved')
+        response = self.client.post(
+            f'{self.url}bulk_reject/', {'ids': [self.own.pk, approved.pk]}, format='json',
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['conflicts'], [approved.pk])
+        self.assertEqual(AttendanceRegularization.objects.get(pk=self.own.pk).status, 'Pending')
+
+        response = self.client.post(
+            f'{self.url}bulk_reject/', {'filter': {'employee': self.report.pk}}, format='json',
+        )
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(AttendanceRegularization.objects.get(pk=approved.pk).status, 'Approved')
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+import atexit
+import logging
+import threading
+from datetime import date, datetime, timedelta
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, Set, Tuple
 
-from django.db.models import Q
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery
 
-from .models import Attendance, EmployeeShift, Timesheet
+from .models import Attendance, Shift, Timesheet
+from .shift_utils import ShiftLookup, ShiftResolver, get_assigned_shift
+from .summary_utils import mark_summaries_stale
 
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_EXPECTED_HOURS = Decimal('8.00')
 
 
@@ -28,19 +38,9 @@ def _calculate_working_hours(attendance: Attendance) -> Decimal:
     return _to_decimal(0)
 
 
-def _get_expected_hours(employee, date) -> Decimal:
-    assignment = (
-        EmployeeShift.objects
-        .filter(employee=employee, is_active=True, start_date__lte=date)
-        .filter(Q(end_date__isnull=True) | Q(end_date__gte=date))
-        .select_related('shift')
-        .order_by('-start_date')
-        .first()
-    )
-    if not assignment or not assignment.shift:
+def shift_expected_hours(shift: Shift | None, date) -> Decimal:
+    if not shift:
         return DEFAULT_EXPECTED_HOURS
-
-    shift = assignment.shift
     start = datetime.combine(date, shift.start_time)
     end = datetime.combine(date, shift.end_time)
     if end <= start:
@@ -51,13 +51,37 @@ def _get_expected_hours(employee, date) -> Decimal:
     return _to_decimal(hours)
 
 
-def update_timesheet_from_attendance(attendance: Attendance, source: str = 'Attendance') -> Timesheet:
+def _get_expected_hours(employee, date, shift_lookup: ShiftLookup = get_assigned_shift) -> Decimal:
+    return shift_expected_hours(shift_lookup(employee, date), date)
+
+
+TIMESHEET_UPSERT_FIELDS = [
+    'clock_in_time',
+    'clock_out_time',
+    'working_hours',
+    'overtime_hours',
+    'source',
+    'notes',
+    'updated_at',
+]
+
+
+def _timesheet_hours(attendance: Attendance, shift_lookup: ShiftLookup) -> tuple[Decimal, Decimal]:
     working_hours = _to_decimal(attendance.working_hours or 0)
     if not attendance.working_hours and (attendance.clock_in_time or attendance.clock_out_time):
         working_hours = _calculate_working_hours(attendance)
 
-    expected_hours = _get_expected_hours(attendance.employee, attendance.date)
+    expected_hours = _get_expected_hours(attendance.employee_id, attendance.date, shift_lookup)
     overtime_hours = _to_decimal(max(Decimal('0'), working_hours - expected_hours))
+    return working_hours, overtime_hours
+
+
+def update_timesheet_from_attendance(
+    attendance: Attendance,
+    source: str = 'Attendance',
+    shift_lookup: ShiftLookup = get_assigned_shift,
+) -> Timesheet:
+    working_hours, overtime_hours = _timesheet_hours(attendance, shift_lookup)
 
     timesheet, created = Timesheet.objects.get_or_create(
         employee=attendance.employee,
@@ -80,13 +104,165 @@ def update_timesheet_from_attendance(attendance: Attendance, source: str = 'Atte
         timesheet.overtime_hours = overtime_hours
         timesheet.source = source
         timesheet.notes = attendance.notes
-        timesheet.save(update_fields=[
-            'clock_in_time',
-            'clock_out_time',
-            'working_hours',
-            'overtime_hours',
-            'source',
-            'notes',
-            'updated_at',
-        ])
+        timesheet.save(update_fields=TIMESHEET_UPSERT_FIELDS)
     return timesheet
+
+
+def upsert_timesheets_from_attendance(
+    attendances: Iterable[Attendance],
+    shift_lookup: ShiftLookup,
+    source: str | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """Compute timesheets for many attendance rows in memory and upsert them.
+
+    Existing rows keep their approval status; only the derived columns are
+    overwritten. When ``source`` is omitted it is inferred from whether the
+    attendance was derived from biometric punches.
+    """
+    timesheets = []
+    for attendance in attendances:
+        working_hours, overtime_hours = _timesheet_hours(attendance, shift_lookup)
+        timesheets.append(Timesheet(
+            employee_id=attendance.employee_id,
+            date=attendance.date,
+            clock_in_time=attendance.clock_in_time,
+            clock_out_time=attendance.clock_out_time,
+            working_hours=working_hours,
+            overtime_hours=overtime_hours,
+            status='Open',
+            source=source or ('Biometric' if attendance.last_punch_at else 'Attendance'),
+            notes=attendance.notes,
+        ))
+    Timesheet.objects.bulk_create(
+        timesheets,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['employee', 'date'],
+        update_fields=TIMESHEET_UPSERT_FIELDS,
+    )
+    mark_summaries_stale((timesheet.employee_id, timesheet.date) for timesheet in timesheets)
+    return len(timesheets)
+
+
+def rebuild_timesheets(employee_ids: Iterable[int], start: date, end: date) -> int:
+    """Recompute every timesheet of ``employee_ids`` between ``start`` and ``end``."""
+    employee_ids = list(employee_ids)
+    attendances = (
+        Attendance.objects
+        .filter(employee_id__in=employee_ids, date__gte=start, date__lte=end)
+        .only(
+            'employee_id', 'date', 'clock_in_time', 'clock_out_time',
+            'working_hours', 'notes', 'last_punch_at',
+        )
+        .order_by()
+    )
+    resolver = ShiftResolver(employee_ids, start, end)
+    with transaction.atomic():
+        return upsert_timesheets_from_attendance(attendances.iterator(chunk_size=2000), resolver)
+
+
+def refresh_timesheets(keys: Iterable[Tuple[int, date]]) -> int:
+    """Recompute attendance hours and timesheets for specific (employee_id, date) pairs."""
+    keys = set(keys)
+    if not keys:
+        return 0
+    employee_ids = {employee_id for employee_id, _ in keys}
+    days = [day for _, day in keys]
+    start, end = min(days), max(days)
+    attendances = [
+        attendance
+        for attendance in Attendance.objects.filter(
+            employee_id__in=employee_ids,
+            date__gte=start,
+            date__lte=end,
+        )
+        if (attendance.employee_id, attendance.date) in keys
+    ]
+
+    # Manually clocked rows carry no punch-derived hours; fill them from the clock times.
+    stale = []
+    for attendance in attendances:
+        if attendance.last_punch_at or not (attendance.clock_in_time and attendance.clock_out_time):
+            continue
+        hours = _calculate_working_hours(attendance)
+        if hours != attendance.working_hours:
+            attendance.working_hours = hours
+            stale.append(attendance)
+    with transaction.atomic():
+        if stale:
+            Attendance.objects.bulk_update(stale, ['working_hours'])
+        return upsert_timesheets_from_attendance(attendances, ShiftResolver(employee_ids, start, end))
+
+
+def stale_timesheet_keys(since: datetime) -> Set[Tuple[int, date]]:
+    """(employee_id, date) of attendance changed since ``since`` whose timesheet is older or missing.
+
+    Deferred refreshes live in the worker's memory and are lost if it dies
+    before flushing; sweeping with this recovers them.
+    """
+    timesheet_updated = Timesheet.objects.filter(
+        employee_id=OuterRef('employee_id'),
+        date=OuterRef('date'),
+    ).values('updated_at')[:1]
+    return set(
+        Attendance.objects
+        .filter(updated_at__gte=since)
+        .annotate(timesheet_updated=Subquery(timesheet_updated))
+        .filter(Q(timesheet_updated__isnull=True) | Q(timesheet_updated__lt=F('updated_at')))
+        .order_by()
+        .values_list('employee_id', 'date')
+    )
+
+
+class _DeferredTimesheetRefresher:
+    """Coalesce timesheet refreshes and run them on a background thread.
+
+    Request handlers only record which (employee, date) pairs changed; the
+    recomputation happens ``delay`` seconds later in one batch. Pending
+    pairs are flushed when the process exits cleanly; after a crash the
+    ``refresh_stale_timesheets`` sweep picks them up.
+    """
+
+    def __init__(self):
+        self._pending: Set[Tuple[int, date]] = set()
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def schedule(self, employee_id: int, day: date) -> None:
+        with self._lock:
+            self._pending.add((employee_id, day))
+            if self._timer is None:
+                self._timer = threading.Timer(settings.ATTENDANCE_TIMESHEET_REFRESH_DELAY, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+        if not pending:
+            return 0
+        try:
+            return refresh_timesheets(pending)
+        except Exception:  # noqa: BLE001
+            logger.exception('Deferred timesheet refresh failed for %d attendance rows.', len(pending))
+            return 0
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+
+_refresher = _DeferredTimesheetRefresher()
+atexit.register(_refresher.flush)
+
+
+def schedule_timesheet_refresh(employee_id: int, day: date) -> None:
+    """Queue a timesheet recomputation once the current transaction commits."""
+    transaction.on_commit(lambda: _refresher.schedule(employee_id, day))
+
+
+def flush_timesheet_refreshes() -> int:
+    return _refresher.flush()
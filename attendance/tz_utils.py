@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone, tzinfo
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=64)
+def get_zone(name: str | None) -> tzinfo:
+    """IANA zone by name; blank or unknown names fall back to ``settings.TIME_ZONE``."""
+    if not name:
+        return timezone.get_default_timezone()
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning('Unknown timezone %r, using the default timezone.', name)
+        return timezone.get_default_timezone()
+
+
+def integration_timezone(integration) -> tzinfo:
+    return get_zone(getattr(integration, 'timezone', None))
+
+
+class DayBoundaries:
+    """UTC instants of every local midnight in one timezone, computed a year at a time.
+
+    Mapping a punch to its local date is a bisect over these instants, and a
+    local date range becomes a plain UTC ``punch_time`` range, so bucketing
+    and filters never convert timestamps row by row.
+    """
+
+    def __init__(self, tz: tzinfo):
+        self.tz = tz
+        self._years: Dict[int, List[datetime]] = {}
+
+    def _midnights(self, year: int) -> List[datetime]:
+        midnights = self._years.get(year)
+        if midnights is None:
+            first = date(year, 1, 1)
+            days = (date(year + 1, 1, 1) - first).days
+            midnights = self._years[year] = [
+                timezone.make_aware(datetime.combine(first + timedelta(days=offset), time.min), self.tz)
+                .astimezone(dt_timezone.utc)
+                for offset in range(days + 1)
+            ]
+        return midnights
+
+    def start_of(self, day: date) -> datetime:
+        """UTC instant at which local ``day`` begins."""
+        return self._midnights(day.year)[day.timetuple().tm_yday - 1]
+
+    def span(self, first: date, last: date) -> Tuple[datetime, datetime]:
+        """Half-open UTC range ``[start, end)`` covering local days ``first``..``last``."""
+        return self.start_of(first), self.start_of(last + timedelta(days=1))
+
+    def day_of(self, moment: datetime) -> date:
+        """Local date of an aware ``moment``."""
+        year = moment.astimezone(dt_timezone.utc).year
+        midnights = self._midnights(year)
+        if moment < midnights[0]:
+            year -= 1
+            midnights = self._midnights(year)
+        elif moment >= midnights[-1]:
+            year += 1
+            midnights = self._midnights(year)
+        return date(year, 1, 1) + timedelta(days=bisect_right(midnights, moment) - 1)
+
+
+@lru_cache(maxsize=64)
+def _boundaries(tz: tzinfo) -> DayBoundaries:
+    return DayBoundaries(tz)
+
+
+def day_boundaries(tz: tzinfo | None = None) -> DayBoundaries:
+    """Shared, lazily filled boundaries for ``tz`` (the current timezone by default)."""
+    return _boundaries(tz or timezone.get_current_timezone())
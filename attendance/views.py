@@ -1,22 +1,58 @@
+import asyncio
+import json
+from datetime import date, timedelta
+from time import monotonic
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import SAFE_METHODS, AllowAny
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
-from django.db import models
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from .models import Attendance, Shift, EmployeeShift, BiometricIntegration, BiometricPunch, Timesheet, OvertimeRequest
+from django.utils.http import parse_etags, quote_etag
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .models import (
+    Attendance,
+    Shift,
+    EmployeeShift,
+    BiometricIntegration,
+    BiometricDevice,
+    BiometricPunch,
+    Timesheet,
+    OvertimeRequest,
+    AttendanceException,
+    PunchAnomaly,
+    AttendanceMonthSummary,
+    AttendanceRegularization,
+    ClockRequest,
+)
 from .serializers import (
     AttendanceSerializer,
     AttendanceCreateSerializer,
+    AttendanceBulkUploadSerializer,
     ShiftSerializer,
     EmployeeShiftSerializer,
     BiometricIntegrationSerializer,
+    BiometricDeviceSerializer,
     BiometricPunchSerializer,
     TimesheetSerializer,
     OvertimeRequestSerializer,
     OvertimeRequestCreateSerializer,
+    AttendanceExceptionSerializer,
+    PunchAnomalySerializer,
+    AttendanceMonthSummarySerializer,
+    AttendanceRegularizationSerializer,
+    AttendanceRegularizationCreateSerializer,
 )
 from employees.permissions import (
     EmployeeOrRolePermission,
@@ -27,9 +63,38 @@ from employees.permissions import (
     get_employee_profile,
     is_manager_user,
     is_manager_of,
+    has_role_permission,
+)
+from employees.models import Employee
+from .biometric_utils import ingest_punch_items
+from .bulk_utils import bulk_upsert_attendance
+from .device_utils import (
+    integration_for_token,
+    record_error,
+    record_heartbeat,
+    record_punches,
+    resolve_device,
+    stale_devices,
+)
+from .stream_utils import PunchPayloadTooLarge, PunchStreamError, iter_punch_items
+from .archive_utils import hot_window_start
+from .calendar_utils import build_attendance_calendar, calendar_etag, month_bounds, month_holidays
+from .overtime_utils import generate_overtime_requests
+from .clock_utils import record_clock_in, record_clock_out
+from .live_utils import (
+    issue_stream_ticket,
+    latest_sequence,
+    live_scope,
+    publish_clock,
+    read_batches,
+    scoped_items,
+    stream_ticket_user_id,
 )
-from .biometric_utils import parse_punch_payload, update_attendance_from_punch
-from .timesheet_utils import update_timesheet_from_attendance
+from .occupancy_utils import all_occupancy, site_occupancy
+from .offline_utils import parse_offline_batch, sync_offline_events
+from .regularization_utils import apply_regularizations
+from .timesheet_utils import schedule_timesheet_refresh, update_timesheet_from_attendance
+from .tz_utils import day_boundaries, integration_timezone
 
 
 class AttendanceViewSet(viewsets.ModelViewSet):
@@ -49,6 +114,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     employee_permission = 'attendance.self'
 
     def get_permissions(self):
+        if self.action in ('clock_in', 'clock_out', 'offline_sync'):
+            return [IsAuthenticated()]
         return [EmployeeOrRolePermission()]
 
     def get_queryset(self):
@@ -72,19 +139,192 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         attendance = serializer.save()
         update_timesheet_from_attendance(attendance, source='Attendance')
 
+    def _clock_employee_id(self, request):
+        """Resolve whose attendance a clock action targets; returns (employee_id, error_response)."""
+        profile = get_employee_profile(request.user)
+        employee_id = request.data.get('employee_id')
+        if employee_id and (not profile or str(profile.employee_id) != str(employee_id)):
+            if not has_role_permission(request.user, self.permission_required):
+                return None, Response({'detail': 'Not authorized.'}, status=status.HTTP_403_FORBIDDEN)
+            try:
+                employee_id = int(employee_id)
+            except (TypeError, ValueError):
+                return None, Response({'detail': 'Invalid employee_id.'}, status=status.HTTP_400_BAD_REQUEST)
+            if not Employee.objects.filter(employee_id=employee_id).exists():
+                return None, Response({'detail': 'Employee not found.'}, status=status.HTTP_404_NOT_FOUND)
+            return employee_id, None
+        if not profile:
+            return None, Response({'detail': 'No employee profile linked.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (
+            has_role_permission(request.user, self.employee_permission)
+            or has_role_permission(request.user, self.permission_required)
+        ):
+            return None, Response({'detail': 'Not authorized.'}, status=status.HTTP_403_FORBIDDEN)
+        return profile.employee_id, None
+
+    def _run_clock_action(self, request, action_name, handler):
+        employee_id, error = self._clock_employee_id(request)
+        if error:
+            return error
+        idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
+        if not idempotency_key:
+            return handler(employee_id, timezone.now())
+        idempotency_key = str(idempotency_key)[:100]
+        try:
+            with transaction.atomic():
+                # The key row is inserted first: a concurrent retry blocks on its
+                # unique constraint until this attempt commits, then replays it.
+                clock_request = ClockRequest.objects.create(
+                    employee_id=employee_id,
+                    action=action_name,
+                    idempotency_key=idempotency_key,
+                )
+                response = handler(employee_id, timezone.now())
+                if response.status_code >= 400:
+                    # Failed attempts are not recorded, so a retry runs again.
+                    transaction.set_rollback(True)
+                else:
+                    clock_request.response = response.data
+                    clock_request.save(update_fields=['response'])
+        except IntegrityError:
+            replay = ClockRequest.objects.filter(
+                employee_id=employee_id,
+                action=action_name,
+                idempotency_key=idempotency_key,
+            ).values_list('response', flat=True).first()
+            return Response({**(replay or {}), 'duplicate': True})
+        return response
+
     @action(detail=False, methods=['post'])
     def clock_in(self, request):
         """Clock in for an employee"""
-        employee_id = request.data.get('employee_id')
-        # Implementation for clock in
-        return Response({'message': 'Clocked in successfully'})
+        def handler(employee_id, now):
+            local_now = timezone.localtime(now)
+            applied = record_clock_in(employee_id, now, local_now)
+            if applied:
+                schedule_timesheet_refresh(employee_id, local_now.date())
+                publish_clock(
+                    employee_id, local_now.date(),
+                    clock_in_time=local_now.time().replace(microsecond=0), status='Present',
+                )
+            return Response({
+                'message': 'Clocked in successfully' if applied else 'Already clocked in',
+                'employee': employee_id,
+                'date': local_now.date(),
+                'clock_in_time': local_now.time().replace(microsecond=0) if applied else None,
+                'applied': applied,
+            })
+        return self._run_clock_action(request, 'clock_in', handler)
 
     @action(detail=False, methods=['post'])
     def clock_out(self, request):
         """Clock out for an employee"""
-        employee_id = request.data.get('employee_id')
-        # Implementation for clock out
-        return Response({'message': 'Clocked out successfully'})
+        def handler(employee_id, now):
+            local_now = timezone.localtime(now)
+            closed = record_clock_out(employee_id, now, local_now)
+            if not closed:
+                return Response(
+                    {'detail': 'No clock-in found to close.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            attendance_date, applied = closed
+            if applied:
+                schedule_timesheet_refresh(employee_id, attendance_date)
+                publish_clock(employee_id, attendance_date, clock_out_time=local_now.time().replace(microsecond=0))
+            return Response({
+                'message': 'Clocked out successfully' if applied else 'Already clocked out',
+                'employee': employee_id,
+                'date': attendance_date,
+                'clock_out_time': local_now.time().replace(microsecond=0) if applied else None,
+                'applied': applied,
+            })
+        return self._run_clock_action(request, 'clock_out', handler)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_upload(self, request):
+        """Create or overwrite many attendance rows, e.g. a daily sheet for a site.
+
+        Body: ``{"records": [{"employee", "date", "clock_in_time", "clock_out_time",
+        "working_hours", "status", "notes"}]}``. Rows are upserted on
+        (employee, date) and their timesheets recomputed in one pass.
+        """
+        serializer = AttendanceBulkUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = bulk_upsert_attendance(serializer.validated_data['records'], source='Attendance')
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='offline-sync')
+    def offline_sync(self, request):
+        """Apply clock events queued on a device while offline.
+
+        Body: ``{"sent_at": <device time at upload>, "events": [{"idempotency_key",
+        "action": "clock_in"|"clock_out", "timestamp"}]}``.
+        """
+        employee_id, error = self._clock_employee_id(request)
+        if error:
+            return error
+        payload = request.data if isinstance(request.data, dict) else {}
+        try:
+            events, sent_at = parse_offline_batch(payload)
+            result = sync_offline_events(employee_id, events, sent_at)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            # A concurrent sync stored the same idempotency keys first; a retry replays its results.
+            return Response(
+                {'detail': 'Another sync of these events is in progress; retry.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response({'employee': employee_id, **result})
+
+    def _calendar_employees(self, request):
+        employees = Employee.objects.exclude(status='Terminated')
+        profile = get_employee_profile(request.user)
+        if profile is None and not is_admin_or_hr(request.user):
+            # No employee record to scope the calendar to.
+            return employees.none()
+        if is_employee(request.user):
+            return employees.filter(employee_id=profile.employee_id)
+        if not is_admin_or_hr(request.user) and profile and is_manager_user(request.user):
+            reports = Employee.objects.filter(managers=profile).values('employee_id')
+            employees = employees.filter(
+                models.Q(employee_id=profile.employee_id) | models.Q(employee_id__in=reports)
+            )
+        department = request.query_params.get('department')
+        if department:
+            employees = employees.filter(department_id=department)
+        team = request.query_params.get('team')
+        if team:
+            # A team is a manager's direct reports.
+            employees = employees.filter(
+                employee_id__in=Employee.objects.filter(managers=team).values('employee_id')
+            )
+        return employees
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Month matrix of attendance, approved leave and holidays for a department or team"""
+        try:
+            start, end = month_bounds(request.query_params.get('month'))
+        except ValueError:
+            return Response({'detail': 'month must be YYYY-MM.'}, status=status.HTTP_400_BAD_REQUEST)
+        for param in ('department', 'team'):
+            if not request.query_params.get(param, '0').isdigit():
+                return Response({'detail': f'Invalid {param}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        employees = self._calendar_employees(request)
+        holidays = month_holidays(start, end)
+        etag = quote_etag(calendar_etag(employees, start, end, holidays))
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache_key = f'attendance:calendar:{etag}'
+        payload = cache.get(cache_key)
+        if payload is None:
+            payload = build_attendance_calendar(employees, start, end, holidays)
+            cache.set(cache_key, payload, settings.ATTENDANCE_CALENDAR_CACHE_TTL)
+        return Response(payload, headers=headers)
 
 
 class ShiftViewSet(viewsets.ModelViewSet):
@@ -147,8 +387,35 @@ class BiometricIntegrationViewSet(viewsets.ModelViewSet):
         return Response({'success': True, 'message': 'Sync queued.'})
 
 
+class BiometricDeviceViewSet(viewsets.ModelViewSet):
+    queryset = BiometricDevice.objects.select_related('integration')
+    serializer_class = BiometricDeviceSerializer
+    permission_classes = [RolePermission]
+    permission_required = 'attendance.manage'
+    read_permission = 'attendance.view'
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['integration', 'is_active']
+    search_fields = ['device_id', 'name', 'location']
+    ordering_fields = ['last_seen_at', 'punch_count', 'error_count']
+
+    @action(detail=False, methods=['get'])
+    def stale(self, request):
+        """Active devices with no punch or heartbeat in the last ``minutes``."""
+        try:
+            minutes = int(request.query_params.get('minutes') or settings.BIOMETRIC_DEVICE_STALE_MINUTES)
+        except ValueError:
+            raise ValidationError({'minutes': 'Must be an integer.'})
+        if minutes < 1:
+            raise ValidationError({'minutes': 'Must be at least 1.'})
+        queryset = self.filter_queryset(stale_devices(minutes))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+
 class BiometricPunchViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = BiometricPunch.objects.select_related('employee', 'integration')
+    queryset = BiometricPunch.objects.select_related('employee', 'integration', 'payload_blob')
     serializer_class = BiometricPunchSerializer
     permission_classes = [RolePermission]
     permission_required = 'attendance.view'
@@ -159,54 +426,400 @@ class BiometricPunchViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['punch_time', 'created_at']
     ordering = ['-punch_time']
 
+    def get_queryset(self):
+        # Older punches live in compressed archives (see archive_biometric_punches);
+        # include_restored also lists old punches put back by restore_biometric_punches.
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if params.get('include_restored', '').lower() not in ('1', 'true', 'yes'):
+            queryset = queryset.filter(punch_time__gte=hot_window_start())
+        date_from = params.get('date_from') or params.get('date')
+        date_to = params.get('date_to') or params.get('date')
+        if not (date_from or date_to):
+            return queryset
+        integration_id = params.get('integration')
+        if integration_id and not integration_id.isdigit():
+            raise ValidationError({'integration': 'Integration must be a numeric id.'})
+        # Local dates of the integration's site become a plain UTC range on punch_time.
+        integration = BiometricIntegration.objects.filter(pk=integration_id or None).first()
+        boundaries = day_boundaries(integration_timezone(integration))
+        try:
+            if date_from:
+                queryset = queryset.filter(punch_time__gte=boundaries.start_of(date.fromisoformat(date_from)))
+            if date_to:
+                queryset = queryset.filter(
+                    punch_time__lt=boundaries.start_of(date.fromisoformat(date_to) + timedelta(days=1))
+                )
+        except ValueError:
+            raise ValidationError({'detail': 'Dates must be YYYY-MM-DD.'})
+        return queryset
+
+
+def biometric_integration(request):
+    token = request.headers.get('X-Biometric-Token') or request.query_params.get('token')
+    return integration_for_token(token)
+
+
+def biometric_device_id(request):
+    return request.headers.get('X-Device-Id') or request.query_params.get('device_id')
+
 
 class BiometricWebhookView(APIView):
     permission_classes = [AllowAny]
 
+    @staticmethod
+    def _iter_punch_items(request):
+        # JSON bodies are read straight off the request stream so large
+        # historical pushes are never materialized via ``request.data``;
+        # the body size limit is enforced while reading.
+        if request.content_type.split(';')[0].strip() == 'application/json':
+            return iter_punch_items(request.stream, max_bytes=settings.BIOMETRIC_WEBHOOK_MAX_BODY_SIZE)
+        payload = request.data if isinstance(request.data, dict) else {}
+        records = payload.get('punches')
+        return records if isinstance(records, list) else [payload]
+
     def post(self, request):
-        token = request.headers.get('X-Biometric-Token') or request.query_params.get('token')
-        integration = BiometricIntegration.objects.filter(
-            webhook_token=token,
-            is_active=True,
-        ).first()
+        integration = biometric_integration(request)
         if not integration:
             return Response(
                 {'success': False, 'message': 'Invalid token.'},
                 status=status.HTTP_403_FORBIDDEN,
             )
+        device_id = biometric_device_id(request)
+        device = resolve_device(integration, device_id)
+        if device and not device[1]:
+            return Response(
+                {'success': False, 'message': 'Device disabled.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > settings.BIOMETRIC_WEBHOOK_MAX_BODY_SIZE:
+            return Response(
+                {'success': False, 'message': f'Payload exceeds {settings.BIOMETRIC_WEBHOOK_MAX_BODY_SIZE} bytes.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        # Each chunk commits on its own; on a stream error the punches of
+        # earlier chunks stay stored and are reported in ``created``.
+        error = None
+        error_status = status.HTTP_400_BAD_REQUEST
+        try:
+            created = ingest_punch_items(
+                integration,
+                self._iter_punch_items(request),
+                chunk_size=settings.BIOMETRIC_INGEST_CHUNK_SIZE,
+                device_id=device_id,
+            )
+        except PunchStreamError as exc:
+            error = str(exc)
+            created = exc.created
+            if isinstance(exc, PunchPayloadTooLarge):
+                error_status = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        else:
+            if not created:
+                error = 'No punch records found.'
+        if device and created:
+            record_punches(device[0], created, timezone.now())
+        if error:
+            if device:
+                record_error(device[0], error)
+            return Response(
+                {'success': False, 'message': error, 'created': created},
+                status=error_status,
+            )
+
+        now = timezone.now()
+        # The integration instance is shared through the token cache; update the row only.
+        BiometricIntegration.objects.filter(pk=integration.integration_id).update(
+            last_sync_at=now,
+            last_sync_status='Success',
+            last_sync_message=f'Webhook ingested {created} punches.',
+        )
 
+        return Response({'success': True, 'created': created}, status=status.HTTP_201_CREATED)
+
+
+class BiometricHeartbeatView(APIView):
+    """Device keep-alive; an ``error`` in the body is recorded against the device."""
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        integration = biometric_integration(request)
+        if not integration:
+            return Response(
+                {'success': False, 'message': 'Invalid token.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
         payload = request.data if isinstance(request.data, dict) else {}
-        punches = parse_punch_payload(integration, payload)
-        if not punches:
+        device = resolve_device(integration, biometric_device_id(request) or payload.get('device_id'))
+        if not device:
             return Response(
-                {'success': False, 'message': 'No punch records found.'},
+                {'success': False, 'message': 'device_id is required.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if not device[1]:
+            return Response(
+                {'success': False, 'message': 'Device disabled.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        now = timezone.now()
+        if payload.get('error'):
+            record_error(device[0], str(payload['error']), now)
+        else:
+            record_heartbeat(device[0], now)
+        return Response({'success': True, 'server_time': now})
+
+
+class OccupancyView(APIView):
+    """Who is inside right now, per site, served from the cached occupancy snapshots.
+
+    Query params: ``integration`` (one site), ``device`` (one device of it)
+    and ``employees=true`` to include the occupant list. Never reads punches.
+    """
+    permission_classes = [RolePermission]
+    permission_required = 'attendance.view'
+    read_permission = 'attendance.view'
+
+    def get(self, request):
+        params = request.query_params
+        integration = params.get('integration')
+        if integration:
+            try:
+                snapshots = {int(integration): site_occupancy(int(integration))}
+            except ValueError:
+                raise ValidationError({'integration': 'Must be an integer.'})
+        else:
+            snapshots = all_occupancy()
+        device = params.get('device')
+        include_employees = params.get('employees', '').lower() in ('1', 'true', 'yes')
+
+        sites = []
+        for integration_id, snapshot in snapshots.items():
+            site = {
+                'integration': integration_id,
+                'updated_at': snapshot['updated_at'],
+                'count': len(snapshot['employees']),
+                'devices': snapshot['devices'],
+            }
+            if device is not None:
+                site['count'] = snapshot['devices'].get(device, 0)
+                site['devices'] = {device: site['count']}
+            if include_employees:
+                site['employees'] = [
+                    {'employee': int(employee_id), **entry}
+                    for employee_id, entry in snapshot['employees'].items()
+                    if device is None or entry['device_id'] == device
+                ]
+            sites.append(site)
+        return Response({'total': sum(site['count'] for site in sites), 'sites': sites})
+
+
+def _stream_user(request):
+    """User of a stream request, from a JWT header or a ``?ticket=`` (see ``issue_stream_ticket``)."""
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else None
+    if raw_token is None:
+        user_id = stream_ticket_user_id(request.GET.get('ticket') or '')
+        return User.objects.filter(pk=user_id).first() if user_id else None
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (InvalidToken, TokenError):
+        return None
+
+
+class AttendanceLiveTicketView(APIView):
+    """Issue a short-lived ticket for opening the live stream from a browser.
+
+    EventSource cannot send headers; passing the JWT as a query parameter
+    would write it to proxy and access logs. The ticket only opens the
+    stream and expires after LIVE_STREAM_TICKET_SECONDS.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'ticket': issue_stream_ticket(request.user),
+            'expires_in': settings.LIVE_STREAM_TICKET_SECONDS,
+        })
+
+
+class AttendanceLiveStreamView(View):
+    """Server-sent events with punch and attendance deltas as they are committed.
 
-        created = 0
-        for punch_data in punches:
-            punch = BiometricPunch.objects.create(
-                integration=integration,
-                employee=punch_data['employee'],
-                employee_identifier=punch_data['employee_identifier'],
-                device_id=integration.device_id,
-                punch_time=punch_data['punch_time'],
-                direction=punch_data['direction'],
-                raw_payload=punch_data['raw_payload'],
+    Served by the ASGI application (``backend.asgi``); each connection polls
+    the cached delta log (see ``live_utils``) and never queries attendance
+    or punches. Events are ``punch`` and ``attendance`` with a JSON list of
+    items, filtered to what the user may see. Connections are recycled after
+    LIVE_STREAM_MAX_SECONDS; EventSource reconnects with ``Last-Event-ID``
+    and resumes from there.
+    """
+
+    async def get(self, request):
+        user = await sync_to_async(_stream_user)(request)
+        if user is None or not user.is_active:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        scope = await sync_to_async(live_scope)(user)
+        if scope is not None and not scope:
+            return JsonResponse({'detail': 'Not authorized.'}, status=403)
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            after = int(last_event_id) if last_event_id else None
+        except ValueError:
+            after = None
+        if after is None:
+            after = await sync_to_async(latest_sequence)()
+
+        response = StreamingHttpResponse(self._events(scope, after), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def _events(self, scope, after):
+        poll = settings.LIVE_STREAM_POLL_SECONDS
+        deadline = monotonic() + settings.LIVE_STREAM_MAX_SECONDS
+        keepalive_at = monotonic() + settings.LIVE_STREAM_KEEPALIVE_SECONDS
+        yield f'retry: {int(poll * 1000)}\n\n'
+        while monotonic() < deadline:
+            latest, batches = await sync_to_async(read_batches)(after)
+            sent = after
+            for sequence, batch in batches:
+                items = scoped_items(batch, scope)
+                if items:
+                    data = json.dumps({'at': batch['at'], 'items': items})
+                    yield f'id: {sequence}\nevent: {batch["type"]}\ndata: {data}\n\n'
+                    sent = sequence
+                    keepalive_at = monotonic() + settings.LIVE_STREAM_KEEPALIVE_SECONDS
+            if sent != latest:
+                # Move the client's resume point past batches it was not shown.
+                yield f'id: {latest}\n\n'
+            after = latest
+            if monotonic() >= keepalive_at:
+                yield ': keepalive\n\n'
+                keepalive_at = monotonic() + settings.LIVE_STREAM_KEEPALIVE_SECONDS
+            await asyncio.sleep(poll)
+
+
+class BulkReviewMixin:
+    """
+    Bulk approve/reject for viewsets of per-employee records with a ``status``.
+
+    Targets are given as ``ids`` or a ``filter`` (employee, department,
+    status, date_from, date_to). Authorization for the whole set is checked
+    in one query: admin/HR may review anything, managers only records of
+    their direct reports. All targets are updated in one statement.
+    """
+
+    bulk_filter_fields = {
+        'employee': 'employee_id',
+        'department': 'employee__department_id',
+        'status': 'status',
+        'date_from': 'date__gte',
+        'date_to': 'date__lte',
+    }
+
+    # Statuses a record may be reviewed from; ``None`` allows any.
+    bulk_review_from = None
+
+    def bulk_review_values(self, request, decision):
+        return {'status': decision}
+
+    def bulk_reviewed(self, pks, decision):
+        """Called inside the review transaction once the targets are updated."""
+
+    def _bulk_filter(self, queryset, criteria):
+        lookups = {}
+        for key, value in criteria.items():
+            if key not in self.bulk_filter_fields:
+                raise ValueError(f'Unsupported filter: {key}.')
+            if key in ('date_from', 'date_to'):
+                value = date.fromisoformat(str(value))
+            elif key in ('employee', 'department'):
+                value = int(value)
+            lookups[self.bulk_filter_fields[key]] = value
+        return queryset.filter(**lookups)
+
+    def _bulk_review(self, request, decision):
+        model = self.get_queryset().model
+        manager = None
+        if not is_admin_or_hr(request.user):
+            manager = get_employee_profile(request.user)
+            if not manager:
+                return Response({'detail': 'Not authorized.'}, status=status.HTTP_403_FORBIDDEN)
+
+        ids = request.data.get('ids')
+        criteria = request.data.get('filter')
+        try:
+            if ids is not None:
+                if not isinstance(ids, list) or not ids:
+                    raise ValueError('ids must be a non-empty list.')
+                ids = {int(pk) for pk in ids}
+                targets = model.objects.filter(pk__in=ids)
+            elif isinstance(criteria, dict) and criteria:
+                targets = self._bulk_filter(model.objects.all(), criteria)
+                if manager:
+                    reports = Employee.objects.filter(managers=manager).values('employee_id')
+                    targets = targets.filter(employee_id__in=reports)
+            else:
+                raise ValueError('Provide ids or filter.')
+        except (TypeError, ValueError) as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if manager:
+            manages = Employee.managers.through.objects.filter(
+                from_employee=models.OuterRef('employee'),
+                to_employee=manager,
             )
-            if punch.employee:
-                update_attendance_from_punch(punch.employee, punch.punch_time)
-            created += 1
+            rows = list(targets.annotate(allowed=models.Exists(manages)).values_list('pk', 'allowed'))
+        else:
+            rows = [(pk, True) for pk in targets.values_list('pk', flat=True)]
 
-        integration.last_sync_at = timezone.now()
-        integration.last_sync_status = 'Success'
-        integration.last_sync_message = f'Webhook ingested {created} punches.'
-        integration.save(update_fields=['last_sync_at', 'last_sync_status', 'last_sync_message'])
+        found = {pk for pk, _ in rows}
+        if ids is not None and ids - found:
+            return Response(
+                {'detail': 'Some records were not found.', 'missing': sorted(ids - found)},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        denied = sorted(pk for pk, allowed in rows if not allowed)
+        if denied:
+            return Response({'detail': 'Not authorized.', 'denied': denied}, status=status.HTTP_403_FORBIDDEN)
 
-        return Response({'success': True, 'created': created}, status=status.HTTP_201_CREATED)
+        with transaction.atomic():
+            if self.bulk_review_from:
+                reviewable = set(
+                    model.objects.select_for_update()
+                    .filter(pk__in=found, status__in=self.bulk_review_from)
+                    .values_list('pk', flat=True)
+                )
+                # Listed records must all be reviewable; a filter just skips the others.
+                if ids is not None and found - reviewable:
+                    return Response(
+                        {'detail': 'Some records were already reviewed.', 'conflicts': sorted(found - reviewable)},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                found = reviewable
+            updated = model.objects.filter(pk__in=found).update(
+                updated_at=timezone.now(),
+                **self.bulk_review_values(request, decision),
+            )
+            self.bulk_reviewed(found, decision)
+        return Response({'status': decision, 'updated': updated})
+
+    @action(detail=False, methods=['post'])
+    def bulk_approve(self, request):
+        return self._bulk_review(request, 'Approved')
+
+    @action(detail=False, methods=['post'])
+    def bulk_reject(self, request):
+        return self._bulk_review(request, 'Rejected')
 
 
-class TimesheetViewSet(viewsets.ModelViewSet):
+class TimesheetViewSet(BulkReviewMixin, viewsets.ModelViewSet):
     queryset = Timesheet.objects.select_related('employee')
     serializer_class = TimesheetSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -220,7 +833,7 @@ class TimesheetViewSet(viewsets.ModelViewSet):
     employee_write_allowed = False
 
     def get_permissions(self):
-        if self.action in ('approve', 'reject'):
+        if self.action in ('approve', 'reject', 'bulk_approve', 'bulk_reject'):
             return [IsAdminOrManager()]
         return [EmployeeOrRolePermission()]
 
@@ -260,7 +873,7 @@ class TimesheetViewSet(viewsets.ModelViewSet):
         return is_manager_of(manager, timesheet.employee)
 
 
-class OvertimeRequestViewSet(viewsets.ModelViewSet):
+class OvertimeRequestViewSet(BulkReviewMixin, viewsets.ModelViewSet):
     queryset = OvertimeRequest.objects.select_related('employee', 'timesheet', 'approved_by')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
@@ -272,8 +885,10 @@ class OvertimeRequestViewSet(viewsets.ModelViewSet):
     employee_permission = 'overtime.self'
 
     def get_permissions(self):
-        if self.action in ('approve', 'reject'):
+        if self.action in ('approve', 'reject', 'bulk_approve', 'bulk_reject'):
             return [IsAdminOrManager()]
+        if self.action == 'generate':
+            return [RolePermission()]
         if self.request.method in SAFE_METHODS or self.request.method == 'POST':
             return [EmployeeOrRolePermission()]
         return [RolePermission()]
@@ -323,8 +938,267 @@ class OvertimeRequestViewSet(viewsets.ModelViewSet):
         overtime_request.save(update_fields=['status', 'notes', 'approved_by', 'approved_at', 'updated_at'])
         return Response(self.get_serializer(overtime_request).data)
 
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """Create pending requests for timesheet overtime in a period"""
+        try:
+            start = date.fromisoformat(str(request.data.get('start_date')))
+            end = date.fromisoformat(str(request.data.get('end_date')))
+        except ValueError:
+            return Response(
+                {'detail': 'start_date and end_date must be YYYY-MM-DD.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if start > end:
+            return Response(
+                {'detail': 'start_date must be on or before end_date.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        department = request.data.get('department') or None
+        if department is not None:
+            try:
+                department = int(department)
+            except (TypeError, ValueError):
+                return Response({'detail': 'department must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        created = generate_overtime_requests(start, end, department)
+        return Response({'created': created}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def bulk_review_values(self, request, decision):
+        values = {
+            'status': decision,
+            'approved_by': get_employee_profile(request.user),
+            'approved_at': timezone.now(),
+        }
+        if decision == 'Rejected' and request.data.get('notes'):
+            values['notes'] = request.data['notes']
+        return values
+
     def _can_manage_request(self, user, overtime_request):
         manager = get_employee_profile(user)
         if is_admin_or_hr(user):
             return True
         return is_manager_of(manager, overtime_request.employee)
+
+
+class AttendanceRegularizationViewSet(BulkReviewMixin, viewsets.ModelViewSet):
+    """
+    Attendance corrections requested by employees and approved by their managers
+    """
+    queryset = AttendanceRegularization.objects.select_related('employee', 'approved_by')
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    filterset_fields = ['employee', 'status', 'date']
+    ordering_fields = ['created_at', 'date']
+    ordering = ['-created_at']
+    permission_required = 'attendance.manage'
+    read_permission = 'attendance.view'
+    employee_permission = 'attendance.self'
+    bulk_review_from = ('Pending',)
+
+    def get_permissions(self):
+        if self.action in ('approve', 'reject', 'bulk_approve', 'bulk_reject'):
+            return [IsAdminOrManager()]
+        if self.request.method in SAFE_METHODS or self.request.method == 'POST':
+            return [EmployeeOrRolePermission()]
+        return [RolePermission()]
+
+    def get_queryset(self):
+        queryset = AttendanceRegularization.objects.select_related('employee', 'approved_by')
+        if is_admin_or_hr(self.request.user):
+            return queryset
+        employee = get_employee_profile(self.request.user)
+        if not employee:
+            return queryset.none()
+        if is_manager_user(self.request.user):
+            return queryset.filter(models.Q(employee=employee) | models.Q(employee__managers=employee))
+        return queryset.filter(employee=employee)
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return AttendanceRegularizationCreateSerializer
+        return AttendanceRegularizationSerializer
+
+    def perform_create(self, serializer):
+        if is_employee(self.request.user):
+            serializer.save(employee=self.request.user.employee_profile)
+        else:
+            serializer.save()
+
+    def _review(self, request, decision):
+        regularization = self.get_object()
+        if not self._can_manage_regularization(request.user, regularization):
+            return Response({'detail': 'Not authorized.'}, status=status.HTTP_403_FORBIDDEN)
+        with transaction.atomic():
+            regularization = AttendanceRegularization.objects.select_for_update().get(pk=regularization.pk)
+            if regularization.status != 'Pending':
+                return Response(
+                    {'detail': f'Regularization is already {regularization.status.lower()}.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            regularization.status = decision
+            regularization.approved_by = get_employee_profile(request.user)
+            regularization.approved_at = timezone.now()
+            if decision == 'Rejected':
+                regularization.notes = request.data.get('notes') or regularization.notes
+            regularization.save(update_fields=['status', 'notes', 'approved_by', 'approved_at', 'updated_at'])
+            if decision == 'Approved':
+                apply_regularizations([regularization.pk])
+        regularization.refresh_from_db()
+        return Response(self.get_serializer(regularization).data)
+
+    @action(detail=True, methods=['put'])
+    def approve(self, request, pk=None):
+        return self._review(request, 'Approved')
+
+    @action(detail=True, methods=['put'])
+    def reject(self, request, pk=None):
+        return self._review(request, 'Rejected')
+
+    def bulk_review_values(self, request, decision):
+        values = {
+            'status': decision,
+            'approved_by': get_employee_profile(request.user),
+            'approved_at': timezone.now(),
+        }
+        if decision == 'Rejected' and request.data.get('notes'):
+            values['notes'] = request.data['notes']
+        return values
+
+    def bulk_reviewed(self, pks, decision):
+        if decision == 'Approved':
+            apply_regularizations(pks)
+
+    def _can_manage_regularization(self, user, regularization):
+        manager = get_employee_profile(user)
+        if is_admin_or_hr(user):
+            return True
+        return is_manager_of(manager, regularization.employee)
+
+
+class AttendanceMonthSummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Monthly attendance totals per employee, read from the maintained summary table
+    """
+    queryset = AttendanceMonthSummary.objects.select_related('employee')
+    serializer_class = AttendanceMonthSummarySerializer
+    permission_classes = [EmployeeOrRolePermission]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    filterset_fields = ['employee', 'employee__department']
+    ordering_fields = ['month', 'working_hours', 'overtime_hours']
+    ordering = ['-month']
+    permission_required = 'attendance.manage'
+    read_permission = 'attendance.view'
+    employee_permission = 'attendance.self'
+
+    def get_queryset(self):
+        queryset = AttendanceMonthSummary.objects.select_related('employee')
+        month = self.request.query_params.get('month')
+        if month:
+            try:
+                queryset = queryset.filter(month=month_bounds(month)[0])
+            except ValueError:
+                raise ValidationError({'month': 'Use YYYY-MM.'})
+        if is_admin_or_hr(self.request.user):
+            return queryset
+        employee = get_employee_profile(self.request.user)
+        if not employee:
+            return queryset.none()
+        if is_manager_user(self.request.user):
+            reports = Employee.objects.filter(managers=employee).values('employee_id')
+            return queryset.filter(models.Q(employee=employee) | models.Q(employee_id__in=reports))
+        return queryset.filter(employee=employee)
+
+
+class AttendanceExceptionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Late arrivals, early exits and absences stored by detect_attendance_exceptions
+    """
+    queryset = AttendanceException.objects.select_related('employee', 'shift')
+    serializer_class = AttendanceExceptionSerializer
+    permission_classes = [EmployeeOrRolePermission]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    filterset_fields = ['employee', 'kind', 'date', 'employee__department']
+    ordering_fields = ['date', 'minutes']
+    ordering = ['-date']
+    permission_required = 'attendance.manage'
+    read_permission = 'attendance.view'
+    employee_permission = 'attendance.self'
+
+    def get_queryset(self):
+        queryset = AttendanceException.objects.select_related('employee', 'shift')
+        date_from = self.request.query_params.get('date_from')
+        date_to = self.request.query_params.get('date_to')
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        if is_admin_or_hr(self.request.user):
+            return queryset
+        employee = get_employee_profile(self.request.user)
+        if not employee:
+            return queryset.none()
+        if is_manager_user(self.request.user):
+            # Subquery rather than a join so counts in ``summary`` are not multiplied.
+            reports = Employee.objects.filter(managers=employee).values('employee_id')
+            return queryset.filter(models.Q(employee=employee) | models.Q(employee_id__in=reports))
+        return queryset.filter(employee=employee)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Exception counts and minutes per employee for the filtered range"""
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        rows = (
+            queryset
+            .values('employee_id', 'employee__first_name', 'employee__last_name')
+            .annotate(
+                late=models.Count('exception_id', filter=models.Q(kind='Late')),
+                late_minutes=models.Sum('minutes', filter=models.Q(kind='Late'), default=0),
+                early_exits=models.Count('exception_id', filter=models.Q(kind='Early Exit')),
+                early_exit_minutes=models.Sum('minutes', filter=models.Q(kind='Early Exit'), default=0),
+                absences=models.Count('exception_id', filter=models.Q(kind='Absent')),
+            )
+            .order_by('employee__first_name', 'employee__last_name')
+        )
+        return Response([
+            {
+                'employee': row.pop('employee_id'),
+                'employee_name': f"{row.pop('employee__first_name')} {row.pop('employee__last_name')}",
+                **row,
+            }
+            for row in rows
+        ])
+
+
+class PunchAnomalyViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Review queue for suspicious punch patterns found by detect_punch_anomalies
+    """
+    queryset = PunchAnomaly.objects.select_related('employee', 'reviewed_by')
+    serializer_class = PunchAnomalySerializer
+    permission_classes = [RolePermission]
+    permission_required = 'attendance.manage'
+    read_permission = 'attendance.view'
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__email']
+    filterset_fields = ['employee', 'kind', 'status', 'date']
+    ordering_fields = ['date', 'score', 'created_at']
+    ordering = ['-date', '-score']
+
+    @action(detail=True, methods=['put'])
+    def review(self, request, pk=None):
+        """Confirm or dismiss a flagged case"""
+        anomaly = self.get_object()
+        decision = request.data.get('status')
+        if decision not in ('Confirmed', 'Dismissed'):
+            return Response(
+                {'detail': 'status must be Confirmed or Dismissed.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        anomaly.status = decision
+        anomaly.notes = request.data.get('notes') or anomaly.notes
+        anomaly.reviewed_by = get_employee_profile(request.user)
+        anomaly.reviewed_at = timezone.now()
+        anomaly.save(update_fields=['status', 'notes', 'reviewed_by', 'reviewed_at'])
+        return Response(self.get_serializer(anomaly).data)
@@ -8,7 +8,8 @@ echo "[entrypoint] Collecting static files..."
 python manage.py collectstatic --noinput
 
 echo "[entrypoint] Starting gunicorn..."
-exec gunicorn backend.wsgi:application \
+exec gunicorn backend.asgi:application \
+  --worker-class uvicorn.workers.UvicornWorker \
   --bind 0.0.0.0:${PORT:-8000} \
   --workers ${GUNICORN_WORKERS:-2} \
   --timeout ${GUNICORN_TIMEOUT:-120}
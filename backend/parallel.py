@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+import django
+from django.db import connection, connections
+
+
+def default_worker_count() -> int:
+    # SQLite serializes writers, so extra processes only add lock contention.
+    if connection.vendor == 'sqlite':
+        return 1
+    return min(os.cpu_count() or 1, 8)
+
+
+def split_into_chunks(items: Sequence[Any], size: int) -> List[List[Any]]:
+    return [list(items[index:index + size]) for index in range(0, len(items), size)]
+
+
+def _initialize_worker() -> None:
+    django.setup()
+
+
+def run_in_processes(
+    func: Callable[..., Any],
+    chunks: Iterable[Any],
+    workers: int,
+    *args: Any,
+) -> Iterator[Any]:
+    """Yield ``func(chunk, *args)`` for each chunk, using a process pool when ``workers > 1``.
+
+    With a pool, results are yielded in completion order, not chunk order;
+    callers that need to match results to chunks must return an identifier.
+
+    ``func`` must be a module-level callable. Workers are spawned rather than
+    forked: the caller may be a threaded web worker (payslip generation runs
+    on a background thread), and forking a threaded process can copy held
+    locks into the child. Database connections are closed before the pool
+    starts so each worker opens its own.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield func(chunk, *args)
+        return
+
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_initialize_worker,
+    ) as executor:
+        futures = [executor.submit(func, chunk, *args) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
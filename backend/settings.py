@@ -14,7 +14,7 @@ from pathlib import Path
 from datetime import timedelta
 
 import dj_database_url
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -108,6 +108,26 @@ DATABASES = {
 }
 
 
+# Cache shared by every worker process and management command (calendar ETags,
+# occupancy snapshots, the live attendance event log). Set REDIS_URL to use
+# Redis; otherwise a database table is used (created by the attendance migrations).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -173,6 +193,84 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Biometric ingestion: punches per parse/insert batch for webhook payloads
+BIOMETRIC_INGEST_CHUNK_SIZE = config('BIOMETRIC_INGEST_CHUNK_SIZE', default=500, cast=int)
+
+# Largest webhook body in bytes; JSON bodies are streamed, so DATA_UPLOAD_MAX_MEMORY_SIZE does not apply to them
+BIOMETRIC_WEBHOOK_MAX_BODY_SIZE = config('BIOMETRIC_WEBHOOK_MAX_BODY_SIZE', default=20 * 1024 * 1024, cast=int)
+
+# Seconds a webhook token / device lookup stays in each worker's in-process cache
+BIOMETRIC_TOKEN_CACHE_TTL = config('BIOMETRIC_TOKEN_CACHE_TTL', default=60, cast=int)
+
+# A device not heard from (punch or heartbeat) for this many minutes is reported as stale
+BIOMETRIC_DEVICE_STALE_MINUTES = config('BIOMETRIC_DEVICE_STALE_MINUTES', default=30, cast=int)
+
+# Punches older than this many days are moved to compressed monthly archives
+BIOMETRIC_PUNCH_RETENTION_DAYS = config('BIOMETRIC_PUNCH_RETENTION_DAYS', default=365, cast=int)
+
+# Live occupancy: hours after an IN punch an employee without an OUT stops counting as inside
+OCCUPANCY_MAX_HOURS = config('OCCUPANCY_MAX_HOURS', default=16, cast=int)
+
+# Live attendance stream: seconds deltas stay in the cached log, seconds between
+# log polls per connection, keep-alive interval and connection lifetime before the client reconnects
+LIVE_EVENT_TTL = config('LIVE_EVENT_TTL', default=300, cast=int)
+LIVE_STREAM_POLL_SECONDS = config('LIVE_STREAM_POLL_SECONDS', default=1.0, cast=float)
+LIVE_STREAM_KEEPALIVE_SECONDS = config('LIVE_STREAM_KEEPALIVE_SECONDS', default=15, cast=int)
+LIVE_STREAM_MAX_SECONDS = config('LIVE_STREAM_MAX_SECONDS', default=300, cast=int)
+
+# Seconds a stream ticket (``?ticket=`` on the live stream URL) stays valid; reconnects after this need a new one
+LIVE_STREAM_TICKET_SECONDS = config('LIVE_STREAM_TICKET_SECONDS', default=600, cast=int)
+
+# Hours before shift start / after shift end whose punches still count toward that shift
+ATTENDANCE_SHIFT_WINDOW_SLACK_HOURS = config('ATTENDANCE_SHIFT_WINDOW_SLACK_HOURS', default=4, cast=int)
+
+# Seconds to coalesce clock-in/out changes before recomputing timesheets off the request path
+ATTENDANCE_TIMESHEET_REFRESH_DELAY = config('ATTENDANCE_TIMESHEET_REFRESH_DELAY', default=5, cast=float)
+
+# Seconds after a clock-out during which a repeated clock-out (a double tap) keeps the first time
+ATTENDANCE_CLOCK_OUT_DEBOUNCE_SECONDS = config('ATTENDANCE_CLOCK_OUT_DEBOUNCE_SECONDS', default=60, cast=int)
+
+# Seconds a built team calendar month stays cached under its ETag
+ATTENDANCE_CALENDAR_CACHE_TTL = config('ATTENDANCE_CALENDAR_CACHE_TTL', default=300, cast=int)
+
+# Minutes after shift start / before shift end tolerated before flagging a late arrival / early exit
+ATTENDANCE_LATE_GRACE_MINUTES = config('ATTENDANCE_LATE_GRACE_MINUTES', default=10, cast=int)
+ATTENDANCE_EARLY_EXIT_GRACE_MINUTES = config('ATTENDANCE_EARLY_EXIT_GRACE_MINUTES', default=10, cast=int)
+
+# Weekdays (Monday=0) that are not scheduled working days when detecting absences
+ATTENDANCE_WEEKLY_OFF_DAYS = config('ATTENDANCE_WEEKLY_OFF_DAYS', default='5,6', cast=Csv(int))
+
+# Timesheet overtime below this many hours does not get an automatic overtime request
+OVERTIME_REQUEST_MIN_HOURS = config('OVERTIME_REQUEST_MIN_HOURS', default=0.25, cast=float)
+
+# Pay runs: hours in a pay period for the hourly rate, and the overtime pay multiplier
+PAYROLL_MONTHLY_HOURS = config('PAYROLL_MONTHLY_HOURS', default=160, cast=float)
+PAYROLL_OVERTIME_MULTIPLIER = config('PAYROLL_OVERTIME_MULTIPLIER', default=1.5, cast=float)
+
+# Minutes after which a pay run still marked Running is assumed dead (worker killed) and may be restarted
+PAYROLL_RUN_STALE_MINUTES = config('PAYROLL_RUN_STALE_MINUTES', default=60, cast=int)
+
+# Minutes without progress after which queued or running payslip generation is assumed dead and may be restarted
+PAYSLIP_GENERATION_STALE_MINUTES = config('PAYSLIP_GENERATION_STALE_MINUTES', default=15, cast=int)
+
+# Offline clock sync: events per request, clock skew trusted as-is, skew corrected
+# (beyond it the batch is rejected) and the oldest event accepted
+OFFLINE_CLOCK_MAX_EVENTS = config('OFFLINE_CLOCK_MAX_EVENTS', default=500, cast=int)
+OFFLINE_CLOCK_SKEW_TOLERANCE_SECONDS = config('OFFLINE_CLOCK_SKEW_TOLERANCE_SECONDS', default=120, cast=int)
+OFFLINE_CLOCK_MAX_SKEW_SECONDS = config('OFFLINE_CLOCK_MAX_SKEW_SECONDS', default=3600, cast=int)
+OFFLINE_CLOCK_MAX_AGE_DAYS = config('OFFLINE_CLOCK_MAX_AGE_DAYS', default=7, cast=int)
+
+# Attendance rows accepted by one bulk upload request
+ATTENDANCE_BULK_MAX_RECORDS = config('ATTENDANCE_BULK_MAX_RECORDS', default=2000, cast=int)
+
+# Punch anomaly detection thresholds (detect_punch_anomalies)
+PUNCH_ANOMALY_DEVICE_CONFLICT_SECONDS = config('PUNCH_ANOMALY_DEVICE_CONFLICT_SECONDS', default=600, cast=int)
+PUNCH_ANOMALY_MAX_DAILY_PUNCHES = config('PUNCH_ANOMALY_MAX_DAILY_PUNCHES', default=12, cast=int)
+PUNCH_ANOMALY_ROUNDING_MIN_PUNCHES = config('PUNCH_ANOMALY_ROUNDING_MIN_PUNCHES', default=20, cast=int)
+PUNCH_ANOMALY_ROUNDING_SHARE = config('PUNCH_ANOMALY_ROUNDING_SHARE', default=0.5, cast=float)
+PUNCH_ANOMALY_HOURS_Z_SCORE = config('PUNCH_ANOMALY_HOURS_Z_SCORE', default=3.5, cast=float)
+PUNCH_ANOMALY_HOURS_MIN_DEVIATION = config('PUNCH_ANOMALY_HOURS_MIN_DEVIATION', default=2.0, cast=float)
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -23,16 +23,25 @@ from employees.views import (
     OfferLetterViewSet,
 )
 from leave_management.views import LeaveRequestViewSet, LeaveBalanceViewSet, HolidayViewSet
-from payroll.views import PayrollViewSet, SalaryStructureViewSet, ExpenseClaimViewSet
+from payroll.views import PayrollViewSet, PayRunViewSet, SalaryStructureViewSet, ExpenseClaimViewSet
 from attendance.views import (
     AttendanceViewSet,
     ShiftViewSet,
     EmployeeShiftViewSet,
     BiometricIntegrationViewSet,
+    BiometricDeviceViewSet,
+    BiometricHeartbeatView,
+    OccupancyView,
+    AttendanceLiveStreamView,
+    AttendanceLiveTicketView,
     BiometricPunchViewSet,
     BiometricWebhookView,
     TimesheetViewSet,
     OvertimeRequestViewSet,
+    AttendanceExceptionViewSet,
+    AttendanceMonthSummaryViewSet,
+    AttendanceRegularizationViewSet,
+    PunchAnomalyViewSet,
 )
 from hr_ops.views import (
     OnboardingChecklistTemplateViewSet,
@@ -64,14 +73,20 @@ router.register(r'leave/leave-requests', LeaveRequestViewSet, basename='leave-re
 router.register(r'leave/leave-balances', LeaveBalanceViewSet, basename='leave-balance')
 router.register(r'leave/holidays', HolidayViewSet, basename='holiday')
 router.register(r'payroll/payrolls', PayrollViewSet, basename='payroll')
+router.register(r'payroll/pay-runs', PayRunViewSet, basename='pay-run')
 router.register(r'payroll/salary-structures', SalaryStructureViewSet, basename='salary-structure')
 router.register(r'payroll/claims', ExpenseClaimViewSet, basename='expense-claim')
 router.register(r'attendance/shifts', ShiftViewSet, basename='shift')
 router.register(r'attendance/employee-shifts', EmployeeShiftViewSet, basename='employee-shift')
 router.register(r'attendance/biometric-integrations', BiometricIntegrationViewSet, basename='biometric-integration')
+router.register(r'attendance/biometric-devices', BiometricDeviceViewSet, basename='biometric-device')
 router.register(r'attendance/biometric-punches', BiometricPunchViewSet, basename='biometric-punch')
 router.register(r'attendance/timesheets', TimesheetViewSet, basename='timesheet')
 router.register(r'attendance/overtime-requests', OvertimeRequestViewSet, basename='overtime-request')
+router.register(r'attendance/regularizations', AttendanceRegularizationViewSet, basename='attendance-regularization')
+router.register(r'attendance/summaries', AttendanceMonthSummaryViewSet, basename='attendance-summary')
+router.register(r'attendance/exceptions', AttendanceExceptionViewSet, basename='attendance-exception')
+router.register(r'attendance/punch-anomalies', PunchAnomalyViewSet, basename='punch-anomaly')
 router.register(r'attendance', AttendanceViewSet, basename='attendance')
 router.register(r'hr/onboarding-checklists', OnboardingChecklistTemplateViewSet, basename='onboarding-checklist')
 router.register(r'hr/onboarding-task-templates', OnboardingTaskTemplateViewSet, basename='onboarding-task-template')
@@ -99,6 +114,10 @@ urlpatterns = [
     
     # API v1 endpoints
     path('api/v1/attendance/biometric-webhook/', BiometricWebhookView.as_view(), name='biometric-webhook'),
+    path('api/v1/attendance/biometric-heartbeat/', BiometricHeartbeatView.as_view(), name='biometric-heartbeat'),
+    path('api/v1/attendance/occupancy/', OccupancyView.as_view(), name='attendance-occupancy'),
+    path('api/v1/attendance/live/', AttendanceLiveStreamView.as_view(), name='attendance-live'),
+    path('api/v1/attendance/live/ticket/', AttendanceLiveTicketView.as_view(), name='attendance-live-ticket'),
     path('api/v1/recruitment/webhook/<str:provider>/', RecruitmentWebhookView.as_view(), name='recruitment-webhook'),
     path('api/v1/', include(router.urls)),
 ]
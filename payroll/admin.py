@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payroll, SalaryStructure, ExpenseClaim
+from .models import Payroll, PayRun, SalaryStructure, ExpenseClaim
 
 
 @admin.register(Payroll)
@@ -11,6 +11,14 @@ class PayrollAdmin(admin.ModelAdmin):
     date_hierarchy = 'pay_period_start'
 
 
+@admin.register(PayRun)
+class PayRunAdmin(admin.ModelAdmin):
+    list_display = ['period_start', 'period_end', 'status', 'employee_count', 'total_net', 'completed_at']
+    list_filter = ['status', 'period_start']
+    readonly_fields = ['pay_run_id', 'started_at', 'completed_at', 'created_at', 'updated_at']
+    date_hierarchy = 'period_start'
+
+
 @admin.register(SalaryStructure)
 class SalaryStructureAdmin(admin.ModelAdmin):
     list_display = ['employee', 'basic_salary', 'total_salary', 'effective_from', 'is_active']
@@ -0,0 +1,140 @@
+import time
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from employees.models import Department, Employee
+from payroll.models import Payroll
+from payroll.payslip_utils import PayslipRenderer, generate_payslip_pdf, get_payslip_renderer
+
+
+def _legacy_render(payroll):
+    """The per-call renderer (imports, stylesheet and table style rebuilt each time), kept as the baseline."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=LETTER, title='Payslip')
+    styles = getSampleStyleSheet()
+
+    employee = payroll.employee
+    department = employee.department.name if employee.department else 'N/A'
+
+    elements = [
+        Paragraph('Payslip', styles['Title']),
+        Spacer(1, 12),
+        Paragraph(f"Employee: {employee.full_name}", styles['Normal']),
+        Paragraph(f"Employee ID: {employee.employee_id}", styles['Normal']),
+        Paragraph(f"Department: {department}", styles['Normal']),
+        Paragraph(f"Designation: {employee.designation}", styles['Normal']),
+        Paragraph(f"Pay Period: {payroll.pay_period_start} to {payroll.pay_period_end}", styles['Normal']),
+        Paragraph(f"Issued On: {timezone.localdate()}", styles['Normal']),
+        Spacer(1, 12),
+    ]
+    earnings_table = Table([
+        ['Earnings', 'Amount'],
+        ['Basic Salary', f"{payroll.basic_salary}"],
+        ['Allowances', f"{payroll.allowances}"],
+        ['Bonus', f"{payroll.bonus}"],
+        ['Overtime Pay', f"{payroll.overtime_pay}"],
+        ['Reimbursements', f"{payroll.reimbursements}"],
+    ], hAlign='LEFT')
+    deductions_table = Table([
+        ['Deductions', 'Amount'],
+        ['Deductions', f"{payroll.deductions}"],
+        ['Tax', f"{payroll.tax}"],
+        ['Insurance', f"{payroll.insurance}"],
+    ], hAlign='LEFT')
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+    ])
+    earnings_table.setStyle(style)
+    deductions_table.setStyle(style)
+
+    elements.extend([
+        Paragraph('Earnings', styles['Heading3']),
+        earnings_table,
+        Spacer(1, 12),
+        Paragraph('Deductions', styles['Heading3']),
+        deductions_table,
+        Spacer(1, 12),
+        Paragraph(f"Net Pay: {payroll.net_pay}", styles['Heading2']),
+    ])
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark payslip PDF rendering on synthetic payrolls (no rows are written).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payslips', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--target-ms', type=float, default=50.0)
+
+    def handle(self, *args, **options):
+        count = max(options['payslips'], 1)
+        department = Department(department_id=1, name='Engineering')
+        payrolls = []
+        for index in range(count):
+            employee = Employee(
+                employee_id=index + 1,
+                first_name='Bench',
+                last_name=f'Employee {index + 1}',
+                designation='Engineer',
+                department=department,
+            )
+            payroll = Payroll(
+                payroll_id=index + 1,
+                employee=employee,
+                pay_period_start=date(2024, 1, 1),
+                pay_period_end=date(2024, 1, 31),
+                basic_salary=Decimal('5000.00') + index,
+                allowances=Decimal('1200.00'),
+                bonus=Decimal('0.00'),
+                overtime_pay=Decimal('150.75'),
+                deductions=Decimal('600.00'),
+                tax=Decimal('820.50'),
+                insurance=Decimal('0.00'),
+                reimbursements=Decimal('42.10'),
+            )
+            payroll.net_pay = payroll.calculate_net_pay()
+            payrolls.append(payroll)
+
+        # One-time cost paid by each process on its first payslip.
+        started = time.perf_counter()
+        PayslipRenderer()
+        setup = time.perf_counter() - started
+        get_payslip_renderer()
+
+        legacy = self._best_of(options['repeat'], lambda: [_legacy_render(payroll) for payroll in payrolls])
+        cached = self._best_of(options['repeat'], lambda: [generate_payslip_pdf(payroll) for payroll in payrolls])
+        legacy_ms = legacy / count * 1000
+        cached_ms = cached / count * 1000
+
+        self.stdout.write(f'Payslips: {count}')
+        self.stdout.write(f'Renderer setup (once per process): {setup * 1000:.2f}ms')
+        self.stdout.write(f'Legacy per-call renderer: {legacy:.3f}s ({legacy_ms:.2f}ms/payslip)')
+        self.stdout.write(f'Cached renderer: {cached:.3f}s ({cached_ms:.2f}ms/payslip)')
+        if cached_ms <= options['target_ms']:
+            self.stdout.write(self.style.SUCCESS(f'Within the {options["target_ms"]:.0f}ms/payslip target.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Above the {options["target_ms"]:.0f}ms/payslip target.'))
+
+    @staticmethod
+    def _best_of(repeat, func):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.parallel import default_worker_count
+from payroll.models import PayRun
+from payroll.payslip_utils import generate_pay_run_payslips
+
+
+class Command(BaseCommand):
+    help = 'Render and store every payslip of a pay run using worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pay_run', type=int, help='Pay run id.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes (defaults to the CPU count; always 1 on SQLite).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=50, help='Payslips per worker task.')
+        parser.add_argument('--only-missing', action='store_true', help='Skip payrolls that already have a payslip.')
+        parser.add_argument('--zip', action='store_true', help='Also build a zip archive of all payslips.')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Start even if the run is marked as generating (e.g. after a crashed worker).',
+        )
+
+    def handle(self, *args, **options):
+        pay_run = PayRun.objects.filter(pk=options['pay_run']).first()
+        if not pay_run:
+            raise CommandError(f'Pay run {options["pay_run"]} not found.')
+        if options['force']:
+            PayRun.objects.filter(pk=pay_run.pk).update(payslip_status='Idle')
+
+        workers = options['workers'] or default_worker_count()
+        result = generate_pay_run_payslips(
+            pay_run,
+            workers=workers,
+            chunk_size=options['chunk_size'],
+            only_missing=options['only_missing'],
+            archive=options['zip'],
+            on_progress=lambda done, total: self.stdout.write(f'[{done}/{total}] payslips rendered'),
+        )
+        if result is None:
+            raise CommandError('Payslips for this pay run are already being generated; use --force to restart.')
+
+        message = f'Generated {result.payslips_done} payslips for pay run {result.pk} using {workers} worker(s).'
+        if result.payslip_archive:
+            message += f' Archive: {result.payslip_archive.name}'
+        self.stdout.write(self.style.SUCCESS(message))
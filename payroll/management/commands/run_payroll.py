@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.parallel import default_worker_count
+from payroll.models import PayRun
+from payroll.payrun_utils import PayRunInProgress, run_pay_run
+
+
+def _date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}; expected YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = 'Compute the payroll of every eligible employee for a pay period (idempotent).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='First day of the period (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='end', required=True, help='Last day of the period (YYYY-MM-DD).')
+        parser.add_argument('--department', type=int, help='Department id to limit the run to.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes (defaults to the CPU count; always 1 on SQLite).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Employees per worker task.')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Restart the run even if it is marked Queued or Running (e.g. after its worker was killed).',
+        )
+
+    def handle(self, *args, **options):
+        start = _date(options['start'])
+        end = _date(options['end'])
+        if start > end:
+            raise CommandError('--from must be on or before --to.')
+
+        pay_run, _ = PayRun.objects.get_or_create(period_start=start, period_end=end)
+        workers = options['workers'] or default_worker_count()
+        try:
+            pay_run = run_pay_run(
+                pay_run,
+                options['department'],
+                workers=workers,
+                chunk_size=options['chunk_size'],
+                force=options['force'],
+            )
+        except PayRunInProgress as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Pay run {pay_run.pk} ({start} to {end}): {pay_run.employee_count} payrolls, '
+            f'{pay_run.skipped_count} already paid, net {pay_run.total_net} using {workers} worker(s).'
+        ))
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0010_seed_demo_users'),
+        ('payroll', '0002_expenseclaim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='reimbursements',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.CreateModel(
+            name='PayRun',
+            fields=[
+                ('pay_run_id', models.AutoField(primary_key=True, serialize=False)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('status', models.CharField(choices=[('Draft', 'Draft'), ('Running', 'Running'), ('Completed', 'Completed'), ('Failed', 'Failed')], default='Draft', max_length=20)),
+                ('employee_count', models.IntegerField(default=0)),
+                ('skipped_count', models.IntegerField(default=0)),
+                ('total_gross', models.DecimalField(decimal_places=2, default=0.0, max_digits=18)),
+                ('total_deductions', models.DecimalField(decimal_places=2, default=0.0, max_digits=18)),
+                ('total_net', models.DecimalField(decimal_places=2, default=0.0, max_digits=18)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_pay_runs', to='employees.employee')),
+            ],
+            options={
+                'db_table': 'pay_runs',
+                'ordering': ['-period_start', '-period_end'],
+                'unique_together': {('period_start', 'period_end')},
+            },
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='pay_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payrolls', to='payroll.payrun'),
+        ),
+    ]
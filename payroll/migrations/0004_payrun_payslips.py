@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0003_payrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrun',
+            name='payslip_archive',
+            field=models.FileField(blank=True, null=True, upload_to='payslips/archives/'),
+        ),
+        migrations.AddField(
+            model_name='payrun',
+            name='payslip_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payrun',
+            name='payslip_status',
+            field=models.CharField(choices=[('Idle', 'Idle'), ('Queued', 'Queued'), ('Running', 'Running'), ('Completed', 'Completed'), ('Failed', 'Failed')], default='Idle', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='payrun',
+            name='payslips_completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payrun',
+            name='payslips_done',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='payrun',
+            name='payslips_total',
+            field=models.IntegerField(default=0),
+        ),
+    ]
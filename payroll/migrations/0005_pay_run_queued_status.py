@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0004_payrun_payslips'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payrun',
+            name='status',
+            field=models.CharField(choices=[('Draft', 'Draft'), ('Queued', 'Queued'), ('Running', 'Running'), ('Completed', 'Completed'), ('Failed', 'Failed')], default='Draft', max_length=20),
+        ),
+    ]
@@ -2,6 +2,60 @@ from django.db import models
 from employees.models import Employee
 
 
+class PayRun(models.Model):
+    """One payroll computation over a pay period for every eligible employee"""
+    STATUS_CHOICES = [
+        ('Draft', 'Draft'),
+        ('Queued', 'Queued'),
+        ('Running', 'Running'),
+        ('Completed', 'Completed'),
+        ('Failed', 'Failed'),
+    ]
+    PAYSLIP_STATUS_CHOICES = [
+        ('Idle', 'Idle'),
+        ('Queued', 'Queued'),
+        ('Running', 'Running'),
+        ('Completed', 'Completed'),
+        ('Failed', 'Failed'),
+    ]
+
+    pay_run_id = models.AutoField(primary_key=True)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Draft')
+    employee_count = models.IntegerField(default=0)
+    skipped_count = models.IntegerField(default=0)
+    total_gross = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
+    total_deductions = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
+    total_net = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
+    error = models.TextField(blank=True, null=True)
+    payslip_status = models.CharField(max_length=20, choices=PAYSLIP_STATUS_CHOICES, default='Idle')
+    payslips_total = models.IntegerField(default=0)
+    payslips_done = models.IntegerField(default=0)
+    payslip_archive = models.FileField(upload_to='payslips/archives/', blank=True, null=True)
+    payslip_error = models.TextField(blank=True, null=True)
+    payslips_completed_at = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        Employee,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_pay_runs'
+    )
+    started_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'pay_runs'
+        unique_together = ['period_start', 'period_end']
+        ordering = ['-period_start', '-period_end']
+
+    def __str__(self):
+        return f"Pay run {self.period_start} to {self.period_end}"
+
+
 class Payroll(models.Model):
     """Payroll model"""
     STATUS_CHOICES = [
@@ -16,6 +70,13 @@ class Payroll(models.Model):
         on_delete=models.CASCADE,
         related_name='payrolls'
     )
+    pay_run = models.ForeignKey(
+        PayRun,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payrolls'
+    )
     pay_period_start = models.DateField()
     pay_period_end = models.DateField()
     basic_salary = models.DecimalField(max_digits=15, decimal_places=2)
@@ -25,6 +86,7 @@ class Payroll(models.Model):
     deductions = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     tax = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     insurance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    reimbursements = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     net_pay = models.DecimalField(max_digits=15, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     payslip_generated = models.BooleanField(default=False)
@@ -46,7 +108,7 @@ class Payroll(models.Model):
         """Calculate net pay"""
         gross_pay = self.basic_salary + self.allowances + self.bonus + self.overtime_pay
         total_deductions = self.deductions + self.tax + self.insurance
-        return gross_pay - total_deductions
+        return gross_pay - total_deductions + self.reimbursements
 
     def save(self, *args, **kwargs):
         if not self.net_pay:
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from attendance.models import OvertimeRequest
+from backend.parallel import default_worker_count, run_in_processes, split_into_chunks
+from employees.models import Employee
+from leave_management.models import LeaveRequest
+
+from .models import ExpenseClaim, PayRun, Payroll, SalaryStructure
+
+
+PAY_RUN_FIELDS = [
+    'pay_run',
+    'basic_salary',
+    'allowances',
+    'overtime_pay',
+    'deductions',
+    'tax',
+    'reimbursements',
+    'net_pay',
+    'payslip_generated',
+    'notes',
+    'updated_at',
+]
+
+ZERO = Decimal('0.00')
+
+logger = logging.getLogger(__name__)
+
+
+class PayRunInProgress(Exception):
+    """Raised when a pay run is started while it is already running."""
+
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _overlap_days(first: date, last: date, start: date, end: date) -> int:
+    return max((min(last, end) - max(first, start)).days + 1, 0)
+
+
+def eligible_employee_ids(start: date, end: date, department_id: Optional[int] = None) -> List[int]:
+    """Employees on the books during the period with an applicable salary structure."""
+    employees = Employee.objects.all()
+    if department_id:
+        employees = employees.filter(department_id=department_id)
+    return sorted(
+        employees
+        .exclude(status='Terminated')
+        .filter(
+            hire_date__lte=end,
+            salary_structure__is_active=True,
+            salary_structure__effective_from__lte=end,
+        )
+        .filter(
+            Q(salary_structure__effective_to__isnull=True)
+            | Q(salary_structure__effective_to__gte=start)
+        )
+        .values_list('employee_id', flat=True)
+    )
+
+
+def compute_payrolls(employee_ids: Iterable[int], start: date, end: date) -> List[Payroll]:
+    """Payroll rows for ``employee_ids`` over one period, built in memory.
+
+    Inputs are loaded with one query each for the whole chunk: salary
+    structures, approved overtime hours, approved expense claims and
+    approved unpaid leave. Structure amounts are per pay period. Unpaid
+    leave deducts the daily share of basic plus allowances; overtime is
+    paid on the hourly basic rate; tax applies to the pay after unpaid
+    leave; provident fund is taken on basic. Claims are reimbursed
+    untaxed.
+    """
+    employee_ids = list(employee_ids)
+    structures = {
+        structure.employee_id: structure
+        for structure in SalaryStructure.objects.filter(
+            employee_id__in=employee_ids,
+            is_active=True,
+            effective_from__lte=end,
+        ).filter(Q(effective_to__isnull=True) | Q(effective_to__gte=start))
+    }
+    overtime = dict(
+        OvertimeRequest.objects
+        .filter(employee_id__in=employee_ids, status='Approved', date__gte=start, date__lte=end)
+        .order_by()
+        .values('employee_id')
+        .annotate(hours=Sum('hours'))
+        .values_list('employee_id', 'hours')
+    )
+    claims = dict(
+        ExpenseClaim.objects
+        .filter(employee_id__in=employee_ids, status='Approved', expense_date__gte=start, expense_date__lte=end)
+        .order_by()
+        .values('employee_id')
+        .annotate(total=Sum('amount'))
+        .values_list('employee_id', 'total')
+    )
+    unpaid_days: Dict[int, int] = defaultdict(int)
+    leaves = LeaveRequest.objects.filter(
+        employee_id__in=employee_ids,
+        leave_type='Unpaid',
+        status='Approved',
+        start_date__lte=end,
+        end_date__gte=start,
+    ).values_list('employee_id', 'start_date', 'end_date')
+    for employee_id, first, last in leaves:
+        unpaid_days[employee_id] += _overlap_days(first, last, start, end)
+
+    period_days = Decimal((end - start).days + 1)
+    monthly_hours = Decimal(str(settings.PAYROLL_MONTHLY_HOURS))
+    overtime_rate = Decimal(str(settings.PAYROLL_OVERTIME_MULTIPLIER))
+    payrolls = []
+    for employee_id in employee_ids:
+        structure = structures.get(employee_id)
+        if structure is None:
+            continue
+        basic = structure.basic_salary
+        allowances = (
+            structure.house_rent_allowance
+            + structure.transport_allowance
+            + structure.medical_allowance
+            + structure.other_allowances
+        )
+        days_unpaid = min(Decimal(unpaid_days.get(employee_id, 0)), period_days)
+        loss_of_pay = _money((basic + allowances) * days_unpaid / period_days)
+        overtime_pay = _money(basic / monthly_hours * overtime_rate * (overtime.get(employee_id) or ZERO))
+        provident_fund = _money(basic * structure.provident_fund_percentage / 100)
+        taxable = basic + allowances + overtime_pay - loss_of_pay
+        tax = _money(max(taxable, ZERO) * structure.tax_percentage / 100)
+        payroll = Payroll(
+            employee_id=employee_id,
+            pay_period_start=start,
+            pay_period_end=end,
+            basic_salary=basic,
+            allowances=allowances,
+            bonus=ZERO,
+            overtime_pay=overtime_pay,
+            deductions=loss_of_pay + provident_fund,
+            tax=tax,
+            insurance=ZERO,
+            reimbursements=_money(claims.get(employee_id) or ZERO),
+            status='Pending',
+            payslip_generated=False,
+            notes=f'Unpaid leave: {days_unpaid} day(s)' if days_unpaid else None,
+        )
+        payroll.net_pay = payroll.calculate_net_pay()
+        payrolls.append(payroll)
+    return payrolls
+
+
+def run_pay_run_chunk(employee_ids: List[int], pay_run_id: int) -> Dict[str, int]:
+    """Compute and upsert one chunk of a pay run; module-level so worker processes can run it.
+
+    Payrolls already marked Paid are never touched. Payrolls this run wrote
+    earlier for employees that are no longer eligible are removed, so
+    rerunning a period converges on the same rows.
+    """
+    pay_run = PayRun.objects.get(pk=pay_run_id)
+    start, end = pay_run.period_start, pay_run.period_end
+    with transaction.atomic():
+        # Locked so a payroll marked Paid meanwhile waits for this chunk instead of being overwritten.
+        existing = {
+            employee_id: (status, bonus, insurance)
+            for employee_id, status, bonus, insurance in Payroll.objects.select_for_update().filter(
+                employee_id__in=employee_ids,
+                pay_period_start=start,
+                pay_period_end=end,
+            ).values_list('employee_id', 'status', 'bonus', 'insurance')
+        }
+        paid = {employee_id for employee_id, (status, _, _) in existing.items() if status == 'Paid'}
+        payrolls = compute_payrolls(
+            [employee_id for employee_id in employee_ids if employee_id not in paid], start, end,
+        )
+        for payroll in payrolls:
+            payroll.pay_run_id = pay_run_id
+            if payroll.employee_id in existing:
+                # Bonus and insurance are entered by hand and survive reruns.
+                _, payroll.bonus, payroll.insurance = existing[payroll.employee_id]
+                payroll.net_pay = payroll.calculate_net_pay()
+        Payroll.objects.bulk_create(
+            payrolls,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['employee', 'pay_period_start', 'pay_period_end'],
+            update_fields=PAY_RUN_FIELDS,
+        )
+        computed = {payroll.employee_id for payroll in payrolls}
+        Payroll.objects.filter(
+            pay_run_id=pay_run_id,
+            employee_id__in=[employee_id for employee_id in employee_ids if employee_id not in computed],
+        ).exclude(status='Paid').delete()
+    return {'computed': len(payrolls), 'skipped': len(paid)}
+
+
+def _claim(pay_run: PayRun, status: str, force: bool) -> None:
+    now = timezone.now()
+    claimable = PayRun.objects.filter(pk=pay_run.pk)
+    if not force:
+        claimable = claimable.filter(
+            ~Q(status__in=['Queued', 'Running'])
+            | Q(started_at__isnull=True)
+            | Q(started_at__lt=now - timedelta(minutes=settings.PAYROLL_RUN_STALE_MINUTES))
+        )
+    claimed = claimable.update(
+        status=status,
+        started_at=now,
+        completed_at=None,
+        error=None,
+    )
+    if not claimed:
+        raise PayRunInProgress(f'Pay run {pay_run.pk} is already running; pass force to restart it.')
+
+
+def run_pay_run(
+    pay_run: PayRun,
+    department_id: Optional[int] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 1000,
+    force: bool = False,
+) -> PayRun:
+    """Compute every payroll of ``pay_run`` in parallel chunks and record the totals.
+
+    ``department_id`` limits the computation to one department; the run's
+    totals always cover all of its payrolls. Raises ``PayRunInProgress`` if
+    the run is already queued or executing. A run left Queued or Running for
+    longer than PAYROLL_RUN_STALE_MINUTES (its worker died) is taken over,
+    and ``force`` takes over any such run. The run is marked Failed (with the error)
+    if anything raises; rerunning is safe.
+    """
+    _claim(pay_run, 'Running', force)
+
+    try:
+        employee_ids = set(eligible_employee_ids(pay_run.period_start, pay_run.period_end, department_id))
+        # Also revisit employees this run paid before, so ineligible ones are cleaned up.
+        previous = pay_run.payrolls.all()
+        if department_id:
+            previous = previous.filter(employee__department_id=department_id)
+        employee_ids.update(previous.values_list('employee_id', flat=True))
+        chunks = split_into_chunks(sorted(employee_ids), max(chunk_size, 1))
+        skipped = 0
+        for result in run_in_processes(run_pay_run_chunk, chunks, workers or default_worker_count(), pay_run.pk):
+            skipped += result['skipped']
+
+        totals = pay_run.payrolls.aggregate(
+            count=Count('payroll_id'),
+            basic=Sum('basic_salary'),
+            allowances=Sum('allowances'),
+            bonus=Sum('bonus'),
+            overtime=Sum('overtime_pay'),
+            deductions=Sum('deductions'),
+            tax=Sum('tax'),
+            insurance=Sum('insurance'),
+            net=Sum('net_pay'),
+        )
+    except Exception as exc:
+        PayRun.objects.filter(pk=pay_run.pk).update(status='Failed', error=str(exc), completed_at=timezone.now())
+        raise
+
+    gross = sum((totals[key] or ZERO for key in ('basic', 'allowances', 'bonus', 'overtime')), ZERO)
+    deductions = sum((totals[key] or ZERO for key in ('deductions', 'tax', 'insurance')), ZERO)
+    PayRun.objects.filter(pk=pay_run.pk).update(
+        status='Completed',
+        employee_count=totals['count'],
+        skipped_count=skipped,
+        total_gross=gross,
+        total_deductions=deductions,
+        total_net=totals['net'] or ZERO,
+        completed_at=timezone.now(),
+    )
+    pay_run.refresh_from_db()
+    return pay_run
+
+
+def start_pay_run(pay_run: PayRun, force: bool = False) -> None:
+    """Queue ``pay_run`` on a background thread; clients poll the run's status.
+
+    Raises ``PayRunInProgress`` under the same rules as ``run_pay_run``. The
+    thread computes in one process; the ``run_payroll`` command parallelizes
+    large runs.
+    """
+    _claim(pay_run, 'Queued', force)
+
+    def work():
+        try:
+            # Already claimed above, so the worker takes over its own queued run.
+            run_pay_run(pay_run, workers=1, force=True)
+        except Exception:  # noqa: BLE001
+            logger.exception('Pay run %s failed.', pay_run.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=work, name=f'pay-run-{pay_run.pk}', daemon=True)
+    thread.start()
@@ -1,78 +1,248 @@
 from __future__ import annotations
 
+import logging
+import threading
+import zipfile
+from datetime import timedelta
+from functools import lru_cache
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from typing import Callable, List, Optional
+from xml.sax.saxutils import escape
 
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models import Q
 from django.utils import timezone
 
-from .models import Payroll
+from backend.parallel import default_worker_count, run_in_processes, split_into_chunks
 
+from .models import PayRun, Payroll
 
-def generate_payslip_pdf(payroll: Payroll) -> bytes:
-    try:
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import LETTER
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    except ImportError as exc:
-        raise RuntimeError('reportlab is required to generate payslips.') from exc
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=LETTER, title='Payslip')
-    styles = getSampleStyleSheet()
-
-    employee = payroll.employee
-    department = employee.department.name if employee.department else 'N/A'
-
-    elements = [
-        Paragraph('Payslip', styles['Title']),
-        Spacer(1, 12),
-        Paragraph(f"Employee: {employee.full_name}", styles['Normal']),
-        Paragraph(f"Employee ID: {employee.employee_id}", styles['Normal']),
-        Paragraph(f"Department: {department}", styles['Normal']),
-        Paragraph(f"Designation: {employee.designation}", styles['Normal']),
-        Paragraph(
-            f"Pay Period: {payroll.pay_period_start} to {payroll.pay_period_end}",
-            styles['Normal'],
-        ),
-        Paragraph(f"Issued On: {timezone.localdate()}", styles['Normal']),
-        Spacer(1, 12),
-    ]
 
-    earnings = [
-        ['Earnings', 'Amount'],
-        ['Basic Salary', f"{payroll.basic_salary}"],
-        ['Allowances', f"{payroll.allowances}"],
-        ['Bonus', f"{payroll.bonus}"],
-        ['Overtime Pay', f"{payroll.overtime_pay}"],
+logger = logging.getLogger(__name__)
+
+
+class PayslipRenderer:
+    """Payslip PDF renderer holding everything that does not depend on the payroll.
+
+    reportlab is imported, the stylesheet and table style are built and the
+    standard fonts' metrics are loaded once; ``render`` only creates the
+    flowables. Flowables are never shared: ``wrap`` stores layout state on
+    them, and renders may run on several threads. Build one per process with
+    ``get_payslip_renderer``.
+    """
+
+    EARNINGS = [
+        ('Basic Salary', 'basic_salary'),
+        ('Allowances', 'allowances'),
+        ('Bonus', 'bonus'),
+        ('Overtime Pay', 'overtime_pay'),
+        ('Reimbursements', 'reimbursements'),
     ]
-    deductions = [
-        ['Deductions', 'Amount'],
-        ['Deductions', f"{payroll.deductions}"],
-        ['Tax', f"{payroll.tax}"],
-        ['Insurance', f"{payroll.insurance}"],
+    DEDUCTIONS = [
+        ('Deductions', 'deductions'),
+        ('Tax', 'tax'),
+        ('Insurance', 'insurance'),
     ]
 
-    earnings_table = Table(earnings, hAlign='LEFT')
-    deductions_table = Table(deductions, hAlign='LEFT')
-
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-    ])
-    earnings_table.setStyle(style)
-    deductions_table.setStyle(style)
-
-    elements.append(Paragraph('Earnings', styles['Heading3']))
-    elements.append(earnings_table)
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph('Deductions', styles['Heading3']))
-    elements.append(deductions_table)
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph(f"Net Pay: {payroll.net_pay}", styles['Heading2']))
-
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.read()
+    def __init__(self):
+        try:
+            from reportlab.lib import colors
+            from reportlab.lib.pagesizes import LETTER
+            from reportlab.lib.styles import getSampleStyleSheet
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        except ImportError as exc:
+            raise RuntimeError('reportlab is required to generate payslips.') from exc
+
+        self._document = SimpleDocTemplate
+        self._paragraph = Paragraph
+        self._spacer = Spacer
+        self._table = Table
+        self.pagesize = LETTER
+        styles = getSampleStyleSheet()
+        self.title_style = styles['Title']
+        self.heading_style = styles['Heading3']
+        self.normal = styles['Normal']
+        self.net_pay_style = styles['Heading2']
+        for font in ('Helvetica', 'Helvetica-Bold'):
+            pdfmetrics.getFont(font)
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+        ])
+
+    def _amounts_table(self, header: str, rows, payroll: Payroll):
+        data = [[header, 'Amount']]
+        data.extend([label, f"{getattr(payroll, field)}"] for label, field in rows)
+        return self._table(data, style=self.table_style, hAlign='LEFT')
+
+    def render(self, payroll: Payroll) -> bytes:
+        employee = payroll.employee
+        department = employee.department.name if employee.department else 'N/A'
+        details = [
+            f"Employee: {employee.full_name}",
+            f"Employee ID: {employee.employee_id}",
+            f"Department: {department}",
+            f"Designation: {employee.designation}",
+            f"Pay Period: {payroll.pay_period_start} to {payroll.pay_period_end}",
+            f"Issued On: {timezone.localdate()}",
+        ]
+        elements = [self._paragraph('Payslip', self.title_style), self._spacer(1, 12)]
+        # Paragraph text is markup; names and designations are escaped.
+        elements.extend(self._paragraph(escape(line), self.normal) for line in details)
+        elements.extend([
+            self._spacer(1, 12),
+            self._paragraph('Earnings', self.heading_style),
+            self._amounts_table('Earnings', self.EARNINGS, payroll),
+            self._spacer(1, 12),
+            self._paragraph('Deductions', self.heading_style),
+            self._amounts_table('Deductions', self.DEDUCTIONS, payroll),
+            self._spacer(1, 12),
+            self._paragraph(f"Net Pay: {payroll.net_pay}", self.net_pay_style),
+        ])
+
+        buffer = BytesIO()
+        doc = self._document(buffer, pagesize=self.pagesize, title='Payslip')
+        doc.build(elements)
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def get_payslip_renderer() -> PayslipRenderer:
+    return PayslipRenderer()
+
+
+def generate_payslip_pdf(payroll: Payroll) -> bytes:
+    return get_payslip_renderer().render(payroll)
+
+
+def payslip_filename(payroll: Payroll) -> str:
+    return f"payslip_{payroll.employee_id}_{payroll.pay_period_start}_{payroll.pay_period_end}.pdf"
+
+
+def render_payslips(payroll_ids: List[int]) -> int:
+    """Render and store the payslips of ``payroll_ids``; module-level so worker processes can run it.
+
+    A payslip rendered earlier is replaced rather than kept next to the new one.
+    """
+    payrolls = list(Payroll.objects.filter(pk__in=payroll_ids).select_related('employee__department'))
+    now = timezone.now()
+    for payroll in payrolls:
+        pdf_bytes = generate_payslip_pdf(payroll)
+        if payroll.payslip_file:
+            payroll.payslip_file.delete(save=False)
+        payroll.payslip_file.save(payslip_filename(payroll), ContentFile(pdf_bytes), save=False)
+        payroll.payslip_generated = True
+        payroll.updated_at = now
+    Payroll.objects.bulk_update(payrolls, ['payslip_file', 'payslip_generated', 'updated_at'])
+    return len(payrolls)
+
+
+def build_payslip_archive(pay_run: PayRun) -> None:
+    """Zip every stored payslip of the run into ``pay_run.payslip_archive``."""
+    # PDFs are already compressed; storing them keeps the archive fast to build.
+    with SpooledTemporaryFile(max_size=32 * 1024 * 1024) as buffer:
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            payrolls = pay_run.payrolls.exclude(payslip_file='').exclude(payslip_file__isnull=True)
+            for payroll in payrolls.only('payroll_id', 'employee_id', 'pay_period_start', 'pay_period_end', 'payslip_file'):
+                with payroll.payslip_file.open('rb') as payslip:
+                    archive.writestr(payslip_filename(payroll), payslip.read())
+        buffer.seek(0)
+        if pay_run.payslip_archive:
+            pay_run.payslip_archive.delete(save=False)
+        pay_run.payslip_archive.save(
+            f'payslips_{pay_run.period_start}_{pay_run.period_end}.zip',
+            File(buffer),
+            save=False,
+        )
+    PayRun.objects.filter(pk=pay_run.pk).update(payslip_archive=pay_run.payslip_archive.name)
+
+
+def generate_pay_run_payslips(
+    pay_run: PayRun,
+    workers: Optional[int] = None,
+    chunk_size: int = 50,
+    only_missing: bool = False,
+    archive: bool = False,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Optional[PayRun]:
+    """Render the payslips of a pay run in a process pool, recording progress on the run.
+
+    ``payslips_done`` / ``payslips_total`` advance after each chunk so
+    clients can poll the run; ``on_progress(done, total)`` is called too.
+    ``only_missing`` skips payrolls that already have a payslip; ``archive``
+    zips all of the run's payslips at the end.
+    Returns ``None`` if payslips for the run are already being generated.
+    """
+    started = PayRun.objects.filter(pk=pay_run.pk).exclude(payslip_status='Running').update(
+        payslip_status='Running',
+        payslips_total=0,
+        payslips_done=0,
+        payslip_error=None,
+        payslips_completed_at=None,
+        updated_at=timezone.now(),
+    )
+    if not started:
+        return None
+    try:
+        payrolls = pay_run.payrolls.order_by('payroll_id')
+        if only_missing:
+            payrolls = payrolls.filter(payslip_generated=False)
+        payroll_ids = list(payrolls.values_list('payroll_id', flat=True))
+        PayRun.objects.filter(pk=pay_run.pk).update(payslips_total=len(payroll_ids))
+        done = 0
+        chunks = split_into_chunks(payroll_ids, max(chunk_size, 1))
+        for count in run_in_processes(render_payslips, chunks, workers or default_worker_count()):
+            done += count
+            # updated_at doubles as the heartbeat start_payslip_generation checks.
+            PayRun.objects.filter(pk=pay_run.pk).update(payslips_done=done, updated_at=timezone.now())
+            if on_progress:
+                on_progress(done, len(payroll_ids))
+        if archive:
+            build_payslip_archive(pay_run)
+    except Exception as exc:
+        PayRun.objects.filter(pk=pay_run.pk).update(
+            payslip_status='Failed',
+            payslip_error=str(exc),
+            payslips_completed_at=timezone.now(),
+        )
+        raise
+    PayRun.objects.filter(pk=pay_run.pk).update(payslip_status='Completed', payslips_completed_at=timezone.now())
+    pay_run.refresh_from_db()
+    return pay_run
+
+
+def start_payslip_generation(pay_run: PayRun, **options) -> bool:
+    """Queue payslip generation for a run on a background thread; False if already queued or running.
+
+    The request that starts it returns immediately; progress is read from the
+    run. A job that made no progress for PAYSLIP_GENERATION_STALE_MINUTES
+    (its web worker was restarted mid-run) is assumed dead and started again.
+    Large runs are better served by the ``generate_payslips`` command.
+    """
+    now = timezone.now()
+    queued = PayRun.objects.filter(pk=pay_run.pk).filter(
+        ~Q(payslip_status__in=['Queued', 'Running'])
+        | Q(updated_at__lt=now - timedelta(minutes=settings.PAYSLIP_GENERATION_STALE_MINUTES))
+    ).update(payslip_status='Queued', updated_at=now)
+    if not queued:
+        return False
+
+    def work():
+        try:
+            generate_pay_run_payslips(pay_run, **options)
+        except Exception:  # noqa: BLE001
+            logger.exception('Payslip generation failed for pay run %s.', pay_run.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=work, name=f'payslips-{pay_run.pk}', daemon=True)
+    thread.start()
+    return True
@@ -1,21 +1,36 @@
 from rest_framework import serializers
-from .models import Payroll, SalaryStructure, ExpenseClaim
+from .models import Payroll, PayRun, SalaryStructure, ExpenseClaim
 from employees.serializers import EmployeeListSerializer
 
 
 class PayrollSerializer(serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.full_name', read_only=True)
+    attendance_summary = serializers.SerializerMethodField()
 
     class Meta:
         model = Payroll
         fields = [
             'payroll_id', 'employee', 'employee_name', 'pay_period_start',
-            'pay_period_end', 'basic_salary', 'allowances', 'bonus',
-            'overtime_pay', 'deductions', 'tax', 'insurance', 'net_pay',
-            'status', 'payslip_generated', 'payslip_file', 'payment_date',
-            'notes', 'created_at', 'updated_at'
+            'pay_period_end', 'pay_run', 'basic_salary', 'allowances', 'bonus',
+            'overtime_pay', 'deductions', 'tax', 'insurance', 'reimbursements',
+            'net_pay', 'status', 'payslip_generated', 'payslip_file', 'payment_date',
+            'notes', 'attendance_summary', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['payroll_id', 'net_pay', 'created_at', 'updated_at']
+        read_only_fields = ['payroll_id', 'pay_run', 'net_pay', 'created_at', 'updated_at']
+
+    def get_attendance_summary(self, obj):
+        """Month of ``pay_period_start`` from the attendance summary, when annotated by the viewset."""
+        if getattr(obj, 'attendance_present_days', None) is None:
+            return None
+        hours = serializers.DecimalField(max_digits=7, decimal_places=2)
+        return {
+            'present_days': obj.attendance_present_days,
+            'half_days': obj.attendance_half_days,
+            'absent_days': obj.attendance_absent_days,
+            'leave_days': obj.attendance_leave_days,
+            'working_hours': hours.to_representation(obj.attendance_working_hours),
+            'overtime_hours': hours.to_representation(obj.attendance_overtime_hours),
+        }
 
 
 class PayrollCreateSerializer(serializers.ModelSerializer):
@@ -26,8 +41,34 @@ class PayrollCreateSerializer(serializers.ModelSerializer):
         fields = [
             'employee', 'pay_period_start', 'pay_period_end',
             'basic_salary', 'allowances', 'bonus', 'overtime_pay',
-            'deductions', 'tax', 'insurance', 'notes'
+            'deductions', 'tax', 'insurance', 'reimbursements', 'notes'
+        ]
+
+
+class PayRunSerializer(serializers.ModelSerializer):
+    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
+
+    class Meta:
+        model = PayRun
+        fields = [
+            'pay_run_id', 'period_start', 'period_end', 'status', 'employee_count',
+            'skipped_count', 'total_gross', 'total_deductions', 'total_net', 'error',
+            'payslip_status', 'payslips_total', 'payslips_done', 'payslip_archive',
+            'payslip_error', 'payslips_completed_at',
+            'created_by', 'created_by_name', 'started_at', 'completed_at',
+            'created_at', 'updated_at',
         ]
+        read_only_fields = [
+            'pay_run_id', 'status', 'employee_count', 'skipped_count', 'total_gross',
+            'total_deductions', 'total_net', 'error', 'payslip_status', 'payslips_total',
+            'payslips_done', 'payslip_archive', 'payslip_error', 'payslips_completed_at',
+            'created_by', 'started_at', 'completed_at', 'created_at', 'updated_at',
+        ]
+
+    def validate(self, attrs):
+        if attrs['period_start'] > attrs['period_end']:
+            raise serializers.ValidationError({'period_end': 'Must be on or after period_start.'})
+        return attrs
 
 
 class SalaryStructureSerializer(serializers.ModelSerializer):
@@ -1,3 +1,186 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from reportlab import rl_config
+from rest_framework.test import APIClient
+
+from attendance.models import OvertimeRequest
+from employees.models import Employee
+from leave_management.models import LeaveRequest
+from .models import ExpenseClaim, PayRun, Payroll, SalaryStructure
+from .payrun_utils import PayRunInProgress, run_pay_run
+from .management.commands.benchmark_payslip_rendering import _legacy_render
+from .payslip_utils import generate_payslip_pdf, start_payslip_generation
+
+
+JANUARY = (date(2024, 1, 1), date(2024, 1, 31))
+
+
+def create_employee(email, **fields):
+    fields.setdefault('hire_date', date(2023, 1, 1))
+    return Employee.objects.create(
+        first_name=email.split('@')[0].title(),
+        last_name='Test',
+        email=email,
+        designation='Staff',
+        salary=1000,
+        role='Employee',
+        **fields,
+    )
+
+
+class PayRunTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('payee@example.com')
+        SalaryStructure.objects.create(
+            employee=self.employee,
+            basic_salary=Decimal('16000'),
+            house_rent_allowance=Decimal('4000'),
+            provident_fund_percentage=Decimal('10'),
+            tax_percentage=Decimal('10'),
+            effective_from=date(2023, 1, 1),
+        )
+        self.pay_run = PayRun.objects.create(period_start=JANUARY[0], period_end=JANUARY[1])
+
+    def _run(self, **kwargs):
+        return run_pay_run(self.pay_run, workers=1, **kwargs)
+
+    def _payroll(self):
+        return Payroll.objects.get(employee=self.employee, pay_period_start=JANUARY[0])
+
+    def test_plain_month(self):
+        self._run()
+        payroll = self._payroll()
+        self.assertEqual(payroll.allowances, Decimal('4000.00'))
+        self.assertEqual(payroll.deductions, Decimal('1600.00'))
+        self.assertEqual(payroll.tax, Decimal('2000.00'))
+        self.assertEqual(payroll.net_pay, Decimal('16400.00'))
+        self.assertIsNone(payroll.notes)
+
+    def test_leave_overtime_and_claims(self):
+        LeaveRequest.objects.create(
+            employee=self.employee, leave_type='Unpaid', status='Approved',
+            start_date=date(2023, 12, 30), end_date=date(2024, 1, 2), total_days=4, reason='Travel',
+        )
+        OvertimeRequest.objects.create(employee=self.employee, date=date(2024, 1, 10), hours=4, status='Approved')
+        OvertimeRequest.objects.create(employee=self.employee, date=date(2024, 1, 11), hours=9, status='Pending')
+        ExpenseClaim.objects.create(employee=self.employee, amount=Decimal('250'), expense_date=date(2024, 1, 5), status='Approved')
+        ExpenseClaim.objects.create(employee=self.employee, amount=Decimal('900'), expense_date=date(2024, 1, 6))
+
+        self._run()
+        payroll = self._payroll()
+        # Two of the four leave days fall in the period: 20000 * 2 / 31.
+        loss_of_pay = Decimal('1290.32')
+        # 16000 / 160 hours * 1.5 * 4 approved hours.
+        self.assertEqual(payroll.overtime_pay, Decimal('600.00'))
+        self.assertEqual(payroll.deductions, loss_of_pay + Decimal('1600.00'))
+        # Tax is on pay after unpaid leave: (20000 + 600 - 1290.32) * 10%.
+        self.assertEqual(payroll.tax, Decimal('1930.97'))
+        self.assertEqual(payroll.reimbursements, Decimal('250.00'))
+        self.assertEqual(payroll.net_pay, Decimal('20600') - loss_of_pay - Decimal('1600') - Decimal('1930.97') + Decimal('250'))
+        self.assertEqual(payroll.notes, 'Unpaid leave: 2 day(s)')
+
+    def test_rerun_converges_and_keeps_manual_amounts(self):
+        leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type='Unpaid', status='Approved',
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 8), total_days=1, reason='Errand',
+        )
+        self._run()
+        Payroll.objects.filter(pk=self._payroll().pk).update(bonus=Decimal('500'))
+        leave.status = 'Cancelled'
+        leave.save()
+
+        self._run()
+        self._run()
+        payroll = self._payroll()
+        self.assertEqual(Payroll.objects.filter(employee=self.employee).count(), 1)
+        self.assertEqual(payroll.bonus, Decimal('500.00'))
+        self.assertEqual(payroll.net_pay, Decimal('16900.00'))
+        self.assertIsNone(payroll.notes)
+
+    def test_paid_payrolls_are_not_recomputed(self):
+        self._run()
+        Payroll.objects.filter(pk=self._payroll().pk).update(status='Paid', net_pay=Decimal('1'))
+        SalaryStructure.objects.filter(employee=self.employee).update(basic_salary=Decimal('30000'))
+
+        pay_run = self._run()
+        self.assertEqual(self._payroll().net_pay, Decimal('1.00'))
+        self.assertGreaterEqual(pay_run.skipped_count, 1)
+
+    def test_running_run_is_refused_until_stale_or_forced(self):
+        PayRun.objects.filter(pk=self.pay_run.pk).update(status='Running', started_at=timezone.now())
+        with self.assertRaises(PayRunInProgress):
+            self._run()
+        self.assertEqual(self._run(force=True).status, 'Completed')
+
+        PayRun.objects.filter(pk=self.pay_run.pk).update(status='Running', started_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self._run().status, 'Completed')
+
+    @mock.patch('payroll.payrun_utils.connection')
+    @mock.patch('payroll.payrun_utils.threading.Thread')
+    def test_api_queues_the_run_in_the_background(self, thread, connection):
+        PayRun.objects.filter(pk=self.pay_run.pk).update(status='Running', started_at=timezone.now())
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        url = f'/api/v1/payroll/pay-runs/{self.pay_run.pk}/run/'
+        self.assertEqual(client.post(url).status_code, 409)
+        response = client.post(url, {'force': True}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'Queued')
+        thread.return_value.start.assert_called_once()
+        # A queued run is not queued again until it goes stale.
+        self.assertEqual(client.post(url).status_code, 409)
+
+        thread.call_args.kwargs['target']()
+        self.assertEqual(client.get(url.replace('run/', '')).data['status'], 'Completed')
+        self.assertEqual(self._payroll().net_pay, Decimal('16400.00'))
+
+
+@mock.patch('payroll.payslip_utils.threading.Thread')
+class PayslipGenerationStartTests(TestCase):
+    def setUp(self):
+        self.pay_run = PayRun.objects.create(period_start=JANUARY[0], period_end=JANUARY[1])
+
+    def _mark(self, status, minutes_ago):
+        PayRun.objects.filter(pk=self.pay_run.pk).update(
+            payslip_status=status, updated_at=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    def test_live_job_is_not_started_twice(self, thread):
+        self._mark('Running', 1)
+        self.assertFalse(start_payslip_generation(self.pay_run))
+        thread.assert_not_called()
+
+    def test_dead_job_is_restarted(self, thread):
+        self._mark('Queued', 60)
+        self.assertTrue(start_payslip_generation(self.pay_run))
+        thread.return_value.start.assert_called_once()
+        self.assertEqual(PayRun.objects.get(pk=self.pay_run.pk).payslip_status, 'Queued')
+
 
-# Create your tests here.
+class PayslipRendererTests(TestCase):
+    def test_matches_the_legacy_layout(self):
+        employee = create_employee('slip@example.com')
+        payroll = Payroll(
+            employee=employee,
+            pay_period_start=JANUARY[0],
+            pay_period_end=JANUARY[1],
+            basic_salary=Decimal('5000.00'),
+            allowances=Decimal('1200.00'),
+            bonus=Decimal('0.00'),
+            overtime_pay=Decimal('150.75'),
+            deductions=Decimal('600.00'),
+            tax=Decimal('820.50'),
+            insurance=Decimal('0.00'),
+            reimbursements=Decimal('42.10'),
+        )
+        payroll.net_pay = payroll.calculate_net_pay()
+        # Invariant mode drops the timestamps and ids that make every PDF unique.
+        with mock.patch.object(rl_config, 'invariant', 1):
+            rendered = [generate_payslip_pdf(payroll) for _ in range(2)]
+            self.assertEqual(rendered[0], _legacy_render(payroll))
+        self.assertEqual(rendered[0], rendered[1])
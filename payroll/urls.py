@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PayrollViewSet, SalaryStructureViewSet
+from .views import PayrollViewSet, PayRunViewSet, SalaryStructureViewSet
 
 router = DefaultRouter()
 router.register(r'payrolls', PayrollViewSet, basename='payroll')
+router.register(r'pay-runs', PayRunViewSet, basename='pay-run')
 router.register(r'salary-structures', SalaryStructureViewSet, basename='salary-structure')
 
 urlpatterns = [
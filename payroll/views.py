@@ -7,10 +7,11 @@ from django.http import FileResponse
 from django.db import models
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from .models import Payroll, SalaryStructure, ExpenseClaim
+from .models import Payroll, PayRun, SalaryStructure, ExpenseClaim
 from .serializers import (
     PayrollSerializer,
     PayrollCreateSerializer,
+    PayRunSerializer,
     SalaryStructureSerializer,
     ExpenseClaimSerializer,
     ExpenseClaimCreateSerializer,
@@ -24,7 +25,9 @@ from employees.permissions import (
     get_employee_profile,
     is_manager_user,
 )
-from .payslip_utils import generate_payslip_pdf
+from .payslip_utils import generate_payslip_pdf, payslip_filename, start_payslip_generation
+from .payrun_utils import PayRunInProgress, start_pay_run
+from attendance.summary_utils import summary_annotations
 
 
 class PayrollViewSet(viewsets.ModelViewSet):
@@ -46,7 +49,9 @@ class PayrollViewSet(viewsets.ModelViewSet):
         return [EmployeeOrRolePermission()]
 
     def get_queryset(self):
-        queryset = Payroll.objects.select_related('employee')
+        queryset = Payroll.objects.select_related('employee').annotate(
+            **summary_annotations('employee', 'pay_period_start')
+        )
         if is_admin_or_hr(self.request.user):
             return queryset
         employee = get_employee_profile(self.request.user)
@@ -66,8 +71,7 @@ class PayrollViewSet(viewsets.ModelViewSet):
         """Generate payslip for a payroll record"""
         payroll = self.get_object()
         pdf_bytes = generate_payslip_pdf(payroll)
-        filename = f"payslip_{payroll.employee.employee_id}_{payroll.pay_period_start}_{payroll.pay_period_end}.pdf"
-        payroll.payslip_file.save(filename, ContentFile(pdf_bytes), save=False)
+        payroll.payslip_file.save(payslip_filename(payroll), ContentFile(pdf_bytes), save=False)
         payroll.payslip_generated = True
         payroll.save()
         serializer = self.get_serializer(payroll)
@@ -81,6 +85,76 @@ class PayrollViewSet(viewsets.ModelViewSet):
         return FileResponse(payroll.payslip_file.open('rb'), content_type='application/pdf')
 
 
+class PayRunViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for pay runs; ``run`` computes every payroll of the period in the background
+    """
+    queryset = PayRun.objects.select_related('created_by')
+    serializer_class = PayRunSerializer
+    permission_classes = [RolePermission]
+    permission_required = 'payroll.manage'
+    read_permission = 'payroll.view'
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'period_start', 'period_end']
+    ordering_fields = ['period_start', 'created_at']
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=get_employee_profile(self.request.user))
+
+    @action(detail=True, methods=['post'])
+    def run(self, request, pk=None):
+        """Queue computing (or recomputing) the run's payrolls; poll the run for its ``status``.
+
+        Payrolls already Paid are left as they are. Body: ``force`` to restart
+        a run still marked Queued or Running, e.g. after its worker was killed
+        (runs older than PAYROLL_RUN_STALE_MINUTES restart anyway).
+        """
+        pay_run = self.get_object()
+        force = str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+        try:
+            start_pay_run(pay_run, force=force)
+        except PayRunInProgress as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        pay_run.refresh_from_db()
+        return Response(self.get_serializer(pay_run).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def generate_payslips(self, request, pk=None):
+        """Render all of the run's payslips in the background; poll the run for ``payslips_done``.
+
+        Body: ``only_missing`` to skip payrolls that already have a payslip,
+        ``archive`` to also build a zip of every payslip.
+        """
+        pay_run = self.get_object()
+        if not pay_run.payrolls.exists():
+            return Response({'detail': 'Pay run has no payrolls; run it first.'}, status=status.HTTP_400_BAD_REQUEST)
+        started = start_payslip_generation(
+            pay_run,
+            only_missing=str(request.data.get('only_missing', '')).lower() in ('1', 'true', 'yes'),
+            archive=str(request.data.get('archive', '')).lower() in ('1', 'true', 'yes'),
+        )
+        if not started:
+            return Response(
+                {'detail': 'Payslips for this pay run are already being generated.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        pay_run.refresh_from_db()
+        return Response(self.get_serializer(pay_run).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download_payslips(self, request, pk=None):
+        pay_run = self.get_object()
+        if not pay_run.payslip_archive:
+            return Response({'detail': 'Payslip archive not generated yet.'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            pay_run.payslip_archive.open('rb'),
+            as_attachment=True,
+            filename=pay_run.payslip_archive.name.rsplit('/', 1)[-1],
+            content_type='application/zip',
+        )
+
+
 class SalaryStructureViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing salary structures